@@ -1,12 +1,74 @@
 from flask import Flask, render_template, jsonify, request
 import json
 import os
+import sys
+import threading
+import time
 import pandas as pd
 import numpy as np
+import forecast_cache
+import fund_index
+import fund_sections
+import global_lstm
+import model_pool
+import http_client
 import navhistory
+import navstore
 import prediction_models
+import scrape_jobs
+from singleflight import SingleFlight
 app = Flask(__name__)
 
+# Index the fund-detail JSON files once at startup
+fund_index.index.build()
+
+# Concurrent requests for the same uncached fund share a single Selenium scrape
+scrape_flight = SingleFlight('scrape')
+
+def _scrape_if_missing(fund_name):
+    # Re-checked inside the flight in case a scrape for this fund finished just before we got here
+    json_path = fund_index.index.find(fund_name)
+    if json_path:
+        with open(json_path, 'r') as f:
+            return json.load(f)
+    from scraper import scrape_fund_data
+    return scrape_fund_data(fund_name, save_to_file=True)
+
+def scrape_fund_once(fund_name):
+    return scrape_flight.do(fund_index.safe_name(fund_name), _scrape_if_missing, fund_name)
+
+# Scrapes run on background workers; handlers hand out a job id instead of waiting on the browser
+scrape_queue = scrape_jobs.ScrapeQueue()
+
+def submit_scrape(fund_name):
+    return scrape_queue.submit(fund_index.safe_name(fund_name), fund_name, scrape_fund_once, fund_name)
+
+# Expired sections are re-scraped in the background while the stored copy is served
+REFRESH_RETRY_AFTER = 3600  # seconds before a fund's refresh is queued again
+_refresh_queued_at = {}
+_refresh_lock = threading.Lock()
+
+def _refresh_fund(fund_name):
+    from scraper import refresh_fund_data
+    return refresh_fund_data(fund_name)
+
+def load_fund_json(fund_name, json_path):
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    expired = fund_sections.expired_phases(data, fallback_time=os.path.getmtime(json_path))
+    if not expired:
+        return data
+    # Same job key as submit_scrape: a refresh and a full scrape of one fund never run at once
+    key = fund_index.safe_name(fund_name)
+    with _refresh_lock:
+        now = time.time()
+        if now - _refresh_queued_at.get(key, 0) <= REFRESH_RETRY_AFTER:
+            return data
+        _refresh_queued_at[key] = now
+    print(f"Sections expired for '{fund_name}' ({', '.join(expired)}). Queueing a refresh...")
+    scrape_queue.submit(key, fund_name, _refresh_fund, fund_name)
+    return data
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -21,94 +83,116 @@ def get_funds():
             funds = [line.strip() for line in f if line.strip()]
     return json.dumps(funds)
 
+@app.route('/api/stats')
+def get_stats():
+    # Cache/IO counters for monitoring
+    return jsonify({
+        'nav_frame_cache': navstore.frame_cache.stats(),
+        'http_client': http_client.get_stats(),
+        'nav_fetch_singleflight': navhistory.fetch_flight.stats(),
+        'scrape_singleflight': scrape_flight.stats(),
+        'scrape_jobs': scrape_queue.stats(),
+        'forecast_cache': forecast_cache.stats(),
+        'prediction_models': prediction_models.describe(),
+        # Web process (fund details) plus the pool workers (compare view)
+        'arima_fits': model_pool.pool.arima_stats(),
+        'model_pool': model_pool.pool.stats(),
+        # The scraper (and its driver pool) is only loaded once a scrape has been needed
+        'scraper_pool': sys.modules['scraper'].pool_stats() if 'scraper' in sys.modules else None
+    })
+
+@app.route('/api/scrape-jobs', methods=['GET', 'POST'])
+def scrape_jobs_endpoint():
+    if request.method == 'POST':
+        fund_name = (request.get_json(silent=True) or {}).get('fund')
+        if not fund_name:
+            return jsonify({'error': 'fund is required'}), 400
+        job = submit_scrape(fund_name)
+        return jsonify(scrape_queue.describe(job)), 202
+    # Queue depth, per-job runtimes and recently finished jobs
+    return jsonify({'stats': scrape_queue.stats(), 'jobs': scrape_queue.jobs()})
+
+@app.route('/api/scrape-jobs/<job_id>')
+def scrape_job_status(job_id):
+    job = scrape_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    return jsonify(scrape_queue.describe(job))
+
+@app.route('/api/scrape-jobs/<job_id>/result')
+def scrape_job_result(job_id):
+    job = scrape_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'unknown job'}), 404
+    if job.status == scrape_jobs.FAILED:
+        return jsonify({'error': job.error}), 500
+    if job.status != scrape_jobs.DONE:
+        return jsonify(scrape_queue.describe(job)), 409
+    return jsonify(job.result)
+
 @app.route('/fund/<fund_name>')
 def fund_details(fund_name):
-    # Construct expected filename: lowercase, spaces to underscores
-    safe_name = fund_name.lower().replace(' ', '_')
-    # Try to find a matching file in Database
-    db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database')
-    json_path = os.path.join(db_dir, f"{safe_name}.json")
+    # Resolve the fund's JSON through the in-memory index (exact, prefix, substring, fuzzy)
+    json_path = fund_index.index.find(fund_name)
     
     data = None
     
-    # 1. Try exact match
-    if os.path.exists(json_path):
-        with open(json_path, 'r') as f:
-            data = json.load(f)
+    if json_path:
+        data = load_fund_json(fund_name, json_path)
     else:
-        # 2. Try finding a file that *starts with* the safe name (handling suffixes like -gr, -regular, etc.)
-        # or contains the name
-        found_file = None
-        for f_name in os.listdir(db_dir):
-            if f_name.endswith('.json'):
-                if safe_name in f_name.lower():
-                    found_file = os.path.join(db_dir, f_name)
-                    break
-        
-        if found_file:
-            with open(found_file, 'r') as f:
-                data = json.load(f)
-        else:
-            # 3. Fallback to Scraper
-            print(f"Fund '{fund_name}' not found in Database. Scraping...")
-            try:
-                from scraper import scrape_fund_data
-                # We save it to the safe_name to make it easier to find next time
-                data = scrape_fund_data(fund_name, save_to_file=True)
-            except Exception as e:
-                print(f"Error scraping fund: {e}")
-                return f"Error fetching data for {fund_name}: {str(e)}", 500
+        # Scrape in the background (it registers the saved file with the index);
+        # the pending page polls the job and reloads this page once it is done
+        print(f"Fund '{fund_name}' not found in Database. Queueing a scrape...")
+        job = submit_scrape(fund_name)
+        return render_template('scrape_pending.html', fund_name=fund_name, job_id=job.id), 202
 
     if not data:
         return "Fund not found", 404
+    # Forecasts and saved models are keyed by the name the NAV history is loaded under (as in the
+    # compare view), never by the scraped JSON's name: a prefix match may have found another fund
+    model_name = fund_name
 
     # --- NEW: Fetch NAV History & Predictions ---
     nav_data_for_template = None
     
     try:
-        # 1. Check if we already have the NAV CSV
-        # Filename logic from navhistory.py: fund_name_input.replace(' ', '_').replace('/', '_') + ".csv"
-        safe_nav_filename = fund_name.replace(' ', '_').replace('/', '_') + ".csv"
-        nav_db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database/NAV_History')
-        nav_csv_path = os.path.join(nav_db_dir, safe_nav_filename)
-        
-        df_nav = None
-        
-        if os.path.exists(nav_csv_path):
-            print(f"Found existing NAV history: {nav_csv_path}")
-            df_nav = pd.read_csv(nav_csv_path)
-            # Ensure date is datetime
-            df_nav['date'] = pd.to_datetime(df_nav['date'])
-        else:
-            print(f"NAV history not found. Fetching for: {fund_name}")
-            # Fetch fresh
-            df_nav = navhistory.get_regular_plan_history(fund_name)
+        # 1. Load NAV history from the local store (fetched/refreshed only when missing or stale)
+        df_nav = navhistory.get_nav_history(fund_name)
             
         if df_nav is not None and not df_nav.empty:
             # Generate Predictions
             # We need a dataframe with 'NAV' column (uppercase) for the prediction model
-            # The scraper returns 'nav' (lowercase). Let's standardize.
-            df_nav.rename(columns={'nav': 'NAV', 'date': 'Date'}, inplace=True)
-            
-            # Sort by Date ascending for the model (it expects chronological order)
-            df_nav = df_nav.sort_values('Date', ascending=True)
-            
-            # Set index to Date as expected by prediction_models
-            df_nav.set_index('Date', inplace=True)
+            # The store returns 'nav' (lowercase), already date-indexed and sorted ascending.
+            df_nav.rename(columns={'nav': 'NAV'}, inplace=True)
+            df_nav.index.name = 'Date'
             
             # --- RUN PREDICTIONS ---
             # 1. Linear Regression
+            # Forecasts are cached on disk per (fund, input window, model, horizon) and only refit after a new NAV
             recent_data = df_nav.tail(365).copy()
-            pred_linear = prediction_models.predict_nav_linear(recent_data, days=30)
+            pred_linear = forecast_cache.cached_forecast(model_name, 'nav', 'linear', recent_data, 30,
+                                                         prediction_models.get_model('linear'))
             
             # 2. ARIMA
             # Use more history for ARIMA to capture seasonality/trends better if possible
-            pred_arima = prediction_models.predict_nav_arima(df_nav.tail(500), days=30)
+            pred_arima = forecast_cache.cached_forecast(model_name, 'nav', 'arima', df_nav.tail(500), 30,
+                                                        prediction_models.get_model('arima'),
+                                                        model_key=f"{model_name}:nav")
             
             # 3. LSTM
             # LSTM needs scaling and sequence length, handled inside the function
             # It might return None if not enough data
-            pred_lstm = prediction_models.predict_nav_lstm(df_nav.tail(1000), days=30)
+            # The shared cross-fund model is used once global_lstm.py has trained one
+            pred_lstm = None
+            if global_lstm.available():
+                try:
+                    pred_lstm = global_lstm.forecast_funds({model_name: df_nav}, 30).get(model_name, {}).get('nav')
+                except Exception as e:
+                    print(f"Global LSTM forecast failed, using the per-fund model: {e}")
+            if pred_lstm is None:
+                pred_lstm = forecast_cache.cached_forecast(model_name, 'nav', 'lstm', df_nav.tail(1000), 30,
+                                                           prediction_models.get_model('lstm'),
+                                                           model_key=f"{model_name}:nav")
             
             # --- GENERATE CHART ---
             import matplotlib
@@ -182,9 +266,18 @@ def compare_funds():
     try:
         req_data = request.get_json()
         fund_names = req_data.get('funds', [])
+        # Set by the page once the scrape jobs it waited on have finished (some may have failed)
+        allow_missing = req_data.get('allow_missing', False)
         
         if not fund_names or len(fund_names) < 2:
             return jsonify({'error': 'At least 2 funds required'}), 400
+
+        # Scrape every missing fund in the background at once; the page polls the jobs and re-posts
+        if not allow_missing:
+            missing = [f_name for f_name in fund_names if not fund_index.index.find(f_name)]
+            if missing:
+                jobs = [scrape_queue.describe(submit_scrape(f_name)) for f_name in missing]
+                return jsonify({'pending_jobs': jobs}), 202
             
         results = {
             'funds': [],
@@ -195,32 +288,16 @@ def compare_funds():
         }
         
         dfs = {} # Store dataframes for analysis
+        nav_names = {}  # display name -> name the NAV history was loaded under (keys forecasts and models)
         
         # 1. Fetch Data for each fund
         for f_name in fund_names:
             # A. Basic Info (JSON)
-            safe_name = f_name.lower().replace(' ', '_')
-            db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database')
-            
-            # Try finding file
-            json_path = None
-            for existing in os.listdir(db_dir):
-                if existing.lower().startswith(safe_name) and existing.endswith('.json'):
-                    json_path = os.path.join(db_dir, existing)
-                    break
+            json_path = fund_index.index.find(f_name)
             
             fund_data = {}
             if json_path:
-                with open(json_path, 'r') as f:
-                    fund_data = json.load(f)
-            else:
-                # Scrape on the fly if needed (simplified for speed, maybe skip or use basic)
-                # For now, let's assume if not found we might return empty or try to scrape
-                try:
-                    from scraper import scrape_fund_data
-                    fund_data = scrape_fund_data(f_name, save_to_file=True)
-                except:
-                    pass
+                fund_data = load_fund_json(f_name, json_path)
             
             # Extract key metrics
             scheme_details = fund_data.get('scheme_details', {})
@@ -241,23 +318,11 @@ def compare_funds():
             
             # B. NAV History (CSV)
             try:
-                safe_nav_filename = f_name.replace(' ', '_').replace('/', '_') + ".csv"
-                nav_db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database/NAV_History')
-                nav_csv_path = os.path.join(nav_db_dir, safe_nav_filename)
-                
-                df = None
-                if os.path.exists(nav_csv_path):
-                    df = pd.read_csv(nav_csv_path)
-                    df['date'] = pd.to_datetime(df['date'])
-                else:
-                    df = navhistory.get_regular_plan_history(f_name)
-                    if df is not None:
-                        df['date'] = pd.to_datetime(df['date'])
+                df = navhistory.get_nav_history(f_name)
                 
                 if df is not None and not df.empty:
-                    df = df.sort_values('date')
-                    df.set_index('date', inplace=True)
                     dfs[info['name']] = df
+                    nav_names[info['name']] = f_name
             except Exception as e:
                 print(f"Error fetching NAV for {f_name}: {e}")
 
@@ -324,13 +389,56 @@ def compare_funds():
             
             # Track handles/labels for the single legend
             legend_elements = {} 
+
+            # ARIMA/LSTM fits for every fund run concurrently in the model process pool, cheapest first;
+            # linear fits and cache hits are served directly. Fits that miss the deadline are left off the chart
+            fits = model_pool.pool.batch()
+            # With a trained cross-fund LSTM, every fund's LSTM forecasts (NAV and log returns) come from one batched call
+            use_global_lstm = global_lstm.available()
+            if use_global_lstm:
+                fits.global_lstm('global_lstm', {nav_names[name]: df for name, df in dfs.items()}, 30)
+
+            inputs = {}
+            for name, df in dfs.items():
+                if df.empty: continue
+
+                nav_name = nav_names[name]
+                recent = df.tail(365).copy()
+                recent.rename(columns={'nav': 'NAV'}, inplace=True)
+                fits.fit((name, 'nav', 'linear'), nav_name, 'nav', 'linear', recent)
+
+                arima_data = df.tail(500).copy()
+                arima_data.rename(columns={'nav': 'NAV'}, inplace=True)
+                fits.fit((name, 'nav', 'arima'), nav_name, 'nav', 'arima', arima_data, model_key=f"{nav_name}:nav")
+
+                if not use_global_lstm:
+                    lstm_data = df.tail(1000).copy()
+                    lstm_data.rename(columns={'nav': 'NAV'}, inplace=True)
+                    fits.fit((name, 'nav', 'lstm'), nav_name, 'nav', 'lstm', lstm_data, model_key=f"{nav_name}:nav")
+
+                pred_df = None
+                if len(df) > 1:
+                    df_temp = df.copy()
+                    df_temp['log_ret'] = np.log(df_temp['nav'] / df_temp['nav'].shift(1))
+                    df_temp['log_ret'] = df_temp['log_ret'].fillna(0)
+                    df_temp['cum_log_ret'] = df_temp['log_ret'].cumsum()
+
+                    pred_df = pd.DataFrame({'NAV': df_temp['cum_log_ret']}, index=df_temp.index)
+                    fits.fit((name, 'cum_log_ret', 'arima'), nav_name, 'cum_log_ret', 'arima', pred_df.tail(500),
+                             model_key=f"{nav_name}:cum_log_ret")
+                    if not use_global_lstm:
+                        fits.fit((name, 'cum_log_ret', 'lstm'), nav_name, 'cum_log_ret', 'lstm', pred_df.tail(1000),
+                                 model_key=f"{nav_name}:cum_log_ret")
+                inputs[name] = (recent, pred_df)
+
+            preds = fits.gather()
+            global_preds = preds.get('global_lstm', {})
             
             for i, (name, df) in enumerate(dfs.items()):
                 if df.empty: continue
                 
                 color = colors[i % len(colors)]
-                recent = df.tail(365).copy()
-                recent.rename(columns={'nav': 'NAV'}, inplace=True)
+                recent, pred_df = inputs[name]
                 
                 # --- 1. NAV Predictions (ax1) ---
                 # Plot History (Last 60 days)
@@ -343,7 +451,7 @@ def compare_funds():
 
                 # Linear
                 try:
-                    pred_lin = prediction_models.predict_nav_linear(recent, days=30)
+                    pred_lin = preds.get((name, 'nav', 'linear'))
                     if pred_lin:
                         dates = [last_date] + list(pred_lin['future_dates'])
                         pred_vals = pred_lin['future_predictions']
@@ -354,9 +462,7 @@ def compare_funds():
 
                 # ARIMA
                 try:
-                    arima_data = df.tail(500).copy()
-                    arima_data.rename(columns={'nav': 'NAV'}, inplace=True)
-                    pred_arima = prediction_models.predict_nav_arima(arima_data, days=30)
+                    pred_arima = preds.get((name, 'nav', 'arima'))
                     if pred_arima:
                         dates = [last_date] + list(pred_arima['future_dates'])
                         pred_vals = pred_arima['future_predictions']
@@ -367,9 +473,7 @@ def compare_funds():
 
                 # LSTM
                 try:
-                    lstm_data = df.tail(1000).copy()
-                    lstm_data.rename(columns={'nav': 'NAV'}, inplace=True)
-                    pred_lstm = prediction_models.predict_nav_lstm(lstm_data, days=30)
+                    pred_lstm = preds.get((name, 'nav', 'lstm')) or global_preds.get(nav_names[name], {}).get('nav')
                     if pred_lstm:
                         dates = [last_date] + list(pred_lstm['future_dates'])
                         pred_vals = pred_lstm['future_predictions']
@@ -379,14 +483,7 @@ def compare_funds():
                 except: pass
 
                 # --- 2. Log Return Predictions (ax2) ---
-                if len(df) > 1:
-                    df_temp = df.copy()
-                    df_temp['log_ret'] = np.log(df_temp['nav'] / df_temp['nav'].shift(1))
-                    df_temp['log_ret'] = df_temp['log_ret'].fillna(0)
-                    df_temp['cum_log_ret'] = df_temp['log_ret'].cumsum()
-                    
-                    pred_df = pd.DataFrame({'NAV': df_temp['cum_log_ret']}, index=df_temp.index)
-                    
+                if pred_df is not None:
                     history_plot = pred_df.tail(60).copy()
                     rebase_val = history_plot['NAV'].iloc[0]
                     history_plot['NAV'] = history_plot['NAV'] - rebase_val
@@ -398,7 +495,7 @@ def compare_funds():
                     
                     # ARIMA
                     try:
-                        pred_arima = prediction_models.predict_nav_arima(pred_df.tail(500), days=30)
+                        pred_arima = preds.get((name, 'cum_log_ret', 'arima'))
                         if pred_arima:
                             dates = [last_date] + list(pred_arima['future_dates'])
                             pred_vals = pred_arima['future_predictions']
@@ -409,7 +506,7 @@ def compare_funds():
                         
                     # LSTM
                     try:
-                        pred_lstm = prediction_models.predict_nav_lstm(pred_df.tail(1000), days=30)
+                        pred_lstm = preds.get((name, 'cum_log_ret', 'lstm')) or global_preds.get(nav_names[name], {}).get('cum_log_ret')
                         if pred_lstm:
                             dates = [last_date] + list(pred_lstm['future_dates'])
                             pred_vals = pred_lstm['future_predictions']
@@ -618,15 +715,14 @@ def simulate_growth():
         if not fund_name:
             return jsonify({'error': 'Fund name is required'}), 400
         
-        # Use navhistory to fetch NAV data (will use cached CSV or fetch from API)
-        print(f"Fetching NAV history for: {fund_name}")
-        df = navhistory.get_regular_plan_history(fund_name)
+        # Use navhistory to load NAV data (served from the local store, refreshed only when stale)
+        df = navhistory.get_nav_history(fund_name)
         
         if df is None or df.empty:
             return jsonify({'error': f'NAV history not available for {fund_name}'}), 404
         
-        # Ensure data is sorted by date ascending
-        df = df.sort_values('date').reset_index(drop=True)
+        # Store data is already sorted by date ascending; turn the index back into a column
+        df = df.reset_index()
         
         # Filter by duration
         if years > 0:
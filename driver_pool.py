@@ -0,0 +1,164 @@
+"""
+Bounded pool of long-lived WebDriver sessions.
+
+Starting Chrome costs seconds and hundreds of MB, so scrapes check a warm driver out of the
+pool instead of launching their own. Drivers are reset when they come back (via the `reset`
+callback), health-checked before reuse and recycled after `max_uses` scrapes or on any crash.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """No driver became available within the checkout timeout."""
+
+
+class _PooledDriver:
+    __slots__ = ('driver', 'uses', 'created_at')
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    def __init__(self, factory, reset=None, size=2, max_uses=25):
+        """
+        factory() -> new driver (already on the start page).
+        reset(driver) -> returns a used driver to a clean state; may raise to have it recycled.
+        """
+        self.factory = factory
+        self.reset = reset
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = []                  # LIFO: the most recently used driver has the warmest caches
+        self._cond = threading.Condition()
+        self._total = 0                  # live drivers, idle or checked out
+        self._closed = False
+        self.stats_data = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,       # retired after max_uses
+            'crashed': 0,        # failed health check, reset or scrape
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+        }
+
+    # --- lifecycle helpers ---
+
+    def _create(self):
+        try:
+            pooled = _PooledDriver(self.factory())
+        except BaseException:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats_data['created'] += 1
+        return pooled
+
+    def _discard(self, pooled, reason):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self.stats_data[reason] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _healthy(driver):
+        try:
+            driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("driver pool is shut down")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        self._total += 1
+                        pooled = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"no driver available after {timeout:.0f}s")
+                    self._cond.wait(remaining)
+
+            if pooled is None:
+                return self._create()
+            if self._healthy(pooled.driver):
+                return pooled
+            self._discard(pooled, 'crashed')
+
+    def _release(self, pooled, failed):
+        pooled.uses += 1
+        if failed or self._closed:
+            self._discard(pooled, 'crashed' if failed else 'recycled')
+            return
+        if pooled.uses >= self.max_uses:
+            self._discard(pooled, 'recycled')
+            return
+        try:
+            if self.reset:
+                self.reset(pooled.driver)
+        except Exception as e:
+            print(f"Driver reset failed, recycling it: {e}")
+            self._discard(pooled, 'crashed')
+            return
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    # --- public API ---
+
+    @contextmanager
+    def driver(self, timeout=120):
+        """Check a driver out for the duration of the block. Exceptions inside the block retire it."""
+        start = time.perf_counter()
+        pooled = self._acquire(timeout)
+        waited = time.perf_counter() - start
+        with self._cond:
+            self.stats_data['checkouts'] += 1
+            self.stats_data['wait_total'] += waited
+            self.stats_data['wait_max'] = max(self.stats_data['wait_max'], waited)
+
+        failed = False
+        try:
+            yield pooled.driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(pooled, failed)
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled, 'recycled')
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.stats_data)
+            stats['size'] = self.size
+            stats['live'] = self._total
+            stats['idle'] = len(self._idle)
+        stats['in_use'] = stats['live'] - stats['idle']
+        stats['wait_avg'] = stats['wait_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+        return stats
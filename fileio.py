@@ -0,0 +1,54 @@
+"""Small file helpers shared by the NAV store, indexes and scrapers."""
+
+import json
+import os
+import tempfile
+
+
+def atomic_write_bytes(path, payload):
+    """
+    Write `payload` to `path` so readers only ever see the old or the new file.
+    The data goes to a temp file in the same directory which is then renamed over the target.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_with(path, write):
+    """
+    Like atomic_write_bytes for writers that need a file name (e.g. Keras' model.save): `write(tmp_path)`
+    fills a uniquely named temp file next to `path`, which is then renamed over it. The temp name
+    keeps the target's suffix, since some writers pick the format from it.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, data, indent=2):
+    """Atomically dump `data` as UTF-8 JSON to `path`."""
+    payload = json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8')
+    atomic_write_bytes(path, payload)
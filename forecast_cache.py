@@ -0,0 +1,188 @@
+"""
+Disk-backed cache of model forecasts.
+
+A forecast only changes when its input series does, which for NAV data is once a day. Results of
+predict_nav_* calls (forecast arrays, test-set predictions and metrics) are pickled under
+Database/Forecast_Cache, keyed by fund, series, model, horizon, model parameters and a fingerprint
+of the input window (its length, first/last date and last value). A new NAV moves the last date,
+so it naturally misses and refits; repeat views are a file read.
+
+Entries older than FORECAST_CACHE_MAX_AGE seconds are ignored and removed, and the directory is
+trimmed oldest-first to FORECAST_CACHE_MAX_BYTES. The trim scans the directory, so put() runs it at
+most once every FORECAST_CACHE_EVICT_INTERVAL seconds per process rather than on every store.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from fileio import atomic_write_bytes
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database', 'Forecast_Cache')
+MAX_AGE = int(os.environ.get('FORECAST_CACHE_MAX_AGE', str(7 * 24 * 3600)))
+MAX_BYTES = int(os.environ.get('FORECAST_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+EVICT_INTERVAL = float(os.environ.get('FORECAST_CACHE_EVICT_INTERVAL', '60'))
+CACHE_VERSION = 2  # bump when a model's code changes so old forecasts are not served
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'expired': 0, 'evicted': 0, 'errors': 0}
+_last_evict = 0.0
+
+
+def window_fingerprint(data, column='NAV'):
+    """Identifies an input window: length, first/last date and last value."""
+    if data is None or len(data) == 0:
+        return ('empty',)
+    return (len(data), str(data.index[0]), str(data.index[-1]), float(data[column].iloc[-1]))
+
+
+def cache_key(fund, series, model, horizon, data, params=None):
+    raw = repr((CACHE_VERSION, fund, series, model, horizon, sorted((params or {}).items()),
+                window_fingerprint(data)))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, f"{key}.pkl")
+
+
+def _count(name, n=1):
+    with _lock:
+        _stats[name] += n
+
+
+def get(key):
+    """Cached result for `key`, or None on a miss (missing, expired or unreadable)."""
+    path = _path(key)
+    try:
+        age = time.time() - os.path.getmtime(path)
+        if age > MAX_AGE:
+            os.remove(path)
+            _count('expired')
+            _count('misses')
+            return None
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+    except FileNotFoundError:
+        _count('misses')
+        return None
+    except Exception as e:
+        print(f"Forecast cache read failed ({e}); refitting")
+        _count('errors')
+        _count('misses')
+        return None
+    _count('hits')
+    return result
+
+
+def put(key, result):
+    try:
+        atomic_write_bytes(_path(key), pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        _count('stores')
+    except Exception as e:
+        print(f"Forecast cache write failed: {e}")
+        _count('errors')
+        return
+    _maybe_evict()
+
+
+def _maybe_evict():
+    """evict() if the last sweep in this process was at least EVICT_INTERVAL seconds ago."""
+    global _last_evict
+    now = time.monotonic()
+    with _lock:
+        if _last_evict and now - _last_evict < EVICT_INTERVAL:
+            return
+        _last_evict = now
+    evict()
+
+
+def evict(max_age=None, max_bytes=None):
+    """Remove expired entries, then the oldest ones until the cache fits in max_bytes."""
+    max_age = MAX_AGE if max_age is None else max_age
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return
+    now = time.time()
+    entries = []
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.pkl'):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+    expired = [e for e in entries if now - e[0] > max_age]
+    live = sorted(e for e in entries if now - e[0] <= max_age)
+    total = sum(size for _, size, _ in live)
+    over = []
+    while live and total > max_bytes:
+        oldest = live.pop(0)
+        total -= oldest[1]
+        over.append(oldest)
+    for _, _, path in expired + over:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    if expired:
+        _count('expired', len(expired))
+    if over:
+        _count('evicted', len(over))
+
+
+def cached_forecast(fund, series, model, data, horizon, predict, **params):
+    """
+    predict(data, days=horizon, **params) through the cache. `series` names the input series
+    (e.g. 'nav' or 'cum_log_ret') so one fund's NAV and return forecasts do not collide.
+    Failed fits (None) are not cached. A `predict` of None (model disabled) returns None.
+    """
+    if predict is None:
+        return None
+    key = cache_key(fund, series, model, horizon, data, params)
+    result = get(key)
+    if result is not None:
+        return result
+    result = predict(data, days=horizon, **params)
+    if result is not None:
+        put(key, result)
+    return result
+
+
+def counters():
+    """The raw hit/miss/store counters of this process (no directory scan)."""
+    with _lock:
+        return dict(_stats)
+
+
+def add_counts(counts):
+    """Add counter changes made in another process (the model pool workers) to this one's."""
+    with _lock:
+        for name, n in counts.items():
+            if name in _stats:
+                _stats[name] += n
+
+
+def stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    entries = size = 0
+    if os.path.isdir(CACHE_DIR):
+        with os.scandir(CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith('.pkl'):
+                    entries += 1
+                    size += entry.stat().st_size
+    stats['entries'] = entries
+    stats['bytes'] = size
+    return stats
+
+
+def clear():
+    if os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(CACHE_DIR, name))
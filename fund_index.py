@@ -0,0 +1,122 @@
+"""
+In-memory index of the fund-detail JSON files in Database/.
+
+Built once at startup and kept current by the writers (scraper), so request handlers
+resolve a fund name to its JSON file without listing the directory.
+Lookup order: exact filename -> prefix -> substring -> fuzzy (difflib) on normalized names.
+"""
+
+import bisect
+import difflib
+import os
+import re
+import threading
+
+DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database')
+FUZZY_CUTOFF = 0.92  # high on purpose: a near-miss must not show another fund's data
+
+
+def safe_name(fund_name):
+    """Filename stem the scraper uses for a fund: lowercase, spaces to underscores."""
+    return fund_name.lower().replace(' ', '_')
+
+
+def _compact(text):
+    """Punctuation/whitespace-insensitive key used for fuzzy matching."""
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+
+class FundIndex:
+    def __init__(self, db_dir=DB_DIR):
+        self.db_dir = db_dir
+        self._paths = {}      # lowercase stem -> path
+        self._stems = []      # sorted stems for prefix search
+        self._compact = {}    # compact stem -> stem
+        self._resolved = {}   # query -> path, or None for a miss; cleared on every add
+        self._lock = threading.Lock()
+        self.built = False
+
+    def build(self):
+        """(Re)scan Database/ once. This is the only place the directory is listed."""
+        with self._lock:
+            self._paths.clear()
+            self._compact.clear()
+            self._resolved.clear()
+            if os.path.isdir(self.db_dir):
+                with os.scandir(self.db_dir) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.endswith('.json'):
+                            self._insert(entry.path)
+            self._stems = sorted(self._paths)
+            self.built = True
+        return len(self._paths)
+
+    def _insert(self, path):
+        stem = os.path.splitext(os.path.basename(path))[0].lower()
+        self._paths[stem] = path
+        self._compact[_compact(stem)] = stem
+        return stem
+
+    def add(self, path):
+        """Register a newly written fund JSON (called by writers after saving)."""
+        with self._lock:
+            stem = self._insert(path)
+            index = bisect.bisect_left(self._stems, stem)
+            if index == len(self._stems) or self._stems[index] != stem:
+                self._stems.insert(index, stem)
+            self._resolved.clear()
+
+    def path_for(self, fund_name):
+        """Where the scraper writes this fund's JSON."""
+        return os.path.join(self.db_dir, f"{safe_name(fund_name)}.json")
+
+    def find(self, fund_name):
+        """Return the JSON path for a fund name, or None if no file matches."""
+        if not self.built:
+            self.build()
+        query = safe_name(fund_name)
+        with self._lock:
+            if query in self._resolved:
+                path = self._resolved[query]
+            else:
+                # Misses are remembered too, so repeated unknown names skip the substring/fuzzy scan
+                path = self._resolved[query] = self._lookup(query)
+        if path is None:
+            # Written by another process (e.g. the batch scraper) since the index was built.
+            # One stat per miss; add() then clears the cached misses
+            exact = self.path_for(fund_name)
+            if os.path.exists(exact):
+                self.add(exact)
+                path = exact
+        return path
+
+    def _lookup(self, query):
+        # 1. Exact
+        if query in self._paths:
+            return self._paths[query]
+
+        # 2. Prefix (handles suffixes like -gr, -regular, etc.)
+        index = bisect.bisect_left(self._stems, query)
+        if index < len(self._stems) and self._stems[index].startswith(query):
+            return self._paths[self._stems[index]]
+
+        # 3. Substring
+        for stem in self._stems:
+            if query in stem:
+                return self._paths[stem]
+
+        # 4. Fuzzy on punctuation-insensitive names
+        compact_query = _compact(query)
+        if compact_query in self._compact:
+            return self._paths[self._compact[compact_query]]
+        matches = difflib.get_close_matches(compact_query, list(self._compact), n=1, cutoff=FUZZY_CUTOFF)
+        if matches:
+            return self._paths[self._compact[matches[0]]]
+        return None
+
+    def __len__(self):
+        return len(self._paths)
+
+
+# Process-wide index shared by the app and the scraper
+index = FundIndex()
@@ -0,0 +1,94 @@
+"""
+Per-section freshness of the scraped fund JSON.
+
+Every section of a fund's JSON records when it was scraped (`_fetched_at`), and each extraction
+phase has its own TTL: NAV and AUM move daily, holdings monthly, managers and documents rarely.
+A refresh re-runs only the phases whose sections have expired, so keeping a fund current does
+not cost a full scrape with portfolio pagination every time.
+
+TTLs can be overridden per phase with SCRAPE_TTL_<PHASE> (seconds), e.g. SCRAPE_TTL_PORTFOLIO=86400.
+"""
+
+import os
+import time
+
+FETCHED_AT_KEY = "_fetched_at"
+
+# Extraction phase (scraper.EXTRACTION_PHASES) -> final_data sections it fills
+PHASE_SECTIONS = {
+    "basic info": ["basic_info"],
+    "scheme details": ["scheme_details"],
+    "fund managers": ["fund_managers"],
+    "progress sections": ["top_holdings", "sector_holdings", "asset_allocation", "top_asset_type", "credit_profile"],
+    "performance tables": ["performance_lumpsum", "performance_sip"],
+    "documents": ["documents"],
+    "portfolio": ["portfolio_summary", "portfolio_holdings"],
+}
+
+DAY = 24 * 3600
+DEFAULT_TTLS = {
+    "basic info": DAY,              # NAV, AUM
+    "scheme details": DAY,          # AUM, expense ratio
+    "performance tables": DAY,
+    "progress sections": 7 * DAY,   # derived from the monthly portfolio disclosure
+    "portfolio": 7 * DAY,
+    "fund managers": 30 * DAY,
+    "documents": 30 * DAY,
+}
+
+
+def _env_name(phase):
+    return "SCRAPE_TTL_" + phase.upper().replace(" ", "_")
+
+
+PHASE_TTLS = {phase: int(os.environ.get(_env_name(phase), ttl)) for phase, ttl in DEFAULT_TTLS.items()}
+
+
+def _has_data(value):
+    if isinstance(value, dict) and value and all(isinstance(v, list) for v in value.values()):
+        return any(value.values())   # portfolio_holdings: {category: rows}
+    return bool(value)
+
+
+def stamp(final_data, phases=None, now=None):
+    """Record `now` as the fetch time of every non-empty section the given phases (default: all) filled."""
+    now = time.time() if now is None else now
+    fetched_at = final_data.setdefault(FETCHED_AT_KEY, {})
+    for phase in (phases or PHASE_SECTIONS):
+        for section in PHASE_SECTIONS[phase]:
+            if _has_data(final_data.get(section)):
+                fetched_at[section] = now
+    return final_data
+
+
+def expired_phases(final_data, fallback_time=None, now=None):
+    """
+    Phases with at least one section past its TTL, in extraction order.
+    Sections without a timestamp (JSON written before timestamps existed, or a section that came
+    back empty) count as fetched at `fallback_time` (e.g. the file's mtime), or as expired if None.
+    """
+    now = time.time() if now is None else now
+    fetched_at = final_data.get(FETCHED_AT_KEY, {})
+    expired = []
+    for phase, sections in PHASE_SECTIONS.items():
+        for section in sections:
+            fetched = fetched_at.get(section, fallback_time)
+            if fetched is None or now - fetched > PHASE_TTLS[phase]:
+                expired.append(phase)
+                break
+    return expired
+
+
+def merge(base, fresh, phases):
+    """
+    Copy the sections of `phases` from a partial scrape into the stored data and stamp them.
+    A section that came back empty keeps its old value and old timestamp, so it is retried next time.
+    """
+    now = time.time()
+    fetched_at = base.setdefault(FETCHED_AT_KEY, {})
+    for phase in phases:
+        for section in PHASE_SECTIONS[phase]:
+            if _has_data(fresh.get(section)):
+                base[section] = fresh[section]
+                fetched_at[section] = now
+    return base
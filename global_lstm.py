@@ -0,0 +1,320 @@
+"""
+Global cross-fund LSTM.
+
+Instead of one LSTM per fund, `train` fits a single model on every stored NAV series at once.
+Each fund's daily log returns are standardised by that fund's own mean and standard deviation,
+so one model can learn from funds with very different NAV levels and volatilities. By default those
+statistics come from the same newest SERVING_HISTORY NAVs that serving looks at, and the training
+job saves them per fund in the model metadata; serving standardises with the saved statistics
+when it has them, so a fund's inputs are scaled the way the model saw them in training. All series are
+joined into one float32 array and training windows are only indexed by their start offset,
+restricted so that no window spans two funds. They are gathered from the joined array batch by
+batch on the TensorFlow side, so no window is materialised ahead of its batch. The newest windows of each fund are held out for validation, so validation
+measures forecasting forward in time rather than windows that overlap the training ones.
+
+At serving time forecast_funds() runs one batched inference (test windows are not needed, only
+the horizon) for every requested fund, and returns both the NAV and the cumulative log-return
+forecasts from the same predicted returns.
+
+Usage:
+    python global_lstm.py train                       # every fund with stored NAV history
+    python global_lstm.py train --epochs 3 --batch-size 2048 --match "Axis"
+    python global_lstm.py predict "Fund A" "Fund B"
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import forecast_cache
+import navhistory
+import navstore
+import prediction_models
+from fileio import atomic_write_json, atomic_write_with
+
+MODEL_DIR = os.path.join(prediction_models.LSTM_MODEL_DIR, '_global')
+MODEL_PATH = os.path.join(MODEL_DIR, 'model.keras')
+META_PATH = os.path.join(MODEL_DIR, 'meta.json')
+
+SEQUENCE_LENGTH = 60
+SERVING_HISTORY = 1000          # newest NAVs per fund used for return statistics, in training and serving
+EPOCHS = 5
+BATCH_SIZE = int(os.environ.get('GLOBAL_LSTM_BATCH_SIZE', '1024'))
+VALIDATION_FRACTION = 0.05      # newest share of each fund's windows held out for validation
+# Serve LSTM forecasts from the global model once one has been trained (0 = keep per-fund LSTMs)
+SERVING = os.environ.get('GLOBAL_LSTM', '1') != '0'
+
+_model_lock = threading.Lock()
+_loaded = {'model': None, 'mtime': None, 'meta': None}
+_rollout_fns = {}               # days -> compiled rollout for the loaded model
+
+
+# --- DATASET ---
+def normalized_returns(navs, stats=None):
+    """
+    Daily log returns of `navs`, standardised per fund by `stats` (mean, std) or, if None, by their
+    own mean and std. Returns (z as float32, mean, std).
+    """
+    navs = np.asarray(navs, dtype=np.float64)
+    navs = navs[navs > 0]
+    returns = np.diff(np.log(navs))
+    if len(returns) == 0:
+        return np.empty(0, dtype=np.float32), 0.0, 1.0
+    if stats is not None:
+        mean, std = float(stats[0]), float(stats[1])
+    else:
+        mean, std = float(returns.mean()), float(returns.std())
+    if not np.isfinite(std) or std == 0:
+        std = 1.0
+    return ((returns - mean) / std).astype(np.float32), mean, std
+
+
+def build_windows(series, sequence_length=SEQUENCE_LENGTH, validation_fraction=0.0):
+    """
+    Join per-fund return series and index their training windows.
+    Returns (joined, train_starts, val_starts): window i is joined[i:i + sequence_length + 1]
+    (inputs, then target); the starts list the windows that lie entirely within one fund, the
+    newest `validation_fraction` of each fund's windows in `val_starts`.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    joined = np.concatenate(series) if series else np.empty(0, dtype=np.float32)
+    if len(joined) <= sequence_length:
+        return joined, empty, empty
+    train_starts, val_starts, offset = [], [], 0
+    for z in series:
+        count = len(z) - sequence_length
+        if count > 0:
+            # Time order within the fund: every training target precedes every validation target
+            split = offset + count - int(count * validation_fraction)
+            train_starts.append(np.arange(offset, split, dtype=np.int64))
+            val_starts.append(np.arange(split, offset + count, dtype=np.int64))
+        offset += len(z)
+    return (joined, np.concatenate(train_starts) if train_starts else empty,
+            np.concatenate(val_starts) if val_starts else empty)
+
+
+def load_series(fund_names, history=SERVING_HISTORY):
+    """
+    ({fund: standardised returns}, {fund: [mean, std]}) for every fund with stored NAV history,
+    over its newest `history` NAVs (all of them if 0/None).
+    """
+    series, stats = {}, {}
+    for name in fund_names:
+        arrays = navstore.load_arrays(name)
+        if arrays is None:
+            continue
+        navs = arrays[1] if not history else arrays[1][-history:]
+        z, mean, std = normalized_returns(navs)
+        if len(z) > SEQUENCE_LENGTH:
+            series[name] = z
+            stats[name] = [mean, std]
+    return series, stats
+
+
+def _dataset(joined, starts, batch_size, shuffle):
+    """tf.data pipeline gathering (inputs, target) batches from `joined` for the given window starts."""
+    import tensorflow as tf
+
+    joined_t = tf.constant(joined)
+    offsets = tf.range(SEQUENCE_LENGTH + 1, dtype=tf.int64)
+
+    def gather(batch_starts):
+        windows = tf.gather(joined_t, batch_starts[:, None] + offsets)
+        return windows[:, :-1, None], windows[:, -1]
+
+    ds = tf.data.Dataset.from_tensor_slices(starts)
+    if shuffle:
+        ds = ds.shuffle(min(len(starts), 1_000_000), reshuffle_each_iteration=True)
+    return ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+# --- TRAINING ---
+def train(fund_names, epochs=EPOCHS, batch_size=BATCH_SIZE, history=SERVING_HISTORY):
+    """Train the shared model on every fund in `fund_names` with stored history and save it."""
+    start = time.perf_counter()
+    series, fund_stats = load_series(fund_names, history)
+    joined, train_starts, val_starts = build_windows(list(series.values()),
+                                                     validation_fraction=VALIDATION_FRACTION)
+    load_seconds = time.perf_counter() - start
+    if len(train_starts) == 0:
+        print("✗ No stored NAV series long enough to train on (run prefetch.py first)")
+        return None
+    n_val = len(val_starts)
+    print(f"✓ {len(series)} funds, {len(train_starts) + n_val:,} windows ({joined.nbytes / 1e6:.1f} MB "
+          f"joined series) in {load_seconds:.1f} s")
+
+    model = prediction_models.build_lstm_model(SEQUENCE_LENGTH)
+    train_ds = _dataset(joined, train_starts, batch_size, shuffle=True)
+    val_ds = _dataset(joined, val_starts, batch_size, shuffle=False) if n_val else None
+
+    fit_start = time.perf_counter()
+    fit_history = model.fit(train_ds, validation_data=val_ds, epochs=epochs, verbose=2)
+    fit_seconds = time.perf_counter() - fit_start
+    rate = len(train_starts) * epochs / fit_seconds if fit_seconds > 0 else 0.0
+
+    atomic_write_with(MODEL_PATH, model.save)
+    meta = {
+        'trained_at': time.time(),
+        'funds': len(series),
+        'windows': int(len(train_starts)),
+        'epochs': epochs,
+        'batch_size': batch_size,
+        'sequence_length': SEQUENCE_LENGTH,
+        'history': history or None,
+        'loss': float(fit_history.history['loss'][-1]),
+        'val_loss': float(fit_history.history['val_loss'][-1]) if 'val_loss' in fit_history.history else None,
+        'windows_per_sec': rate,
+        'fund_stats': fund_stats,   # fund -> [mean, std] of the daily log returns it was trained on
+    }
+    atomic_write_json(META_PATH, meta)
+
+    print("\n" + "=" * 50)
+    print("GLOBAL LSTM TRAINING SUMMARY")
+    print("=" * 50)
+    print(f"Funds           : {len(series)}")
+    print(f"Train windows   : {len(train_starts):,} ({n_val:,} validation)")
+    print(f"Epochs x batch  : {epochs} x {batch_size}")
+    print(f"Training time   : {fit_seconds:.1f} s")
+    print(f"Throughput      : {rate:,.0f} windows/s")
+    val_loss = f"{meta['val_loss']:.4f}" if meta['val_loss'] is not None else "-"
+    print(f"Loss / val loss : {meta['loss']:.4f} / {val_loss}")
+    print(f"Saved to        : {MODEL_PATH}")
+    return meta
+
+
+# --- SERVING ---
+def available():
+    """True if LSTM forecasts should come from the global model (enabled, and a model is saved)."""
+    return SERVING and prediction_models.is_enabled('lstm') and os.path.exists(MODEL_PATH)
+
+
+def load_model():
+    """The saved model and its metadata, reloaded when the training job has replaced it."""
+    from tensorflow import keras
+
+    mtime = os.path.getmtime(MODEL_PATH)
+    with _model_lock:
+        if _loaded['mtime'] != mtime:
+            with open(META_PATH, 'r') as f:
+                meta = json.load(f)
+            _loaded.update(model=keras.models.load_model(MODEL_PATH), mtime=mtime, meta=meta)
+            _rollout_fns.clear()
+        return _loaded['model'], _loaded['meta']
+
+
+def _rollout(model, days):
+    """Compiled `days`-step autoregressive forecast for a whole batch of windows: (n, L, 1) -> (n, days)."""
+    import tensorflow as tf
+
+    @tf.function(reduce_retracing=True)
+    def rollout(windows):
+        sequence = windows
+        steps = tf.TensorArray(tf.float32, size=days)
+        for i in tf.range(days):
+            step = model(sequence, training=False)
+            steps = steps.write(i, step[:, 0])
+            sequence = tf.concat([sequence[:, 1:, :], step[:, :, None]], axis=1)
+        return tf.transpose(steps.stack())
+    return rollout
+
+
+def _nav_column(df):
+    return df['NAV'] if 'NAV' in df.columns else df['nav']
+
+
+def forecast_funds(frames, days=30):
+    """
+    {fund: {'nav': forecast, 'cum_log_ret': forecast}} for every date-indexed frame in `frames`
+    ('nav' or 'NAV' column) with enough history. A forecast has 'future_predictions' and
+    'future_dates', like prediction_models.predict_nav_*; 'cum_log_ret' continues the cumulative
+    log return measured from the frame's first NAV. Results are cached per fund in forecast_cache;
+    the funds that miss are forecast together in one batched call.
+    """
+    import tensorflow as tf
+
+    model, meta = load_model()
+    fund_stats = meta.get('fund_stats', {})
+    results, pending = {}, []
+    for name, df in frames.items():
+        nav = _nav_column(df)
+        data = pd.DataFrame({'NAV': nav.values[-SERVING_HISTORY:]}, index=nav.index[-SERVING_HISTORY:])
+        key = forecast_cache.cache_key(name, 'nav+cum_log_ret', 'global_lstm', days, data,
+                                       {'trained_at': meta['trained_at']})
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            results[name] = cached
+            continue
+        # Funds the model was not trained on use their own serving window, as training does by default
+        z, mean, std = normalized_returns(data['NAV'].values, fund_stats.get(name))
+        if len(z) < SEQUENCE_LENGTH:
+            continue
+        pending.append((name, key, nav, data, z, mean, std))
+
+    if pending:
+        windows = np.stack([p[4][-SEQUENCE_LENGTH:] for p in pending])[:, :, None]
+        if days not in _rollout_fns:
+            _rollout_fns[days] = _rollout(model, days)
+        steps = _rollout_fns[days](tf.constant(windows)).numpy()
+
+        for (name, key, nav, data, _, mean, std), z_future in zip(pending, steps):
+            log_returns = np.cumsum(z_future.astype(np.float64) * std + mean)
+            future_dates = pd.date_range(start=data.index[-1] + timedelta(days=1), periods=days, freq='D')
+            result = {
+                'nav': {'future_predictions': data['NAV'].values[-1] * np.exp(log_returns),
+                        'future_dates': future_dates},
+                'cum_log_ret': {'future_predictions': np.log(nav.values[-1] / nav.values[0]) + log_returns,
+                                'future_dates': future_dates},
+            }
+            forecast_cache.put(key, result)
+            results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or query the global cross-fund LSTM")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    train_cmd = sub.add_parser('train', help="train on every fund with stored NAV history")
+    train_cmd.add_argument('--epochs', type=int, default=EPOCHS)
+    train_cmd.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    train_cmd.add_argument('--history', type=int, default=SERVING_HISTORY,
+                           help=f"newest N NAVs per fund (default: {SERVING_HISTORY}, as served; 0 = all)")
+    train_cmd.add_argument('--match', help="only funds whose name contains this text (case-insensitive)")
+    train_cmd.add_argument('--limit', type=int, help="only the first N funds")
+
+    predict_cmd = sub.add_parser('predict', help="forecast the given funds in one batch")
+    predict_cmd.add_argument('funds', nargs='+')
+    predict_cmd.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        fund_names = navhistory.load_fund_names()
+        if args.match:
+            fund_names = [f for f in fund_names if args.match.lower() in f.lower()]
+        if args.limit:
+            fund_names = fund_names[:args.limit]
+        train(fund_names, epochs=args.epochs, batch_size=args.batch_size, history=args.history)
+    else:
+        frames = {}
+        for name in args.funds:
+            df = navhistory.get_nav_history(name)
+            if df is None or df.empty:
+                print(f"✗ No NAV history for {name}")
+            else:
+                frames[name] = df
+        start = time.perf_counter()
+        forecasts = forecast_funds(frames, args.days)
+        print(f"Forecast {len(forecasts)} fund(s) in {(time.perf_counter() - start) * 1e3:.0f} ms")
+        for name, forecast in forecasts.items():
+            nav = forecast['nav']
+            print(f"  {name}: {nav['future_dates'][-1].date()} NAV {nav['future_predictions'][-1]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
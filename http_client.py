@@ -0,0 +1,202 @@
+"""
+Shared HTTP client for upstream APIs (mfapi).
+
+One pooled requests.Session is reused by every caller so connections stay alive between
+fetches. Every call has a timeout and failed calls are retried with bounded exponential backoff.
+Latency/retry counters are kept for the summary printed by bulk jobs.
+"""
+
+import random
+import sys
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- CONFIGURATION ---
+DEFAULT_TIMEOUT = (5, 30)      # (connect, read) seconds
+MAX_RETRIES = 3                # retries after the first attempt
+BACKOFF_BASE = 0.5             # seconds; doubled on every retry
+BACKOFF_MAX = 8.0
+POOL_SIZE = 32                 # keep-alive connections per host
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "RAPS-Wealth/1.0"
+# ---------------------
+
+_session = None
+_session_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,      # logical calls to get()
+    'attempts': 0,      # HTTP attempts including retries
+    'retries': 0,
+    'failures': 0,      # calls that gave up
+    'total_latency': 0.0,
+    'max_latency': 0.0,
+}
+
+
+def get_session():
+    """The process-wide pooled session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                _session = session
+    return _session
+
+
+def _record(key, value=1):
+    with _stats_lock:
+        _stats[key] += value
+
+
+def _backoff_delay(attempt, response=None):
+    """Exponential backoff with jitter; honours Retry-After when the server sends one."""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    return delay * (0.5 + random.random() / 2)
+
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES):
+    """
+    GET `url` through the shared session.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to `retries` times.
+    Any other response (including 304 and 4xx) is returned as is for the caller to inspect.
+    Raises the last requests exception if every attempt failed to connect.
+    """
+    _record('requests')
+    session = get_session()
+    start = time.perf_counter()
+    try:
+        for attempt in range(retries + 1):
+            _record('attempts')
+            response = None
+            try:
+                response = session.get(url, params=params, headers=headers, timeout=timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                if attempt == retries:
+                    _record('failures')
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    _record('failures')
+                    raise
+            _record('retries')
+            time.sleep(_backoff_delay(attempt, response))
+    finally:
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            _stats['total_latency'] += elapsed
+            _stats['max_latency'] = max(_stats['max_latency'], elapsed)
+
+
+def get_json(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES):
+    """GET and decode JSON, raising for non-2xx responses."""
+    response = get(url, params=params, headers=headers, timeout=timeout, retries=retries)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_stats():
+    """Snapshot of the client counters, with average latency per logical request."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['avg_latency'] = stats['total_latency'] / stats['requests'] if stats['requests'] else 0.0
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0.0 if isinstance(_stats[key], float) else 0
+
+
+def format_stats():
+    stats = get_stats()
+    return (f"HTTP: {stats['requests']} requests, {stats['attempts']} attempts, "
+            f"{stats['retries']} retries, {stats['failures']} failures, "
+            f"avg {stats['avg_latency'] * 1000:.0f} ms, max {stats['max_latency'] * 1000:.0f} ms")
+
+
+# --- LOCAL STAND-IN SERVER ---
+
+def start_stub_server(routes):
+    """
+    Serve canned responses on 127.0.0.1 for exercising the client without the network.
+
+    `routes` maps a path to a list of (status, body, delay_seconds) tuples that are served in
+    order; the last one repeats. Returns (base_url, server); call server.shutdown() when done.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    served = {path: 0 for path in routes}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path not in routes:
+                self.send_response(404)
+                self.end_headers()
+                return
+            responses = routes[path]
+            status, body, delay = responses[min(served[path], len(responses) - 1)]
+            served[path] += 1
+            if delay:
+                time.sleep(delay)
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def _selftest():
+    base_url, server = start_stub_server({
+        '/ok': [(200, {'status': 'ok'}, 0)],
+        '/flaky': [(503, {}, 0), (502, {}, 0), (200, {'status': 'recovered'}, 0)],
+        '/slow': [(200, {}, 2)],
+    })
+    global BACKOFF_BASE
+    BACKOFF_BASE = 0.01
+    try:
+        assert get_json(f"{base_url}/ok") == {'status': 'ok'}
+        print("✓ keep-alive GET")
+        assert get_json(f"{base_url}/flaky") == {'status': 'recovered'}
+        print("✓ retried 5xx responses until success")
+        try:
+            get(f"{base_url}/slow", timeout=0.2, retries=1)
+            raise AssertionError("slow endpoint did not time out")
+        except requests.Timeout:
+            print("✓ read timeout enforced")
+        print(format_stats())
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    # python http_client.py selftest -> exercise pooling, retries and timeouts against a local stub
+    if len(sys.argv) > 1 and sys.argv[1] == 'selftest':
+        _selftest()
+    else:
+        print(format_stats())
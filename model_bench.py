@@ -0,0 +1,211 @@
+"""
+Benchmarks for the forecasting models.
+
+`rollout` times the LSTM forecast step (test-set predictions plus the 30-day horizon) in both
+modes of prediction_models.lstm_forecast: 'loop' (one model.predict per forecast day) and 'graph'
+(one compiled call for the test set and the whole horizon). The first call of each mode is
+reported separately since it includes tracing/compilation.
+
+`arima` times predict_nav_arima on the same fund three ways: a cold fit, a warm-started re-fit
+from the saved parameters, and an extension by a few new points with the saved parameters.
+
+`startup` imports app.py in fresh interpreters and reports import time, peak RSS and which model
+backends got loaded. 'lazy' is the app as it is; 'eager' first imports what prediction_models used
+to import at module load (sklearn, tensorflow/keras, streamlit), i.e. the startup cost before the
+model registry.
+
+Usage:
+    python model_bench.py rollout --repeat 20 --days 30
+    python model_bench.py arima --repeat 5
+    python model_bench.py startup --repeat 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+SEQUENCE_LENGTH = 60
+
+EAGER_IMPORTS = ("sklearn.linear_model", "sklearn.model_selection", "sklearn.preprocessing",
+                 "tensorflow", "tensorflow.keras.models", "tensorflow.keras.layers", "streamlit")
+BACKEND_MODULES = ("sklearn", "statsmodels", "tensorflow", "streamlit")
+
+# Run in a child interpreter: import the eager set (if any), then app; print one JSON line
+STARTUP_PROBE = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+missing = []
+for name in {eager!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        missing.append(name)
+import app
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KiB on Linux
+print(json.dumps({{'seconds': elapsed, 'rss_mb': rss_kb / 1024, 'missing': missing,
+                  'loaded': [m for m in {backends!r} if m in sys.modules]}}))
+"""
+
+
+def synthetic_nav(points=1000, seed=0):
+    """A NAV-like geometric random walk (the model does not need to be good to be timed)."""
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.01, points)))
+
+
+def bench_rollout(repeat=20, days=30, points=1000, modes=("loop", "graph")):
+    import prediction_models
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaled = MinMaxScaler().fit_transform(synthetic_nav(points).reshape(-1, 1))
+    X = np.array([scaled[i - SEQUENCE_LENGTH:i, 0] for i in range(SEQUENCE_LENGTH, len(scaled))])
+    X = X.reshape(X.shape[0], SEQUENCE_LENGTH, 1)
+    X_test = X[int(len(X) * 0.8):]
+    last_sequence = scaled[-SEQUENCE_LENGTH:]
+
+    model = prediction_models.build_lstm_model(SEQUENCE_LENGTH)
+    model.fit(X[:256], scaled[SEQUENCE_LENGTH:SEQUENCE_LENGTH + 256, 0], epochs=1, batch_size=32, verbose=0)
+
+    results = {}
+    for mode in modes:
+        start = time.perf_counter()
+        first_pred, first_horizon = prediction_models.lstm_forecast(model, X_test, last_sequence, days, mode)
+        first = time.perf_counter() - start
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            prediction_models.lstm_forecast(model, X_test, last_sequence, days, mode)
+            samples.append(time.perf_counter() - start)
+        results[mode] = {'first': first, 'samples': samples, 'horizon': first_horizon.flatten()}
+
+    print(f"\nLSTM forecast ({len(X_test)} test windows + {days}-day horizon, {repeat} runs)")
+    print(f"{'Mode':<8} {'first ms':>10} {'mean ms':>10} {'p50 ms':>10} {'max ms':>10}")
+    for mode, r in results.items():
+        ms = [s * 1e3 for s in r['samples']]
+        print(f"{mode:<8} {r['first'] * 1e3:>10.1f} {statistics.mean(ms):>10.1f} "
+              f"{statistics.median(ms):>10.1f} {max(ms):>10.1f}")
+    if 'loop' in results and 'graph' in results:
+        speedup = statistics.median(results['loop']['samples']) / statistics.median(results['graph']['samples'])
+        drift = float(np.max(np.abs(results['loop']['horizon'] - results['graph']['horizon'])))
+        print(f"Speedup (p50): {speedup:.1f}x, max horizon difference: {drift:.2e}")
+    return results
+
+
+def bench_arima(repeat=5, points=500, new_points=3):
+    import prediction_models
+
+    nav = synthetic_nav(points + new_points)
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=len(nav), freq='D')
+    full = pd.DataFrame({'NAV': nav}, index=dates)
+    before, after = full.iloc[:-new_points], full.iloc[-points:]
+    key = "model_bench:arima"
+
+    def timed(data, setup):
+        samples = []
+        for _ in range(repeat):
+            setup()
+            start = time.perf_counter()
+            prediction_models.predict_nav_arima(data, model_key=key)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    def forget():
+        prediction_models._arima_params.pop(key, None)
+        try:
+            os.remove(prediction_models._arima_path(key))
+        except OSError:
+            pass
+
+    def saved(fitted_at):
+        def setup():
+            forget()
+            prediction_models.predict_nav_arima(before, model_key=key)
+            # Same dict as the in-memory copy, which stays valid while the file is unchanged
+            prediction_models.load_arima_state(key)['fitted_at'] = fitted_at
+        return setup
+
+    results = {
+        'cold fit': timed(after, forget),
+        'warm fit': timed(after, saved(0)),           # saved parameters too old: re-estimated from them
+        'extend': timed(after, saved(time.time())),   # recent parameters: filtered over the new points
+    }
+    forget()
+
+    print(f"\nARIMA{prediction_models.ARIMA_ORDER} on {points} daily points, {new_points} new ({repeat} runs)")
+    print(f"{'Mode':<10} {'mean ms':>10} {'p50 ms':>10}")
+    for mode, samples in results.items():
+        ms = [s * 1e3 for s in samples]
+        print(f"{mode:<10} {statistics.mean(ms):>10.1f} {statistics.median(ms):>10.1f}")
+    return results
+
+
+def _probe_startup(eager):
+    code = STARTUP_PROBE.format(eager=EAGER_IMPORTS if eager else (), backends=BACKEND_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(repeat=3, modes=("eager", "lazy")):
+    results = {}
+    for mode in modes:
+        runs = []
+        for _ in range(repeat):
+            try:
+                runs.append(_probe_startup(mode == "eager"))
+            except RuntimeError as e:
+                print(f"✗ {mode}: {e}")
+                break
+        if runs:
+            results[mode] = runs
+
+    print(f"\napp.py import ({repeat} fresh interpreter(s) per mode)")
+    print(f"{'Mode':<8} {'mean s':>8} {'p50 s':>8} {'RSS MB':>8}  backends loaded")
+    for mode, runs in results.items():
+        seconds = [r['seconds'] for r in runs]
+        rss = max(r['rss_mb'] for r in runs)
+        loaded = ", ".join(runs[0]['loaded']) or "-"
+        print(f"{mode:<8} {statistics.mean(seconds):>8.2f} {statistics.median(seconds):>8.2f} {rss:>8.0f}  {loaded}")
+        if runs[0]['missing']:
+            print(f"         (not installed: {', '.join(runs[0]['missing'])})")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the forecasting models")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rollout_cmd = sub.add_parser('rollout', help="time LSTM test-set + horizon prediction, loop vs graph")
+    rollout_cmd.add_argument('--repeat', type=int, default=20)
+    rollout_cmd.add_argument('--days', type=int, default=30)
+    rollout_cmd.add_argument('--points', type=int, default=1000, help="length of the synthetic NAV series")
+
+    arima_cmd = sub.add_parser('arima', help="time cold vs warm-started vs extended ARIMA fits")
+    arima_cmd.add_argument('--repeat', type=int, default=5)
+    arima_cmd.add_argument('--points', type=int, default=500)
+    arima_cmd.add_argument('--new-points', type=int, default=3)
+
+    startup_cmd = sub.add_parser('startup', help="time and measure RSS of importing app.py, eager vs lazy backends")
+    startup_cmd.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == 'rollout':
+        bench_rollout(args.repeat, args.days, args.points)
+    elif args.command == 'arima':
+        bench_arima(args.repeat, args.points, args.new_points)
+    else:
+        bench_startup(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
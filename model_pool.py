@@ -0,0 +1,284 @@
+"""
+Persistent process pool for model fits.
+
+ARIMA and LSTM fits are CPU-bound, so running a comparison's fits one after another in the
+request thread makes the request as slow as all of them together. A FitBatch sends every fit of
+one request to a long-lived pool of worker processes, which run them concurrently, and gathers
+the results with a deadline. A fit that is not done by then is left out of the result instead of
+holding up the response; if it had already started it keeps running and writes its forecast to
+forecast_cache, so the next request gets it. Forecast cache hits are resolved in the web process and never go to the pool.
+A fit whose cache key is already queued or running for another request is joined, not submitted again.
+
+Linear regressions take milliseconds and run in the web process. The pool fits are submitted when
+the batch is gathered, cheapest model first (ARIMA before LSTM), so one fund's LSTM does not hold
+up another fund's ARIMA.
+
+Workers are started with 'spawn', so they do not inherit the Flask process's threads. They
+import the model backends (TensorFlow included) only when a fit needs them.
+
+    MODEL_POOL_WORKERS     worker processes (default: CPU count, at most 4)
+    COMPARE_FIT_DEADLINE   seconds a comparison waits for its fits (default 20)
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import forecast_cache
+import global_lstm
+import prediction_models
+
+MODEL_POOL_WORKERS = int(os.environ.get('MODEL_POOL_WORKERS', str(min(4, os.cpu_count() or 1))))
+COMPARE_FIT_DEADLINE = float(os.environ.get('COMPARE_FIT_DEADLINE', '20'))
+
+INLINE_MODELS = ('linear',)                     # fitted in the web process, never queued
+SUBMIT_ORDER = {'arima': 0, 'global_lstm': 1, 'lstm': 2}   # pool fits, cheapest first
+
+
+# --- WORKER SIDE ---
+def _init_worker(threads):
+    # Split the cores between workers instead of every TensorFlow runtime using all of them
+    os.environ.setdefault('TF_NUM_INTRAOP_THREADS', str(threads))
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+
+# Worker tasks return (result, counter changes of this task), so /api/stats can add up the ARIMA
+# and forecast cache counters of every worker process and not only the web process's own.
+def _counters():
+    return {'arima_fits': prediction_models.arima_stats(), 'forecast_cache': forecast_cache.counters()}
+
+
+def _delta(before):
+    after = _counters()
+    return {group: {name: n - before[group].get(name, 0) for name, n in values.items()
+                    if n != before[group].get(name, 0)}
+            for group, values in after.items()}
+
+
+def _fit(key, model, data, horizon, params):
+    predict = prediction_models.get_model(model)
+    if predict is None:
+        return None, {}
+    before = _counters()
+    result = predict(data, days=horizon, **params)
+    if result is not None:
+        forecast_cache.put(key, result)
+    return result, _delta(before)
+
+
+def _global_lstm(frames, horizon):
+    before = _counters()
+    return global_lstm.forecast_funds(frames, horizon), _delta(before)
+
+
+# --- WEB PROCESS SIDE ---
+class ModelPool:
+    def __init__(self, workers=MODEL_POOL_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._inflight_lock = threading.Lock()
+        self._inflight = {}  # forecast cache key -> [future, executor, batches waiting for it]
+        self.stats_data = {'submitted': 0, 'joined': 0, 'cache_hits': 0, 'completed': 0, 'failed': 0,
+                           'missed_deadline': 0, 'restarts': 0}
+        self.arima_fits = {'fit': 0, 'warm_fit': 0, 'extend': 0}   # summed over the workers
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker, initargs=(threads,))
+            return self._executor
+
+    def _reset(self, executor):
+        """Drop a broken executor (e.g. a worker was killed); the next submit starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.stats_data['restarts'] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats_data[name] += n
+
+    def _collect_counts(self, future):
+        # Done callback: also runs for fits that finish after their request's deadline
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, counts = future.result()
+        with self._lock:
+            for mode, n in counts.get('arima_fits', {}).items():
+                self.arima_fits[mode] = self.arima_fits.get(mode, 0) + n
+        # Cache hits/misses/stores made in the worker count in this process's forecast_cache.stats()
+        forecast_cache.add_counts(counts.get('forecast_cache', {}))
+
+    def submit(self, fn, *args):
+        """Returns (future, executor it was submitted to); the future's result is (result, counts)."""
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset(executor)
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        future.add_done_callback(self._collect_counts)
+        self._count('submitted')
+        return future, executor
+
+    def submit_shared(self, key, fn, *args):
+        """submit(), but joins the fit already queued or running under `key` instead of starting another."""
+        with self._inflight_lock:
+            entry = self._inflight.get(key)
+            if entry is not None and not entry[0].done():
+                entry[2] += 1
+                self._count('joined')
+                return entry[0], entry[1]
+            future, executor = self.submit(fn, *args)
+            self._inflight[key] = [future, executor, 1]
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future, executor
+
+    def _forget(self, key, future):
+        with self._inflight_lock:
+            entry = self._inflight.get(key)
+            if entry is not None and entry[0] is future:
+                del self._inflight[key]
+
+    def release(self, key, future):
+        """A batch stops waiting for `future`; True if no other batch is still waiting for it."""
+        with self._inflight_lock:
+            entry = self._inflight.get(key)
+            if entry is None or entry[0] is not future:
+                return True
+            entry[2] -= 1
+            return entry[2] <= 0
+
+    def batch(self, deadline=COMPARE_FIT_DEADLINE):
+        return FitBatch(self, deadline)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.stats_data)
+            stats['workers'] = self.workers
+            stats['started'] = self._executor is not None
+            stats['in_flight'] = len(self._inflight)
+            stats['arima_fits'] = dict(self.arima_fits)
+        return stats
+
+    def arima_stats(self):
+        """ARIMA fit counts of the web process and the workers together."""
+        with self._lock:
+            counts = dict(self.arima_fits)
+        for mode, n in prediction_models.arima_stats().items():
+            counts[mode] = counts.get(mode, 0) + n
+        return counts
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FitBatch:
+    """The model fits of one request, gathered together against one deadline."""
+
+    def __init__(self, pool, deadline):
+        self.pool = pool
+        self.started = time.monotonic()
+        self.deadline = deadline
+        self.results = {}   # task id -> result (cache hits, inline fits and finished fits)
+        self.pending = []   # (submit order, sequence, task id, cache key or None, fn, args), sent at gather
+        self.futures = {}   # future -> task ids waiting for it
+        self.executors = {}  # future -> executor it runs on
+        self.keys = {}      # future -> forecast cache key it was shared under
+
+    def fit(self, task_id, fund, series, model, data, horizon=30, **params):
+        """Forecast `model` on `data`, from forecast_cache if possible, else inline or in the pool."""
+        if not prediction_models.is_enabled(model):
+            return
+        key = forecast_cache.cache_key(fund, series, model, horizon, data, params)
+        cached = forecast_cache.get(key)
+        if cached is not None:
+            self.results[task_id] = cached
+            self.pool._count('cache_hits')
+            return
+        if model in INLINE_MODELS:
+            try:
+                result = prediction_models.get_model(model)(data, days=horizon, **params)
+            except Exception as e:
+                print(f"✗ Model fit {task_id} failed: {e}")
+                return
+            if result is not None:
+                forecast_cache.put(key, result)
+                self.results[task_id] = result
+            return
+        self._queue(SUBMIT_ORDER.get(model, len(SUBMIT_ORDER)), task_id, key, _fit,
+                    key, model, data, horizon, params)
+
+    def global_lstm(self, task_id, frames, horizon=30):
+        """global_lstm.forecast_funds(frames) in the pool: one batched inference for all funds."""
+        self._queue(SUBMIT_ORDER['global_lstm'], task_id, None, _global_lstm, frames, horizon)
+
+    def _queue(self, order, task_id, key, fn, *args):
+        self.pending.append((order, len(self.pending), task_id, key, fn, args))
+
+    def _submit_pending(self):
+        for _, _, task_id, key, fn, args in sorted(self.pending, key=lambda p: p[:2]):
+            if key is None:
+                self._track(task_id, *self.pool.submit(fn, *args))
+            else:
+                future, executor = self.pool.submit_shared(key, fn, *args)
+                self._track(task_id, future, executor)
+                self.keys[future] = key
+        self.pending = []
+
+    def _track(self, task_id, future, executor):
+        self.futures.setdefault(future, []).append(task_id)
+        self.executors[future] = executor
+
+    def gather(self):
+        """{task id: result} for every task that finished before the deadline (None results dropped)."""
+        self._submit_pending()
+        remaining = max(0.0, self.deadline - (time.monotonic() - self.started))
+        done, not_done = wait(self.futures, timeout=remaining)
+        for future in done:
+            task_id = ", ".join(str(t) for t in self.futures[future])
+            try:
+                result, _ = future.result()
+            except BrokenProcessPool as e:
+                print(f"✗ Model fit {task_id} lost its worker: {e}")
+                self.pool._count('failed')
+                self.pool._reset(self.executors[future])
+                continue
+            except Exception as e:
+                print(f"✗ Model fit {task_id} failed: {e}")
+                self.pool._count('failed')
+                continue
+            self.pool._count('completed')
+            if result is not None:
+                for task in self.futures[future]:
+                    self.results[task] = result
+        if not_done:
+            # Queued fits are dropped unless another request is waiting for them; running ones finish
+            # in the background and fill the forecast cache
+            for future in not_done:
+                key = self.keys.get(future)
+                if key is None or self.pool.release(key, future):
+                    future.cancel()
+            self.pool._count('missed_deadline', len(not_done))
+            missed = ", ".join(str(t) for f in not_done for t in self.futures[f])
+            print(f"✗ {len(not_done)} model fit(s) missed the {self.deadline:.0f} s deadline: {missed}")
+        return self.results
+
+
+pool = ModelPool()
+atexit.register(pool.shutdown)
@@ -1,52 +1,89 @@
-import requests
+import json
+import os
 import pandas as pd
 import re
+import sys
+import threading
 import time
+from datetime import datetime, timedelta, timezone
 
-def get_regular_plan_history(fund_name_input):
+import http_client
+import navstore
+from fileio import atomic_write_json
+from singleflight import SingleFlight
+
+# Overridable so the fetchers can be pointed at a local stand-in server
+MFAPI_BASE_URL = os.environ.get("MFAPI_BASE_URL", "https://api.mfapi.in")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FUNDS_FILE = os.path.join(BASE_DIR, 'Funds.txt')
+# Persisted fund name -> Regular-plan scheme code map, so NAV fetches skip the search call.
+# Kept out of the Database/ root, where every *.json is taken for a fund's scraped data.
+SCHEME_INDEX_PATH = os.path.join(BASE_DIR, 'Database', 'Scheme_Index', 'scheme_codes.json')
+LEGACY_SCHEME_INDEX_PATH = os.path.join(BASE_DIR, 'Database', 'scheme_codes.json')
+
+# Freshness policy for get_nav_history: stored history is refreshed at most once per
+# publish cycle (AMFI NAVs are out by NAV_PUBLISH_TIME IST), or when older than NAV_MAX_AGE seconds.
+NAV_PUBLISH_TIME = os.environ.get("NAV_PUBLISH_TIME", "23:00")
+NAV_MAX_AGE = int(os.environ.get("NAV_MAX_AGE", "0"))  # 0 disables the age rule
+# After a failed refresh the stale copy is served without retrying mfapi for this many seconds
+NAV_RETRY_AFTER = int(os.environ.get("NAV_RETRY_AFTER", "300"))
+IST = timezone(timedelta(hours=5, minutes=30))
+
+_scheme_index = None
+_scheme_index_lock = threading.Lock()
+
+# Concurrent requests for the same cold/stale fund share one upstream fetch
+fetch_flight = SingleFlight('nav_fetch')
+
+
+def load_fund_names():
+    """All fund names listed in Funds.txt."""
+    if not os.path.exists(FUNDS_FILE):
+        return []
+    with open(FUNDS_FILE, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def resolve_scheme_code(fund_name_input):
     """
-    Takes a fund name (e.g., 'Axis Large Cap Fund - Gr'), finds the 
-    Regular Plan version, fetches history, saves to CSV, and returns DF.
+    Searches mfapi for the Regular Plan version of a fund.
+    Returns (scheme_code, scheme_name) or (None, None) if no match was found.
     """
-    
+
     # --- STEP 1: PARSE INPUT & DETERMINE OPTION (Growth vs IDCW) ---
     # Default to Growth if not specified, but check for specific keywords
     option_type = "Growth" # Default
     if re.search(r'IDCW|Dividend', fund_name_input, re.IGNORECASE):
         option_type = "IDCW"
-    
+
     # --- STEP 2: CLEAN THE NAME FOR SEARCHING ---
     # Remove specific suffixes to get the "Base Name" for broader searching
     # Removes: - Gr, -Gr, - IDCW, -IDCW, - Growth, etc.
     clean_name = re.sub(r'\s*-\s*(Gr|Growth|IDCW|Dividend).*$', '', fund_name_input, flags=re.IGNORECASE).strip()
-    
+
     print(f"1. Processing: '{fund_name_input}'")
     print(f"   -> Base Name: '{clean_name}'")
     print(f"   -> Target Plan: Regular Plan - {option_type}")
 
     # --- STEP 3: SEARCH FOR THE SCHEME CODE ---
-    search_url = f"https://api.mfapi.in/mf/search?q={clean_name}"
+    search_url = f"{MFAPI_BASE_URL}/mf/search?q={clean_name}"
     try:
-        response = requests.get(search_url)
-        response.raise_for_status()
-        search_results = response.json()
+        search_results = http_client.get_json(search_url)
     except Exception as e:
         print(f"Error searching for fund: {e}")
-        return None
+        return None, None
 
     # --- STEP 4: FILTER FOR 'REGULAR' + OPTION ---
-    target_code = None
-    target_scheme_name = None
-
     for item in search_results:
         name = item['schemeName']
-        
+
         # LOGIC:
         # 1. Must contain "Regular" (To bypass Direct plans)
         # 2. Must contain the Option Type (Growth or IDCW)
         # 3. Must NOT contain "Direct" (Safety check)
         is_regular = "Regular" in name and "Direct" not in name
-        
+
         # Check if it matches our desired option (Growth or IDCW)
         if option_type == "IDCW":
             # specific check because IDCW is sometimes listed as Dividend in older names
@@ -56,20 +93,132 @@ def get_regular_plan_history(fund_name_input):
 
         if is_regular and matches_option:
             # Found a match!
-            target_code = item['schemeCode']
-            target_scheme_name = name
-            break
-    
-    if not target_code:
-        print(f"❌ Could not find a 'Regular - {option_type}' plan for '{clean_name}'")
+            print(f"   -> Match Found: {name} (Code: {item['schemeCode']})")
+            return item['schemeCode'], name
+
+    print(f"❌ Could not find a 'Regular - {option_type}' plan for '{clean_name}'")
+    return None, None
+
+
+# --- SCHEME CODE INDEX ---
+
+def _load_scheme_index():
+    global _scheme_index
+    if _scheme_index is None:
+        try:
+            with open(SCHEME_INDEX_PATH, 'r', encoding='utf-8') as f:
+                _scheme_index = json.load(f)
+        except (OSError, ValueError):
+            _scheme_index = _migrate_legacy_scheme_index()
+    return _scheme_index
+
+
+def _migrate_legacy_scheme_index():
+    """Move an index saved at the old Database/ root location to SCHEME_INDEX_PATH; {} if there is none."""
+    try:
+        with open(LEGACY_SCHEME_INDEX_PATH, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    atomic_write_json(SCHEME_INDEX_PATH, index)
+    os.remove(LEGACY_SCHEME_INDEX_PATH)
+    print(f"Moved the scheme code index to {SCHEME_INDEX_PATH}")
+    return index
+
+
+def _save_scheme_index():
+    atomic_write_json(SCHEME_INDEX_PATH, _scheme_index)
+
+
+def get_scheme_code(fund_name_input, rebuild=False):
+    """
+    Returns (scheme_code, scheme_name) for a fund, consulting the persisted index first.
+    The mfapi search is only run on a miss (or when rebuild=True) and the result is saved back.
+    """
+    with _scheme_index_lock:
+        entry = _load_scheme_index().get(fund_name_input)
+    if entry and not rebuild:
+        return entry['scheme_code'], entry['scheme_name']
+
+    scheme_code, scheme_name = resolve_scheme_code(fund_name_input)
+    if scheme_code:
+        with _scheme_index_lock:
+            _load_scheme_index()[fund_name_input] = {'scheme_code': scheme_code, 'scheme_name': scheme_name}
+            _save_scheme_index()
+    return scheme_code, scheme_name
+
+
+def build_scheme_index(fund_names=None, rebuild=False):
+    """
+    Resolve every fund in Funds.txt (or `fund_names`) in one pass and persist the index once at the end.
+    Already indexed funds are skipped unless rebuild=True. Returns the list of funds that could not be resolved.
+    """
+    if fund_names is None:
+        fund_names = load_fund_names()
+
+    with _scheme_index_lock:
+        index = dict(_load_scheme_index())
+
+    unresolved = []
+    for i, fund_name in enumerate(fund_names, 1):
+        if fund_name in index and not rebuild:
+            continue
+        print(f"[{i}/{len(fund_names)}]", end=" ")
+        scheme_code, scheme_name = resolve_scheme_code(fund_name)
+        if scheme_code:
+            index[fund_name] = {'scheme_code': scheme_code, 'scheme_name': scheme_name}
+        else:
+            unresolved.append(fund_name)
+
+    with _scheme_index_lock:
+        # Merge rather than replace so codes resolved concurrently by requests are kept
+        _load_scheme_index().update(index)
+        _save_scheme_index()
+
+    print(f"✅ Scheme index saved: {len(index)} funds indexed, {len(unresolved)} unresolved")
+    return unresolved
+
+
+def _history_to_frame(history_list):
+    """Convert mfapi's [{'date': 'dd-mm-YYYY', 'nav': '12.34'}, ...] list into a latest-first DataFrame."""
+    df = pd.DataFrame(history_list)
+
+    # Data Cleaning
+    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y')
+    df['nav'] = df['nav'].astype(float)
+    return df.sort_values('date', ascending=False) # Ensure latest first
+
+
+def _stored_frame(fund_name_input):
+    """Stored history in the same shape get_regular_plan_history returns ('date'/'nav' columns, latest first)."""
+    df = navstore.load_frame(fund_name_input)
+    if df is None:
         return None
+    return df.reset_index().sort_values('date', ascending=False).reset_index(drop=True)
 
-    print(f"   -> Match Found: {target_scheme_name} (Code: {target_code})")
+
+def get_regular_plan_history(fund_name_input, incremental=False):
+    """
+    Takes a fund name (e.g., 'Axis Large Cap Fund - Gr'), finds the
+    Regular Plan version, fetches history, saves to the NAV store, and returns DF.
+
+    With incremental=True and history already stored, only the NAV points newer than
+    the last stored date are merged in (see refresh_history).
+    """
+    if incremental and navstore.has_history(fund_name_input):
+        if refresh_history(fund_name_input) is None:
+            return None
+        return _stored_frame(fund_name_input)
+
+    target_code, target_scheme_name = get_scheme_code(fund_name_input)
+    if not target_code:
+        return None
 
     # --- STEP 5: FETCH NAV HISTORY ---
-    nav_url = f"https://api.mfapi.in/mf/{target_code}"
+    nav_url = f"{MFAPI_BASE_URL}/mf/{target_code}"
     try:
-        nav_response = requests.get(nav_url)
+        nav_response = http_client.get(nav_url)
+        nav_response.raise_for_status()
         nav_data = nav_response.json()
     except Exception as e:
         print(f"Error fetching NAV data: {e}")
@@ -79,46 +228,197 @@ def get_regular_plan_history(fund_name_input):
         print("No data available for this fund.")
         return None
 
-    # --- STEP 6: PROCESS TO DATAFRAME & SAVE CSV ---
+    # --- STEP 6: PROCESS TO DATAFRAME & SAVE TO NAV STORE ---
     # Extract just the historical data list
-    history_list = nav_data['data']
-    
-    df = pd.DataFrame(history_list)
-    
-    # Data Cleaning
-    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y')
-    df['nav'] = df['nav'].astype(float)
-    df = df.sort_values('date', ascending=False) # Ensure latest first
-
-    # Create a safe filename (remove spaces/special chars)
-    # User requested to keep the name as is (e.g. Axis Large Cap Fund - Gr)
-    # We just replace spaces with underscores for safety
-    safe_filename = fund_name_input.replace(' ', '_').replace('/', '_')
-    filename = f"{safe_filename}.csv"
-    
-    # Also ensure the directory exists
-    import os
-    db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database/NAV_History')
-    os.makedirs(db_dir, exist_ok=True)
-    
-    full_path = os.path.join(db_dir, filename)
-    df.to_csv(full_path, index=False)
-    
-    print(f"✅ Success! Data saved to: {full_path}")
+    df = _history_to_frame(nav_data['data'])
+
+    # Stored under the fund name as is (e.g. Axis Large Cap Fund - Gr -> Axis_Large_Cap_Fund_-_Gr.*)
+    navstore.save_history(fund_name_input, df)
+    navstore.save_meta(fund_name_input, {
+        'scheme_code': target_code,
+        'scheme_name': target_scheme_name,
+        'etag': nav_response.headers.get('ETag'),
+        'last_modified': nav_response.headers.get('Last-Modified'),
+        'checked_at': time.time(),
+    })
+
+    print(f"✅ Success! Data saved to: {os.path.join(navstore.NAV_DIR, navstore.safe_name(fund_name_input))}.*")
     print(f"   Latest NAV: ₹{df.iloc[0]['nav']} (on {df.iloc[0]['date'].strftime('%Y-%m-%d')})")
     print("-" * 50)
-    
+
+    return df
+
+
+def _record_failed_check(fund_name_input, meta):
+    """Remember when a refresh failed (see refresh_due); returns None for refresh_history to pass on."""
+    meta['failed_at'] = time.time()
+    navstore.save_meta(fund_name_input, meta)
+    return None
+
+
+def refresh_history(fund_name_input):
+    """
+    Incrementally refresh a fund that is already in the NAV store.
+
+    1. Works out the last stored date.
+    2. Asks mfapi for the history with If-None-Match / If-Modified-Since when we hold validators
+       from a previous fetch; a 304 means nothing changed.
+    3. Merges only the rows newer than the last stored date and skips the write if there are none.
+
+    Returns the number of new NAV points appended, or None on failure (recorded as 'failed_at' in
+    the fund's metadata). Falls back to a full fetch if the fund has never been stored.
+    """
+    if not navstore.has_history(fund_name_input):
+        df = get_regular_plan_history(fund_name_input)
+        return None if df is None else len(df)
+
+    meta = navstore.load_meta(fund_name_input)
+    target_code = meta.get('scheme_code')
+    if not target_code:
+        target_code, meta['scheme_name'] = get_scheme_code(fund_name_input)
+        if not target_code:
+            return _record_failed_check(fund_name_input, meta)
+        meta['scheme_code'] = target_code
+
+    last_date = navstore.last_date(fund_name_input)
+
+    # Conditional request: honour the validators the upstream gave us last time
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    nav_url = f"{MFAPI_BASE_URL}/mf/{target_code}"
+    params = {'startDate': last_date.strftime('%Y-%m-%d')} if last_date is not None else None
+    try:
+        nav_response = http_client.get(nav_url, params=params, headers=headers)
+    except Exception as e:
+        print(f"Error fetching NAV data: {e}")
+        return _record_failed_check(fund_name_input, meta)
+
+    if nav_response.status_code == 304:
+        meta['checked_at'] = time.time()
+        meta.pop('failed_at', None)
+        print(f"   -> {fund_name_input}: not modified upstream")
+        navstore.save_meta(fund_name_input, meta)
+        return 0
+
+    try:
+        nav_response.raise_for_status()
+        nav_data = nav_response.json()
+    except Exception as e:
+        print(f"Error fetching NAV data: {e}")
+        return _record_failed_check(fund_name_input, meta)
+
+    if nav_data.get('status') == 'False' or not nav_data.get('data'):
+        print("No data available for this fund.")
+        return _record_failed_check(fund_name_input, meta)
+
+    # Upstream may ignore startDate and send the full history; only the delta is kept either way
+    df = _history_to_frame(nav_data['data'])
+    if last_date is not None:
+        df = df[df['date'] > last_date]
+
+    added = navstore.append_history(fund_name_input, df) if not df.empty else 0
+    meta['checked_at'] = time.time()
+    meta.pop('failed_at', None)
+    meta['etag'] = nav_response.headers.get('ETag')
+    meta['last_modified'] = nav_response.headers.get('Last-Modified')
+    navstore.save_meta(fund_name_input, meta)
+
+    if added:
+        print(f"✅ {fund_name_input}: merged {added} new NAV point(s)")
+    else:
+        print(f"   -> {fund_name_input}: already up to date")
+    return added
+
+
+# --- CACHE-FIRST ACCESS ---
+
+def last_publish_cutoff(now=None):
+    """The most recent NAV publish time (today's if already passed, otherwise yesterday's)."""
+    now = now or datetime.now(IST)
+    hour, minute = (int(part) for part in NAV_PUBLISH_TIME.split(':'))
+    cutoff = now.astimezone(IST).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if cutoff > now:
+        cutoff -= timedelta(days=1)
+    return cutoff
+
+
+def is_fresh(fund_name_input, now=None, meta=None):
+    """True if the stored history was checked against mfapi after the latest publish cutoff."""
+    if meta is None:
+        meta = navstore.load_meta(fund_name_input)
+    checked_at = meta.get('checked_at')
+    if checked_at is None:
+        return False
+    now = now or datetime.now(IST)
+    if NAV_MAX_AGE and now.timestamp() - checked_at > NAV_MAX_AGE:
+        return False
+    return checked_at >= last_publish_cutoff(now).timestamp()
+
+
+def refresh_due(fund_name_input, now=None):
+    """
+    True if the stored history is stale and mfapi should be asked again: not while a refresh
+    failed less than NAV_RETRY_AFTER seconds ago, so an upstream outage costs one attempt per fund
+    per interval instead of one per request.
+    """
+    meta = navstore.load_meta(fund_name_input)
+    now = now or datetime.now(IST)
+    if is_fresh(fund_name_input, now, meta):
+        return False
+    failed_at = meta.get('failed_at')
+    return failed_at is None or now.timestamp() - failed_at >= NAV_RETRY_AFTER
+
+
+def _fetch_if_missing(fund_name_input):
+    # Re-checked inside the flight: a caller arriving just after the previous fetch finished finds the data stored
+    return navstore.has_history(fund_name_input) or get_regular_plan_history(fund_name_input) is not None
+
+
+def get_nav_history(fund_name_input):
+    """
+    Cache-first NAV access used by the web app.
+
+    Returns the fund's history as a date-indexed DataFrame ('nav' column, ascending), served from
+    the local NAV store. The network is only touched when nothing is stored yet, or once the stored
+    copy is stale under the freshness policy, and then only for the new points. If a refresh fails
+    the stale copy is served, without retrying for NAV_RETRY_AFTER seconds. Returns None if no
+    history can be found.
+    """
+    df = navstore.load_frame(fund_name_input)
+    if df is None:
+        # Only the first caller fetches; the rest wait and then read what it stored. The flight may be
+        # a refresh started by a caller that still saw stored data (same key, different function, and
+        # 0 means "nothing new"), so the store decides the outcome, not the shared return value.
+        fetch_flight.do(fund_name_input, _fetch_if_missing, fund_name_input)
+        return navstore.load_frame(fund_name_input)
+
+    if refresh_due(fund_name_input):
+        if fetch_flight.do(fund_name_input, refresh_history, fund_name_input):
+            df = navstore.load_frame(fund_name_input)
     return df
 
+
 # --- EXAMPLE USAGE ---
 if __name__ == "__main__":
+    # python navhistory.py build-index [--rebuild]  -> resolve every Funds.txt entry to its scheme code
+    if len(sys.argv) > 1 and sys.argv[1] == 'build-index':
+        build_scheme_index(rebuild='--rebuild' in sys.argv)
+        sys.exit(0)
+
     # 1. Growth Example
     df1 = get_regular_plan_history("Axis Large Cap Fund - Gr")
 
     # 2. IDCW Example
     df2 = get_regular_plan_history("Axis Large & Mid Cap Fund - IDCW")
 
-    # 3. Just checking the dataframe output
+    # 3. Incremental refresh (only merges NAV points published since the fetch above)
+    refresh_history("Axis Large Cap Fund - Gr")
+
+    # 4. Just checking the dataframe output
     if df1 is not None:
         print("\nFirst 5 rows of dataframe:")
-        print(df1.head())
\ No newline at end of file
+        print(df1.head())
@@ -0,0 +1,457 @@
+"""
+Columnar, memory-mapped storage for NAV history.
+
+Each fund is stored in Database/NAV_History as two raw little-endian column files inside a
+version directory, named by a pointer file:
+
+    <Safe_Fund_Name>.current            -> name of the live version directory
+    <Safe_Fund_Name>.v<id>/date.i32     -> int32 day numbers (days since 1970-01-01), ascending
+    <Safe_Fund_Name>.v<id>/nav.f64      -> float64 NAVs (or nav.f32 for float32 stores)
+
+A full rewrite fills a fresh version directory and swaps the pointer with one rename, so readers
+never pair new NAVs with old dates. Stores written before versioning keep the flat
+<Safe_Fund_Name>.date.i32 / .nav.f64 layout until their next rewrite.
+
+Both files are memory-mapped on read, so loading a fund costs a couple of mmap calls
+instead of a CSV parse plus date parsing.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from fileio import atomic_write_bytes, atomic_write_json
+
+NAV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database', 'NAV_History')
+
+DATE_DTYPE = np.dtype('<i4')
+NAV_DTYPES = {'f64': np.dtype('<f8'), 'f32': np.dtype('<f4')}
+DEFAULT_NAV_DTYPE = 'f64'
+
+# Bounds for the in-process cache of parsed frames (see FrameCache)
+FRAME_CACHE_MAX_ENTRIES = int(os.environ.get('NAV_CACHE_MAX_ENTRIES', '128'))
+FRAME_CACHE_MAX_BYTES = int(os.environ.get('NAV_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Replaced version directories left behind by racing writers are swept once they are this old (seconds)
+STALE_VERSION_AGE = int(os.environ.get('NAV_STALE_VERSION_AGE', '300'))
+
+
+def safe_name(fund_name):
+    """Filename stem used for a fund (same convention as the legacy CSVs)."""
+    return fund_name.replace(' ', '_').replace('/', '_')
+
+
+def legacy_csv_path(fund_name):
+    """Path of the CSV that older versions of navhistory wrote for this fund."""
+    return os.path.join(NAV_DIR, f"{safe_name(fund_name)}.csv")
+
+
+def _pointer_path(fund_name):
+    return os.path.join(NAV_DIR, f"{safe_name(fund_name)}.current")
+
+
+def _current_version(fund_name):
+    """Name of the live version directory, or None for a flat (pre-versioning) or missing store."""
+    try:
+        with open(_pointer_path(fund_name), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _columns(fund_name):
+    """
+    Return (version, date path, nav path, nav dtype key) of the live columns; the NAV column
+    defaults to float64 when none exists yet. version is None for the flat layout.
+    """
+    version = _current_version(fund_name)
+    if version is None:
+        stem = os.path.join(NAV_DIR, safe_name(fund_name)) + '.'
+    else:
+        stem = os.path.join(NAV_DIR, version, '')
+    for key in NAV_DTYPES:
+        path = f"{stem}nav.{key}"
+        if os.path.exists(path):
+            return version, f"{stem}date.i32", path, key
+    return version, f"{stem}date.i32", f"{stem}nav.{DEFAULT_NAV_DTYPE}", DEFAULT_NAV_DTYPE
+
+
+def _with_columns(fund_name, read, attempts=3):
+    """
+    Call `read(version, date_path, nav_path, nav_key)` on the live columns. If they vanish because a
+    concurrent save_history swapped the pointer and removed them, resolve the new columns and retry.
+    """
+    while True:
+        columns = _columns(fund_name)
+        try:
+            return read(*columns)
+        except FileNotFoundError:
+            attempts -= 1
+            if not attempts or _current_version(fund_name) == columns[0]:
+                raise
+
+
+def has_history(fund_name):
+    """True if the columnar store holds data for this fund."""
+    def read(version, date_path, nav_path, nav_key):
+        if not (os.path.exists(date_path) and os.path.exists(nav_path)):
+            raise FileNotFoundError(date_path)
+        return True
+
+    try:
+        return _with_columns(fund_name, read)
+    except FileNotFoundError:
+        return False
+
+
+def _to_day_numbers(dates):
+    return pd.DatetimeIndex(dates).values.astype('datetime64[D]').astype(DATE_DTYPE)
+
+
+def _map_column(path, dtype, length):
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+def load_arrays(fund_name):
+    """
+    Return (day_numbers, navs) as read-only memory-mapped arrays, or None if the fund is not stored.
+    day_numbers are int32 days since the epoch, sorted ascending.
+    """
+    def read(version, date_path, nav_path, nav_key):
+        nav_dtype = NAV_DTYPES[nav_key]
+        # Use the shorter column so a half-finished append is never exposed
+        length = min(os.path.getsize(date_path) // DATE_DTYPE.itemsize,
+                     os.path.getsize(nav_path) // nav_dtype.itemsize)
+        return _map_column(date_path, DATE_DTYPE, length), _map_column(nav_path, nav_dtype, length)
+
+    try:
+        return _with_columns(fund_name, read)
+    except FileNotFoundError:
+        return None
+
+
+def arrays_to_frame(day_numbers, navs):
+    """Build a date-indexed frame with a single 'nav' column from raw store arrays."""
+    index = pd.DatetimeIndex(np.asarray(day_numbers).astype('datetime64[D]').astype('datetime64[ns]'), name='date')
+    return pd.DataFrame({'nav': np.asarray(navs, dtype=np.float64)}, index=index)
+
+
+class FrameCache:
+    """
+    LRU of parsed NAV frames keyed by fund, bounded by entry count and total bytes.
+    Each entry remembers the store signature it was built from; a changed mtime/size
+    on disk invalidates it on the next lookup.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (signature, frame, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, key, signature):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != signature:
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, signature, frame):
+        nbytes = int(frame.memory_usage(index=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (signature, frame, nbytes)
+            self._bytes += nbytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+frame_cache = FrameCache(FRAME_CACHE_MAX_ENTRIES, FRAME_CACHE_MAX_BYTES)
+
+
+def load_frame(fund_name):
+    """
+    Return the fund's NAV history as a DataFrame indexed by 'date' (ascending) with a 'nav' column.
+    Hot funds are served from the in-process frame cache; the caller always gets its own copy.
+    Falls back to migrating a legacy CSV if the fund has not been converted yet.
+    Returns None if no history exists.
+    """
+    if not has_history(fund_name):
+        if not os.path.exists(legacy_csv_path(fund_name)):
+            return None
+        migrate_csv(legacy_csv_path(fund_name), fund_name)
+
+    key = safe_name(fund_name)
+    signature = store_mtime(fund_name)
+    frame = frame_cache.get(key, signature)
+    if frame is None:
+        frame = arrays_to_frame(*load_arrays(fund_name))
+        frame_cache.put(key, signature, frame)
+    return frame.copy()
+
+
+def last_date(fund_name):
+    """Latest stored NAV date as a Timestamp, or None if nothing is stored."""
+    arrays = load_arrays(fund_name)
+    if arrays is None or len(arrays[0]) == 0:
+        return None
+    return pd.Timestamp(np.datetime64(int(arrays[0][-1]), 'D'))
+
+
+def _normalise(df):
+    """Sort ascending by date, drop duplicate dates and return (day_numbers, navs)."""
+    if 'date' in df.columns:
+        dates = pd.to_datetime(df['date'])
+        navs = df['nav']
+    else:
+        dates = pd.to_datetime(df.index)
+        navs = df['nav']
+    frame = pd.DataFrame({'day': _to_day_numbers(dates), 'nav': np.asarray(navs, dtype=np.float64)})
+    frame = frame.drop_duplicates('day', keep='first').sort_values('day')
+    return frame['day'].to_numpy(DATE_DTYPE), frame['nav'].to_numpy()
+
+
+def _remove_quietly(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError:
+        pass  # already gone, or still mapped by a reader on Windows; a later sweep retries
+
+
+def _sweep_versions(fund_name, live):
+    """Remove version directories other than `live` that have been unreferenced for STALE_VERSION_AGE."""
+    prefix = f"{safe_name(fund_name)}.v"
+    cutoff = time.time() - STALE_VERSION_AGE
+    for entry in os.scandir(NAV_DIR):
+        if entry.name.startswith(prefix) and entry.name != live and entry.is_dir():
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    _remove_quietly(entry.path)
+            except OSError:
+                pass
+
+
+def save_history(fund_name, df, nav_dtype=DEFAULT_NAV_DTYPE):
+    """
+    Replace the stored history for a fund.
+    `df` may either have 'date'/'nav' columns or a date index with a 'nav' column.
+    Both columns are written into a fresh version directory which is published by renaming the
+    pointer file over the old one, so readers see either the old pair or the new pair.
+    """
+    days, navs = _normalise(df)
+    os.makedirs(NAV_DIR, exist_ok=True)
+    old_version, old_date_path, old_nav_path, _ = _columns(fund_name)
+
+    version_dir = tempfile.mkdtemp(dir=NAV_DIR, prefix=f"{safe_name(fund_name)}.v")
+    version = os.path.basename(version_dir)
+    try:
+        for path, payload in ((os.path.join(version_dir, f"nav.{nav_dtype}"), navs.astype(NAV_DTYPES[nav_dtype])),
+                              (os.path.join(version_dir, 'date.i32'), days)):
+            with open(path, 'wb') as f:
+                f.write(payload.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        atomic_write_bytes(_pointer_path(fund_name), version.encode('utf-8'))
+    except BaseException:
+        _remove_quietly(version_dir)
+        raise
+
+    # Readers that resolved the old columns just before the swap retry once (see _with_columns)
+    if old_version is None:
+        _remove_quietly(old_date_path)
+        _remove_quietly(old_nav_path)
+    else:
+        _remove_quietly(os.path.join(NAV_DIR, old_version))
+    _sweep_versions(fund_name, version)
+    return len(days)
+
+
+def append_history(fund_name, df):
+    """
+    Append rows strictly newer than the last stored date.
+    Only the new rows are written, so the cost is O(new days). Returns the number of rows appended.
+    """
+    if not has_history(fund_name):
+        return save_history(fund_name, df)
+
+    days, navs = _normalise(df)
+    stored_days, _ = load_arrays(fund_name)
+    if len(stored_days):
+        keep = days > stored_days[-1]
+        days, navs = days[keep], navs[keep]
+    if len(days) == 0:
+        return 0
+
+    _, date_path, nav_path, nav_key = _columns(fund_name)
+    # NAV column first: readers trim to the shorter column, so a crash in between is harmless
+    with open(nav_path, 'ab') as f:
+        f.write(navs.astype(NAV_DTYPES[nav_key]).tobytes())
+    with open(date_path, 'ab') as f:
+        f.write(days.tobytes())
+    return len(days)
+
+
+def _meta_path(fund_name):
+    return os.path.join(NAV_DIR, f"{safe_name(fund_name)}.meta.json")
+
+
+def load_meta(fund_name):
+    """Per-fund fetch metadata (scheme code, HTTP validators, last check time); {} if none."""
+    try:
+        with open(_meta_path(fund_name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_meta(fund_name, meta):
+    atomic_write_json(_meta_path(fund_name), meta)
+
+
+def store_mtime(fund_name):
+    """(version, mtime, size) signature of the stored columns; changes whenever the fund is rewritten or appended."""
+    def read(version, date_path, nav_path, nav_key):
+        date_stat = os.stat(date_path)
+        nav_stat = os.stat(nav_path)
+        return version, max(date_stat.st_mtime_ns, nav_stat.st_mtime_ns), date_stat.st_size + nav_stat.st_size
+
+    return _with_columns(fund_name, read)
+
+
+# --- MIGRATION ---
+
+def _fund_name_from_csv(filename):
+    # Filenames keep the fund name with spaces turned into underscores; the store uses the
+    # same stem, so converting back is only needed to call the public API.
+    return os.path.splitext(filename)[0].replace('_', ' ')
+
+
+def migrate_csv(csv_path, fund_name=None, remove=False):
+    """Convert one legacy NAV CSV into the columnar store. Returns the number of rows written."""
+    if fund_name is None:
+        fund_name = _fund_name_from_csv(os.path.basename(csv_path))
+    df = pd.read_csv(csv_path)
+    df['date'] = pd.to_datetime(df['date'])
+    rows = save_history(fund_name, df)
+    if remove:
+        os.remove(csv_path)
+    return rows
+
+
+def migrate_all(remove=False):
+    """One-shot migration of every CSV in Database/NAV_History. Returns {csv filename: rows or error}."""
+    results = {}
+    if not os.path.isdir(NAV_DIR):
+        return results
+    for filename in sorted(os.listdir(NAV_DIR)):
+        if not filename.endswith('.csv'):
+            continue
+        try:
+            results[filename] = migrate_csv(os.path.join(NAV_DIR, filename), remove=remove)
+            print(f"✅ Migrated {filename} ({results[filename]} rows)")
+        except Exception as e:
+            results[filename] = f"error: {e}"
+            print(f"❌ Failed to migrate {filename}: {e}")
+    return results
+
+
+# --- BENCHMARK ---
+
+def _time_call(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(fund_names=None, repeat=20):
+    """
+    Compare load time of the legacy CSV path against the columnar store.
+    Uses funds that exist in both formats; pass fund_names to restrict the set.
+    """
+    if fund_names is None:
+        fund_names = [_fund_name_from_csv(f) for f in sorted(os.listdir(NAV_DIR)) if f.endswith('.csv')]
+
+    def load_csv(name):
+        df = pd.read_csv(legacy_csv_path(name))
+        df['date'] = pd.to_datetime(df['date'])
+        return df.sort_values('date').set_index('date')
+
+    rows = []
+    for name in fund_names:
+        if not os.path.exists(legacy_csv_path(name)):
+            continue
+        if not has_history(name):
+            migrate_csv(legacy_csv_path(name), name)
+        csv_time = _time_call(lambda: load_csv(name), repeat)
+        frame_time = _time_call(lambda: arrays_to_frame(*load_arrays(name)), repeat)
+        array_time = _time_call(lambda: load_arrays(name), repeat)
+        cached_time = _time_call(lambda: load_frame(name), repeat)
+        rows.append((name, len(load_arrays(name)[0]), csv_time, frame_time, array_time, cached_time))
+
+    print(f"{'Fund':<45} {'Rows':>6} {'CSV ms':>9} {'Frame ms':>9} {'Arrays ms':>10} {'Cached ms':>10} {'Speedup':>8}")
+    for name, n, csv_time, frame_time, array_time, cached_time in rows:
+        print(f"{name[:45]:<45} {n:>6} {csv_time * 1e3:>9.2f} {frame_time * 1e3:>9.2f} "
+              f"{array_time * 1e3:>10.3f} {cached_time * 1e3:>10.3f} {csv_time / frame_time:>7.1f}x")
+    print(f"Frame cache: {frame_cache.stats()}")
+    return rows
+
+
+if __name__ == "__main__":
+    # python navstore.py migrate [--remove]   -> convert every CSV in Database/NAV_History
+    # python navstore.py bench                -> CSV vs columnar load time
+    command = sys.argv[1] if len(sys.argv) > 1 else 'bench'
+    if command == 'migrate':
+        migrate_all(remove='--remove' in sys.argv)
+    else:
+        benchmark()
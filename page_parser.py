@@ -0,0 +1,282 @@
+"""
+BeautifulSoup parsers for the njwealth fund page.
+
+The Selenium extractors in scraper.py make one WebDriver round trip per find_element/.text
+call, which adds up to thousands of remote calls on a large portfolio table. These parsers
+work on a single HTML snapshot (driver.page_source, or a container's outerHTML) and fill the
+same `final_data` schema locally.
+
+Usage:
+    python page_parser.py bench <snapshot_dir>   # soup vs Selenium parse time on saved .html pages
+"""
+
+import os
+import sys
+import time
+from bs4 import BeautifulSoup
+
+HTML_PARSER = "html.parser"
+
+# final_data key -> collapse header text of the progress-bar sections
+PROGRESS_SECTIONS = {
+    "top_holdings": "Top Holdings",
+    "sector_holdings": "Top Sector Holdings",
+    "asset_allocation": "Asset Allocation",
+    "top_asset_type": "Top Asset Type",
+    "credit_profile": "Credit Profile",
+}
+
+# final_data key -> collapse header text of the performance tables
+PERFORMANCE_TABLES = {
+    "performance_lumpsum": "Lumpsum Performance",
+    "performance_sip": "SIP Performance",
+}
+
+
+def make_soup(html):
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+# --- TEXT HELPERS (approximate Selenium's rendered .text) ---
+
+def _text(tag):
+    """Whitespace-collapsed text of a tag."""
+    return " ".join(tag.get_text(" ").split()) if tag is not None else ""
+
+
+def _lines(tag):
+    """Text of a tag split into its block-level lines, like WebElement.text.split('\\n')."""
+    return [line for line in (" ".join(part.split()) for part in tag.get_text("\n").split("\n")) if line]
+
+
+def _has_classes(*names):
+    def match(tag):
+        classes = tag.get("class") or []
+        return all(name in classes for name in names)
+    return match
+
+
+def _exact_class(name, cls):
+    return lambda tag: tag.name == name and (tag.get("class") or []) == [cls]
+
+
+def _section_bodies(soup, header_text):
+    """Content divs that follow an antd collapse header containing `header_text`."""
+    bodies = []
+    for header in soup.find_all("div", class_="ant-collapse-header"):
+        if header_text in header.get_text():
+            bodies.extend(header.find_next_siblings("div"))
+    return bodies
+
+
+# --- SECTION PARSERS (same output as the Selenium extractors) ---
+
+def parse_basic_info(soup, final_data):
+    fund_name = soup.find(_exact_class("h2", "pull-left"))
+    if fund_name is not None:
+        final_data["basic_info"]["fund_name"] = _text(fund_name)
+    navbox = soup.find(_exact_class("div", "navbox"))
+    if navbox is not None:
+        nav = navbox.find(_exact_class("strong", "text-black"))
+        if nav is not None:
+            final_data["basic_info"]["nav"] = _text(nav)
+    aum_box = soup.find("div", class_="aumamount")
+    if aum_box is not None:
+        aum = aum_box.find("h2", recursive=False)
+        if aum is not None and _lines(aum):
+            final_data["basic_info"]["aum"] = _lines(aum)[0]
+
+
+def parse_scheme_details(soup, final_data):
+    aum_box = soup.find("div", class_="aumamount")
+    if aum_box is not None and aum_box.find("small") is not None and "aum" in final_data["basic_info"]:
+        final_data["scheme_details"][_text(aum_box.find("small"))] = final_data["basic_info"]["aum"]
+    for list_ul in soup.find_all(class_="planLists"):
+        for item in list_ul.find_all("li"):
+            label, value = item.find("h5"), item.find("p")
+            if label is None or value is None:
+                continue
+            if _text(label):
+                final_data["scheme_details"][_text(label)] = _text(value)
+
+
+def parse_fund_managers(soup, final_data):
+    for box in soup.find_all("div", class_="fundmanager"):
+        for mgr in box.find_all(_has_classes("mt-3", "p-2")):
+            strong = mgr.find("strong")
+            if strong is None:
+                continue
+            name = _text(strong)
+            details = [line for line in _lines(mgr) if line not in (name, "View Details")]
+            final_data["fund_managers"].append({
+                "name": name,
+                "tenure": details[0] if len(details) > 0 else "",
+                "managing": details[1] if len(details) > 1 else ""
+            })
+
+
+def parse_progress_section(soup, header_text):
+    data = {}
+    for body in _section_bodies(soup, header_text):
+        for item in body.select("ul > li"):
+            name = item.find("small")
+            val = item.find(class_="ant-progress-text")
+            if name is not None and val is not None and _text(name) and _text(val):
+                data[_text(name)] = _text(val)
+        if data:
+            return data
+    return data
+
+
+def parse_table(table):
+    """Rows of an HTML table as dicts keyed by header text (rows with a different cell count are skipped)."""
+    if table is None:
+        return [], []
+    headers = [_text(th) for th in table.select("thead tr th")] or [_text(th) for th in table.find_all("th")]
+    rows = []
+    tbody = table.find("tbody")
+    for tr in (tbody.find_all("tr") if tbody is not None else []):
+        cells = tr.find_all("td")
+        if headers and len(cells) == len(headers):
+            rows.append({headers[i]: _text(cells[i]) for i in range(len(cells))})
+    return headers, rows
+
+
+def parse_performance_table(soup, header_text):
+    for body in _section_bodies(soup, header_text):
+        table = body.find("table")
+        if table is not None:
+            return parse_table(table)[1]
+    return []
+
+
+def parse_documents(soup, final_data):
+    for body in _section_bodies(soup, "Scheme Documents"):
+        for button in body.find_all("button"):
+            final_data["documents"].append(_text(button))
+
+
+def parse_portfolio_summary(container, final_data):
+    asset_list = container.find(class_="assetdetails")
+    if asset_list is None:
+        return
+    for item in asset_list.find_all("li"):
+        h4 = item.find("h4")
+        if h4 is None:
+            continue
+        value = _text(h4)
+        key = " ".join(item.get_text(" ").replace(h4.get_text(" "), " ").split())
+        final_data["portfolio_summary"][key] = value
+
+
+def parse_portfolio_page(container):
+    """(headers, rows, is_empty) for the portfolio table currently rendered in `container`."""
+    wrapper = container.find(_exact_class("div", "ant-table-wrapper"))
+    if wrapper is None:
+        return [], [], True
+    headers, rows = parse_table(wrapper.find("table"))
+    body_rows = wrapper.select("tbody tr")
+    is_empty = len(body_rows) == 1 and "no data" in _text(body_rows[0]).lower()
+    return headers, rows, is_empty
+
+
+# --- PHASES ---
+
+def _progress_phase(soup, final_data):
+    for key, header_text in PROGRESS_SECTIONS.items():
+        final_data[key] = parse_progress_section(soup, header_text)
+
+
+def _performance_phase(soup, final_data):
+    for key, header_text in PERFORMANCE_TABLES.items():
+        final_data[key] = parse_performance_table(soup, header_text)
+
+
+# Same names as scraper.EXTRACTION_PHASES; the portfolio phase needs clicks and stays in scraper.py
+PARSE_PHASES = [
+    ("basic info", parse_basic_info),
+    ("scheme details", parse_scheme_details),
+    ("fund managers", parse_fund_managers),
+    ("progress sections", _progress_phase),
+    ("performance tables", _performance_phase),
+    ("documents", parse_documents),
+]
+
+
+def parse_static_sections(html, final_data, timer=None, phases=None):
+    """Parse the non-interactive sections of a fund page snapshot (all, or only `phases`) into final_data."""
+    soup = make_soup(html)
+    for phase_name, parse in PARSE_PHASES:
+        if phases is not None and phase_name not in phases:
+            continue
+        if timer is None:
+            parse(soup, final_data)
+        else:
+            with timer.phase(phase_name):
+                parse(soup, final_data)
+    return soup
+
+
+# --- BENCHMARK ---
+
+def benchmark(snapshot_dir, repeat=5):
+    """
+    Time the soup path against the Selenium extractors on saved page snapshots (*.html).
+    The Selenium side loads each snapshot in headless Chrome; it is skipped if Chrome is unavailable.
+    """
+    import scraper
+
+    snapshots = sorted(f for f in os.listdir(snapshot_dir) if f.endswith(".html"))
+    if not snapshots:
+        print(f"No .html snapshots found in {snapshot_dir}")
+        return []
+
+    driver = None
+    try:
+        driver = scraper.create_driver(headless=True)
+    except Exception as e:
+        print(f"Chrome unavailable, timing the soup path only ({e})")
+
+    rows = []
+    try:
+        for filename in snapshots:
+            path = os.path.abspath(os.path.join(snapshot_dir, filename))
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+
+            best_soup = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                soup_data = scraper.new_fund_data(filename)
+                parse_static_sections(html, soup_data)
+                best_soup = min(best_soup, time.perf_counter() - start)
+
+            selenium_time = None
+            if driver is not None:
+                driver.get(f"file://{path}")
+                start = time.perf_counter()
+                selenium_data = scraper.new_fund_data(filename)
+                for phase_name, extract in scraper.EXTRACTION_PHASES:
+                    if phase_name != "portfolio":
+                        extract(driver, selenium_data)
+                selenium_time = time.perf_counter() - start
+            rows.append((filename, best_soup, selenium_time))
+    finally:
+        if driver is not None:
+            driver.quit()
+
+    print(f"\n{'Snapshot':<50} {'Soup ms':>9} {'Selenium ms':>12} {'Speedup':>8}")
+    for filename, soup_time, selenium_time in rows:
+        if selenium_time is None:
+            print(f"{filename[:50]:<50} {soup_time * 1e3:>9.1f} {'-':>12} {'-':>8}")
+        else:
+            print(f"{filename[:50]:<50} {soup_time * 1e3:>9.1f} {selenium_time * 1e3:>12.1f} "
+                  f"{selenium_time / soup_time:>7.1f}x")
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "bench":
+        benchmark(sys.argv[2])
+    else:
+        print("Usage: python page_parser.py bench <snapshot_dir>")
@@ -1,21 +1,100 @@
-"""Machine learning prediction models for NAV forecasting."""
+"""
+Machine learning prediction models for NAV forecasting.
 
+Models are registered by name ('linear', 'arima', 'lstm') and import their libraries (sklearn,
+statsmodels, tensorflow) on first use, so importing this module, and app.py with it, stays cheap.
+get_model(name) returns a model's predict function, or None if the model is disabled for this
+deployment:
+    PREDICTION_DISABLED_MODELS=lstm,arima   disable models by name
+    PREDICTION_HEAVY_BACKENDS=0             disable every model marked heavy (ARIMA, LSTM)
+"""
+
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
-import streamlit as st
 from datetime import timedelta
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import MinMaxScaler
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
 import warnings
+from fileio import atomic_write_bytes, atomic_write_json, atomic_write_with
 warnings.filterwarnings('ignore')
 
+# --- MODEL REGISTRY ---
+DISABLED_MODELS = {name.strip().lower() for name in os.environ.get('PREDICTION_DISABLED_MODELS', '').split(',')
+                   if name.strip()}
+HEAVY_BACKENDS = os.environ.get('PREDICTION_HEAVY_BACKENDS', '1') != '0'
+
+MODELS = {}  # name -> {'predict': fn, 'heavy': bool, 'modules': top-level modules it imports}
+
+
+def register_model(name, heavy=False, modules=()):
+    """Decorator adding a predict(data, days=30, **params) function to the registry under `name`."""
+    def decorator(predict):
+        MODELS[name] = {'predict': predict, 'heavy': heavy, 'modules': tuple(modules)}
+        return predict
+    return decorator
+
+
+def is_enabled(name):
+    model = MODELS.get(name)
+    if model is None or name in DISABLED_MODELS:
+        return False
+    return HEAVY_BACKENDS or not model['heavy']
+
+
+def get_model(name):
+    """The predict function registered as `name`, or None if it is unknown or disabled."""
+    return MODELS[name]['predict'] if is_enabled(name) else None
+
+
+def describe():
+    """Registry status for /api/stats: enabled, heavy, and whether the backend is imported yet."""
+    return {name: {'enabled': is_enabled(name), 'heavy': model['heavy'],
+                   'loaded': all(module in sys.modules for module in model['modules'])}
+            for name, model in MODELS.items()}
+
+
+# --- LSTM PERSISTENCE ---
+# Trained LSTMs and their scalers are kept per fund/series and fine-tuned on new NAVs
+# instead of being trained from scratch on every call.
+LSTM_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database', 'LSTM_Models')
+LSTM_EPOCHS = 20
+LSTM_FINE_TUNE_EPOCHS = int(os.environ.get('LSTM_FINE_TUNE_EPOCHS', '3'))
+LSTM_FINE_TUNE_MIN_WINDOWS = 32      # newest windows replayed in a fine-tune, even if fewer points are new
+LSTM_RETRAIN_AFTER_DAYS = int(os.environ.get('LSTM_RETRAIN_AFTER_DAYS', '30'))  # full retrain past this age
+LSTM_MAX_NEW_POINTS = 60             # more new points than this: full retrain
+LSTM_RANGE_TOLERANCE = 0.1           # new values this far outside the scaler's fitted range: full retrain
+LSTM_MODEL_CACHE_SIZE = 16           # loaded models kept in memory
+# 'graph': test set and horizon in one compiled call; 'loop': one model.predict per forecast day
+LSTM_FORECAST_MODE = os.environ.get('LSTM_FORECAST_MODE', 'graph')
+
+_lstm_models = OrderedDict()         # (model_key, seq) -> (file signature, state dict), most recently used last
+_lstm_lock = threading.Lock()
+_lstm_key_locks = {}
+
+# --- ARIMA WARM START ---
+# Fitted ARIMA parameters are kept per fund/series. A few new daily points reuse them as they are
+# (the Kalman filter runs over the window with fixed parameters); more new points, or old
+# parameters, re-estimate starting from them instead of from the default start values.
+ARIMA_ORDER = (5, 1, 0)
+ARIMA_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Database', 'ARIMA_Models')
+ARIMA_EXTEND_MAX_POINTS = int(os.environ.get('ARIMA_EXTEND_MAX_POINTS', '7'))  # daily points, weekends included
+ARIMA_REFIT_AFTER_DAYS = int(os.environ.get('ARIMA_REFIT_AFTER_DAYS', '7'))    # re-estimate at least this often
+
+_arima_params = {}                   # model_key -> (file signature, saved state dict)
+_arima_stats = {'fit': 0, 'warm_fit': 0, 'extend': 0}
+
+
+@register_model('linear', modules=('sklearn',))
 def predict_nav_linear(data, days=30):
     """Predict NAV using Linear Regression."""
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+
     df = data.copy()
     df['Days'] = np.arange(len(df))
     
@@ -44,11 +123,98 @@ def predict_nav_linear(data, days=30):
         'model_score': model.score(X_test, y_test)
     }
 
-def predict_nav_arima(data, days=30):
-    """Predict NAV using ARIMA."""
+def _safe_key(model_key):
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in model_key.lower())
+
+
+def _arima_path(model_key):
+    return os.path.join(ARIMA_STATE_DIR, f"{_safe_key(model_key)}.json")
+
+
+def _arima_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load_arima_state(model_key):
+    """
+    {'order', 'params', 'fitted_at', 'last_date'} saved for `model_key`, or None.
+
+    The in-memory copy is trusted only while the file's (mtime, size) is unchanged: the compare
+    view fits in pool worker processes, so another process may have saved newer parameters.
+    """
+    path = _arima_path(model_key)
+    try:
+        signature = _arima_signature(path)
+    except OSError:
+        _arima_params.pop(model_key, None)
+        return None
+    cached = _arima_params.get(model_key)
+    if cached is not None and cached[0] == signature:
+        state = cached[1]
+    else:
+        try:
+            with open(path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        _arima_params[model_key] = (signature, state)
+    return state if tuple(state.get('order', ())) == ARIMA_ORDER else None
+
+
+def save_arima_state(model_key, params, last_date, fitted_at):
+    state = {'order': list(ARIMA_ORDER), 'params': [float(p) for p in params],
+             'fitted_at': fitted_at, 'last_date': last_date}
+    path = _arima_path(model_key)
+    try:
+        atomic_write_json(path, state)
+        _arima_params[model_key] = (_arima_signature(path), state)
+    except OSError as e:
+        _arima_params.pop(model_key, None)
+        print(f"Could not save ARIMA parameters for {model_key}: {e}")
+
+
+def _fit_arima(y, model_key):
+    """Fitted ARIMA results for `y`, reusing or warm-starting from the parameters saved for `model_key`."""
+    from statsmodels.tsa.arima.model import ARIMA
+
+    model = ARIMA(y, order=ARIMA_ORDER)
+    state = load_arima_state(model_key) if model_key else None
+    last_date = str(y.index[-1])
+    if state is None:
+        mode = 'fit'
+        model_fit = model.fit()
+    else:
+        n_new = int((y.index > pd.Timestamp(state['last_date'])).sum())
+        fresh = time.time() - state['fitted_at'] < ARIMA_REFIT_AFTER_DAYS * 86400
+        if fresh and n_new <= ARIMA_EXTEND_MAX_POINTS:
+            # Same parameters, state extended over the new points: no optimisation at all
+            mode = 'extend'
+            model_fit = model.filter(np.asarray(state['params']))
+        else:
+            mode = 'warm_fit'
+            model_fit = model.fit(start_params=np.asarray(state['params']))
+    _arima_stats[mode] += 1
+
+    if model_key:
+        if mode == 'extend':
+            save_arima_state(model_key, state['params'], last_date, state['fitted_at'])
+        else:
+            save_arima_state(model_key, model_fit.params, last_date, time.time())
+    return model_fit
+
+
+def arima_stats():
+    return dict(_arima_stats)
+
+
+@register_model('arima', heavy=True, modules=('statsmodels',))
+def predict_nav_arima(data, days=30, model_key=None):
+    """
+    Predict NAV using ARIMA.
+    With a `model_key` (e.g. "<fund>:nav") the fitted parameters are saved and reused by later calls.
+    """
     try:
-        from statsmodels.tsa.arima.model import ARIMA
-        
         df = data.copy()
         
         # Ensure index is datetime
@@ -65,8 +231,7 @@ def predict_nav_arima(data, days=30):
         y = df['NAV']
         
         # Fit ARIMA model (using a standard order, e.g., (5,1,0))
-        model = ARIMA(y, order=(5,1,0))
-        model_fit = model.fit()
+        model_fit = _fit_arima(y, model_key)
         
         # Forecast
         forecast_result = model_fit.get_forecast(steps=days)
@@ -81,8 +246,12 @@ def predict_nav_arima(data, days=30):
     except Exception as e:
         print(f"ARIMA prediction failed: {e}")
         return None
+
 def build_lstm_model(sequence_length):
     """Build LSTM model architecture."""
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
+
     model = Sequential([
         LSTM(50, activation='relu', return_sequences=True, input_shape=(sequence_length, 1)),
         Dropout(0.2),
@@ -93,17 +262,177 @@ def build_lstm_model(sequence_length):
     model.compile(optimizer='adam', loss='mse')
     return model
 
-def predict_nav_lstm(data, days=30, sequence_length=60):
-    """Predict NAV using LSTM Deep Learning."""
+def _make_rollout(model, days):
+    """
+    Compiled forecast for `model`: one forward pass over every window in the batch (the test set),
+    then `days` autoregressive steps from the last window, all inside a single tf.function call.
+    """
+    import tensorflow as tf
+
+    @tf.function(reduce_retracing=True)
+    def rollout(windows):
+        first = model(windows, training=False)              # (n, 1): one-step prediction per window
+        sequence = windows[-1:]
+        step = first[-1:]
+        horizon = tf.TensorArray(tf.float32, size=days)
+        horizon = horizon.write(0, step[0, 0])
+        for i in tf.range(1, days):
+            sequence = tf.concat([sequence[:, 1:, :], tf.reshape(step, (1, 1, 1))], axis=1)
+            step = model(sequence, training=False)
+            horizon = horizon.write(i, step[0, 0])
+        return first[:-1], horizon.stack()
+    return rollout
+
+
+def lstm_forecast(model, X_test, last_sequence, days, mode=None):
+    """
+    Test-set predictions (n, 1) and the scaled `days`-step horizon (days, 1).
+    'graph' mode runs both as one batched call; 'loop' mode is the old one-predict-per-day path.
+    """
+    mode = mode or LSTM_FORECAST_MODE
+    if mode == 'loop':
+        y_pred = model.predict(X_test, verbose=0)
+        future_predictions = []
+        current_sequence = last_sequence.copy()
+        for _ in range(days):
+            current_sequence_reshaped = current_sequence.reshape(1, len(last_sequence), 1)
+            next_pred = model.predict(current_sequence_reshaped, verbose=0)
+            future_predictions.append(next_pred[0, 0])
+            current_sequence = np.append(current_sequence[1:], next_pred[0, 0])
+        return y_pred, np.array(future_predictions).reshape(-1, 1)
+
+    import tensorflow as tf
+
+    # Kept on the model itself (outside Keras attribute tracking) so they are dropped with it
+    fns = getattr(model, '_nav_rollouts', None)
+    if fns is None:
+        fns = {}
+        object.__setattr__(model, '_nav_rollouts', fns)
+    if days not in fns:
+        fns[days] = _make_rollout(model, days)
+    windows = np.concatenate([X_test, last_sequence.reshape(1, -1, 1)]).astype(np.float32)
+    y_pred, horizon = fns[days](tf.constant(windows))
+    return y_pred.numpy(), horizon.numpy().reshape(-1, 1)
+
+
+def _lstm_dir(model_key, sequence_length):
+    return os.path.join(LSTM_MODEL_DIR, f"{_safe_key(model_key)}_seq{sequence_length}")
+
+
+def _key_lock(model_key):
+    with _lstm_lock:
+        return _lstm_key_locks.setdefault(model_key, threading.Lock())
+
+
+def _lstm_signature(directory):
+    # meta.json is written last by save_lstm_state, so together with the model file it marks a save
+    model_stat = os.stat(os.path.join(directory, 'model.keras'))
+    meta_stat = os.stat(os.path.join(directory, 'meta.json'))
+    return (model_stat.st_mtime_ns, meta_stat.st_mtime_ns, meta_stat.st_size)
+
+
+def load_lstm_state(model_key, sequence_length):
+    """
+    {'model', 'scaler', 'meta'} for a saved LSTM (memory first, then disk), or None.
+    The in-memory copy is only used while the saved files are unchanged: the web process and the
+    model pool workers fine-tune and save the same models.
+    """
+    cache_key = (model_key, sequence_length)
+    directory = _lstm_dir(model_key, sequence_length)
+    try:
+        signature = _lstm_signature(directory)
+    except OSError:
+        with _lstm_lock:
+            _lstm_models.pop(cache_key, None)
+        return None
+    with _lstm_lock:
+        cached = _lstm_models.get(cache_key)
+        if cached is not None and cached[0] == signature:
+            _lstm_models.move_to_end(cache_key)
+            return cached[1]
+    try:
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, 'scaler.pkl'), 'rb') as f:
+            scaler = pickle.load(f)
+        from tensorflow import keras
+        model = keras.models.load_model(os.path.join(directory, 'model.keras'))
+    except (OSError, ValueError):
+        return None
+    except Exception as e:
+        print(f"Could not load saved LSTM for {model_key}: {e}")
+        return None
+    state = {'model': model, 'scaler': scaler, 'meta': meta}
+    _remember_lstm_state(cache_key, signature, state)
+    return state
+
+
+def _remember_lstm_state(cache_key, signature, state):
+    with _lstm_lock:
+        _lstm_models[cache_key] = (signature, state)
+        _lstm_models.move_to_end(cache_key)
+        while len(_lstm_models) > LSTM_MODEL_CACHE_SIZE:
+            _lstm_models.popitem(last=False)
+
+
+def save_lstm_state(model_key, sequence_length, model, scaler, meta):
+    directory = _lstm_dir(model_key, sequence_length)
+    # Unique temp names: another process may be saving the same model at the same time
+    atomic_write_with(os.path.join(directory, 'model.keras'), model.save)
+    atomic_write_bytes(os.path.join(directory, 'scaler.pkl'), pickle.dumps(scaler))
+    atomic_write_json(os.path.join(directory, 'meta.json'), meta)
+    _remember_lstm_state((model_key, sequence_length), _lstm_signature(directory),
+                         {'model': model, 'scaler': scaler, 'meta': meta})
+
+
+def _lstm_plan(state, df, values):
+    """'train' (from scratch), 'fine_tune' (on new points) or 'reuse' (nothing new), plus the new-point count."""
+    if state is None:
+        return 'train', len(df)
+    meta = state['meta']
+    if time.time() - meta['trained_at'] > LSTM_RETRAIN_AFTER_DAYS * 86400:
+        return 'train', len(df)
+    n_new = int((df.index > pd.Timestamp(meta['last_date'])).sum())
+    if n_new > LSTM_MAX_NEW_POINTS:
+        return 'train', n_new
+    low, high = state['scaler'].data_min_[0], state['scaler'].data_max_[0]
+    margin = (high - low) * LSTM_RANGE_TOLERANCE
+    if values.min() < low - margin or values.max() > high + margin:
+        return 'train', n_new
+    return ('fine_tune' if n_new else 'reuse'), n_new
+
+
+@register_model('lstm', heavy=True, modules=('tensorflow', 'sklearn'))
+def predict_nav_lstm(data, days=30, sequence_length=60, model_key=None):
+    """
+    Predict NAV using LSTM Deep Learning.
+    With a `model_key` (e.g. "<fund>:nav") the trained model and scaler are saved and later calls
+    fine-tune them on the newly arrived points only; without one a throwaway model is trained.
+    """
+    if model_key is None:
+        return _predict_nav_lstm(data, days, sequence_length, None)
+    with _key_lock(model_key):
+        return _predict_nav_lstm(data, days, sequence_length, model_key)
+
+
+def _predict_nav_lstm(data, days, sequence_length, model_key):
     try:
+        from sklearn.preprocessing import MinMaxScaler
+
         df = data.copy()
         values = df['NAV'].values.reshape(-1, 1)
         
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_data = scaler.fit_transform(values)
-        
-        if len(scaled_data) < sequence_length + 20:
+        if len(values) < sequence_length + 20:
             return None
+
+        state = load_lstm_state(model_key, sequence_length) if model_key else None
+        plan, n_new = _lstm_plan(state, df, values)
+        if plan == 'train':
+            scaler = MinMaxScaler(feature_range=(0, 1))
+            scaled_data = scaler.fit_transform(values)
+        else:
+            scaler = state['scaler']
+            scaled_data = scaler.transform(values)
         
         X, y = [], []
         for i in range(sequence_length, len(scaled_data)):
@@ -117,25 +446,29 @@ def predict_nav_lstm(data, days=30, sequence_length=60):
         X_train, X_test = X[:train_size], X[train_size:]
         y_train, y_test = y[:train_size], y[train_size:]
         
-        model = build_lstm_model(sequence_length)
-        
-        model.fit(X_train, y_train, epochs=20, batch_size=32, verbose=0, validation_split=0.1)
-        
-        y_pred = model.predict(X_test, verbose=0)
+        if plan == 'train':
+            model = build_lstm_model(sequence_length)
+            model.fit(X_train, y_train, epochs=LSTM_EPOCHS, batch_size=32, verbose=0, validation_split=0.1)
+        else:
+            model = state['model']
+            if plan == 'fine_tune':
+                # New points move the 80/20 boundary forward by as many windows; only the windows that
+                # just crossed into the training slice (plus a few before them) are trained on, so the
+                # test slice stays held out exactly as for a model trained from scratch
+                tail = min(train_size, max(n_new, LSTM_FINE_TUNE_MIN_WINDOWS))
+                model.fit(X_train[-tail:], y_train[-tail:], epochs=LSTM_FINE_TUNE_EPOCHS, batch_size=32, verbose=0)
+
+        if model_key and plan != 'reuse':
+            meta = dict(state['meta']) if plan == 'fine_tune' else {'trained_at': time.time(), 'fine_tunes': 0}
+            meta['last_date'] = str(df.index[-1])
+            meta['updated_at'] = time.time()
+            if plan == 'fine_tune':
+                meta['fine_tunes'] = meta.get('fine_tunes', 0) + 1
+            save_lstm_state(model_key, sequence_length, model, scaler, meta)
         
-        # Future predictions
+        # Test-set predictions and the future horizon
         last_sequence = scaled_data[-sequence_length:]
-        future_predictions = []
-        
-        current_sequence = last_sequence.copy()
-        
-        for _ in range(days):
-            current_sequence_reshaped = current_sequence.reshape(1, sequence_length, 1)
-            next_pred = model.predict(current_sequence_reshaped, verbose=0)
-            future_predictions.append(next_pred[0, 0])
-            current_sequence = np.append(current_sequence[1:], next_pred[0, 0])
-        
-        future_predictions = np.array(future_predictions).reshape(-1, 1)
+        y_pred, future_predictions = lstm_forecast(model, X_test, last_sequence, days)
         future_predictions = scaler.inverse_transform(future_predictions)
         
         y_test_actual = scaler.inverse_transform(y_test.reshape(-1, 1))
@@ -152,8 +485,9 @@ def predict_nav_lstm(data, days=30, sequence_length=60):
             'test_dates': test_dates,
             'future_predictions': future_predictions.flatten(),
             'future_dates': future_dates,
-            'mse': mse
+            'mse': mse,
+            'training': plan
         }
     except Exception as e:
-        st.warning(f"LSTM prediction failed: {str(e)}")
+        print(f"LSTM prediction failed: {e}")
         return None
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Bulk NAV prefetch for the whole Funds.txt universe.
+
+Fetches (or incrementally refreshes) NAV history for every fund with a bounded thread pool,
+so the first user to open a fund is served from Database/NAV_History.
+Progress is checkpointed after every fund, so an interrupted run resumes where it stopped.
+The checkpoint is removed once a run finishes without failures, so the next run refreshes everything.
+
+Usage:
+    python prefetch.py                   # resume (or start) a run with 8 workers
+    python prefetch.py --workers 16      # more concurrency
+    python prefetch.py --fresh           # ignore the checkpoint and start over
+    python prefetch.py --retry-failed    # only re-run funds that failed last time
+    python prefetch.py --match "Axis"    # restrict to funds containing a substring
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import http_client
+import navhistory
+import navstore
+from fileio import atomic_write_json
+
+CHECKPOINT_PATH = os.path.join(navstore.NAV_DIR, '_prefetch_checkpoint.json')
+DEFAULT_WORKERS = 8
+
+
+def load_checkpoint():
+    try:
+        with open(CHECKPOINT_PATH, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        checkpoint = {}
+    checkpoint.setdefault('done', {})
+    checkpoint.setdefault('failed', {})
+    return checkpoint
+
+
+def fetch_one(fund_name):
+    """Refresh one fund; returns the number of new rows (full fetch if the fund is not stored yet)."""
+    added = navhistory.refresh_history(fund_name)
+    if added is None:
+        raise RuntimeError("no NAV history returned")
+    return added
+
+
+def run(fund_names, workers=DEFAULT_WORKERS, fresh=False, retry_failed=False):
+    """
+    Prefetch NAV history for `fund_names` with `workers` threads.
+    Returns the checkpoint dict ({'done': {...}, 'failed': {...}}) after the run.
+    """
+    checkpoint = {'done': {}, 'failed': {}} if fresh else load_checkpoint()
+    if retry_failed:
+        pending = [f for f in fund_names if f in checkpoint['failed']]
+    else:
+        pending = [f for f in fund_names if f not in checkpoint['done']]
+
+    skipped = len(fund_names) - len(pending)
+    print(f"Prefetching {len(pending)} funds with {workers} workers ({skipped} already done)")
+
+    lock = threading.Lock()
+    new_rows = 0
+    ok = failed = 0
+    http_client.reset_stats()
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_one, name): name for name in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            with lock:
+                try:
+                    added = future.result()
+                    checkpoint['done'][name] = {'added': added, 'at': time.time()}
+                    checkpoint['failed'].pop(name, None)
+                    new_rows += added
+                    ok += 1
+                except Exception as e:
+                    checkpoint['failed'][name] = str(e)
+                    failed += 1
+                # Persist after every fund so a crash loses at most the in-flight ones
+                atomic_write_json(CHECKPOINT_PATH, checkpoint)
+            print(f"[{i}/{len(pending)}] {'✓' if name in checkpoint['done'] else '✗'} {name}")
+
+    elapsed = time.perf_counter() - start
+    rate = len(pending) / elapsed if elapsed > 0 else 0.0
+    print("\n" + "=" * 50)
+    print("PREFETCH SUMMARY")
+    print("=" * 50)
+    print(f"Funds processed : {len(pending)} ({ok} ok, {failed} failed, {skipped} skipped)")
+    print(f"New NAV rows    : {new_rows}")
+    print(f"Elapsed         : {elapsed:.1f} s ({rate:.2f} funds/s)")
+    print(http_client.format_stats())
+    if checkpoint['failed']:
+        print("Failed funds (re-run with --retry-failed):")
+        for name, error in sorted(checkpoint['failed'].items()):
+            print(f"  - {name}: {error}")
+    elif os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch NAV history for every fund in Funds.txt")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="concurrent fetches")
+    parser.add_argument('--fresh', action='store_true', help="ignore the checkpoint and start over")
+    parser.add_argument('--retry-failed', action='store_true', help="only re-run funds that failed")
+    parser.add_argument('--match', help="only funds whose name contains this text (case-insensitive)")
+    parser.add_argument('--limit', type=int, help="only the first N funds")
+    args = parser.parse_args()
+
+    fund_names = navhistory.load_fund_names()
+    if args.match:
+        fund_names = [f for f in fund_names if args.match.lower() in f.lower()]
+    if args.limit:
+        fund_names = fund_names[:args.limit]
+
+    run(fund_names, workers=args.workers, fresh=args.fresh, retry_failed=args.retry_failed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Offline fund-page snapshot corpus and per-phase scraper benchmark.
+
+`record` opens live fund pages once and saves everything the extraction phases read:
+the page HTML (scripts and external assets stripped), every portfolio table page per category,
+and the page's JSON (XHR) responses. `serve` replays a corpus from a local HTTP stand-in: each
+fund page is served with a small script that swaps in the recorded portfolio table when a
+category or 'next' is clicked and re-fetches the recorded payloads, so all three parse modes
+run against it unchanged. `bench` times every extraction phase over the corpus.
+
+Corpus layout (one directory per fund):
+    <corpus>/<fund>/page.html       page snapshot
+    <corpus>/<fund>/portfolio.json  {category: [table wrapper HTML per page]}
+    <corpus>/<fund>/xhr.json        xhr_capture fixture (also usable with `xhr_capture.py replay`)
+    <corpus>/<fund>/meta.json       selected fund, source URL, recorded-at
+
+Usage:
+    python scrape_bench.py record "Axis Aggressive Hybrid Fund - Gr" [...]
+    python scrape_bench.py serve                       # browse the corpus at the printed URL
+    python scrape_bench.py bench --modes soup,xhr --repeat 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import fund_index
+import page_parser
+import xhr_capture
+from fileio import atomic_write_bytes, atomic_write_json
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'snapshots')
+MAX_RECORDED_PAGES = 50            # per portfolio category
+STRIPPED_TAGS = ("script", "noscript", "link", "img", "iframe")  # nothing in a snapshot may hit the network
+BENCH_MODES = ("selenium", "soup", "xhr")
+
+# Injected into every replayed page. Category clicks and 'next' clicks swap the portfolio table for
+# the recorded page, optionally after a delay that stands in for the live site's render latency.
+REPLAY_SHIM = """
+<script>
+(function () {
+  var states = %(states)s, payloads = %(payloads)s, latency = %(latency)d;
+  var current = {category: null, page: 0};
+  payloads.forEach(function (url) { fetch(url); });
+
+  function container() {
+    return document.evaluate(%(container_xpath)s, document, null,
+      XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  }
+  function show(category, page) {
+    var pages = states[category], box = container();
+    if (!pages || page >= pages.length || !box) return;
+    setTimeout(function () {
+      var holder = document.createElement('div');
+      holder.innerHTML = pages[page];
+      var wrapper = box.querySelector('div.ant-table-wrapper');
+      if (wrapper) { wrapper.replaceWith(holder.firstElementChild); } else { box.appendChild(holder.firstElementChild); }
+      current = {category: category, page: page};
+    }, latency);
+  }
+  document.addEventListener('click', function (event) {
+    var label = event.target.closest('label');
+    if (label) {
+      var category = Array.prototype.map.call(label.querySelectorAll('span'), function (s) {
+        return s.textContent.trim();
+      }).filter(function (text) { return text in states; })[0];
+      if (category) {
+        Array.prototype.forEach.call(label.parentNode.querySelectorAll('label'), function (other) {
+          other.classList.remove('ant-radio-button-wrapper-checked');
+        });
+        label.classList.add('ant-radio-button-wrapper-checked');
+        show(category, 0);
+        return;
+      }
+    }
+    if (event.target.closest('li.ant-pagination-next') && current.category) {
+      show(current.category, current.page + 1);
+    }
+  }, true);
+})();
+</script>
+"""
+
+
+def _slug(fund_name):
+    return fund_index.safe_name(fund_name).replace('/', '_')
+
+
+# --- RECORDING (live site) ---
+
+def _strip_page(html):
+    soup = page_parser.make_soup(html)
+    for tag in soup.find_all(STRIPPED_TAGS):
+        tag.decompose()
+    return str(soup)
+
+
+def _strip_wrapper(html):
+    # The recorded pages already use the largest page size; a dead size changer would only stall replays
+    soup = page_parser.make_soup(html)
+    for option in soup.select("li.ant-pagination-options"):
+        option.decompose()
+    return str(soup)
+
+
+def _record_portfolio(driver, scraper):
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+    states = {}
+    for category in scraper.PORTFOLIO_CATEGORIES:
+        container = scraper._portfolio_container(driver)
+        if not scraper._click_category(driver, container, category):
+            continue
+        scraper._select_largest_page_size(driver, container)
+        pages = states[category] = []
+        while len(pages) < MAX_RECORDED_PAGES:
+            container = scraper._portfolio_container(driver)
+            try:
+                table_wrapper = container.find_element(By.XPATH, ".//div[@class='ant-table-wrapper']")
+            except NoSuchElementException:
+                break
+            pages.append(_strip_wrapper(table_wrapper.get_attribute("outerHTML")))
+            try:
+                scraper._next_page(driver, container, table_wrapper, f"'{category}' after page {len(pages)}")
+            except (TimeoutException, NoSuchElementException):
+                break
+        print(f"Recorded {len(pages)} '{category}' pages")
+    return states
+
+
+def record(search_terms, corpus_dir=CORPUS_DIR):
+    """
+    Open each fund page live once and save its snapshot into the corpus. A fund whose page cannot
+    be opened, or whose portfolio pagination stalls (the recording would be incomplete), is skipped.
+    """
+    import scraper
+    from selenium.common.exceptions import WebDriverException
+
+    driver = scraper.create_driver(headless=True, capture_network=True)
+    try:
+        scraper.open_home(driver)
+        for search_term in search_terms:
+            fund_dir = os.path.join(corpus_dir, _slug(search_term))
+            xhr_capture.drain(driver)
+            try:
+                selected_fund, original_window = scraper.open_fund_page(driver, search_term)
+            except Exception as e:
+                # open_fund_page reports a missing search result as a plain Exception
+                print(f"✗ Could not open {search_term}: {e}")
+                scraper.reset_driver(driver)
+                continue
+            try:
+                responses = xhr_capture.capture_json_responses(driver)
+                html = _strip_page(driver.page_source)
+                states = _record_portfolio(driver, scraper)
+
+                atomic_write_bytes(os.path.join(fund_dir, 'page.html'), html.encode('utf-8'))
+                atomic_write_json(os.path.join(fund_dir, 'portfolio.json'), states)
+                xhr_capture.save_fixture(os.path.join(fund_dir, 'xhr.json'), selected_fund, responses)
+                atomic_write_json(os.path.join(fund_dir, 'meta.json'), {
+                    'selected_fund': selected_fund,
+                    'search_term': search_term,
+                    'url': driver.current_url,
+                    'recorded_at': time.time(),
+                })
+                print(f"✓ Recorded {selected_fund} -> {fund_dir}")
+
+                driver.close()
+                driver.switch_to.window(original_window)
+                scraper.reset_driver(driver)
+            except scraper.PaginationStalled as e:
+                print(f"✗ Not recording {search_term}, its portfolio would be incomplete: {e}")
+                scraper.reset_driver(driver)
+            except (WebDriverException, OSError) as e:
+                print(f"✗ Could not record {search_term}: {e}")
+                scraper.reset_driver(driver)
+    finally:
+        driver.quit()
+
+
+# --- REPLAY SERVER ---
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    """[{'slug', 'dir', 'meta', 'states', 'responses'}] for every recorded fund, sorted by slug."""
+    corpus = []
+    if not os.path.isdir(corpus_dir):
+        return corpus
+    for slug in sorted(os.listdir(corpus_dir)):
+        fund_dir = os.path.join(corpus_dir, slug)
+        if not os.path.exists(os.path.join(fund_dir, 'page.html')):
+            continue
+        with open(os.path.join(fund_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(fund_dir, 'portfolio.json'), 'r', encoding='utf-8') as f:
+            states = json.load(f)
+        _, responses = xhr_capture.load_fixture(os.path.join(fund_dir, 'xhr.json'))
+        corpus.append({'slug': slug, 'dir': fund_dir, 'meta': meta, 'states': states, 'responses': responses})
+    return corpus
+
+
+def _payload_path(index, url):
+    # Keep the recorded path and query so the xhr mappers route replayed payloads exactly like live ones
+    parts = urlparse(url)
+    return f"/f/{index}/xhr{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+
+def start_replay_server(corpus, latency_ms=0):
+    """
+    Serve the corpus on 127.0.0.1: fund i at /f/<i>/ and its payloads under /f/<i>/xhr/...
+    Returns (base_url, server); call server.shutdown() when done.
+    """
+    import scraper
+
+    routes = {}
+    for i, entry in enumerate(corpus):
+        payload_urls = []
+        for response in entry['responses']:
+            path = _payload_path(i, response['url'])
+            routes[path] = ('application/json', json.dumps(response['body']).encode('utf-8'))
+            payload_urls.append(path)
+        with open(os.path.join(entry['dir'], 'page.html'), 'r', encoding='utf-8') as f:
+            html = f.read()
+        shim = REPLAY_SHIM % {
+            'states': json.dumps(entry['states']),
+            'payloads': json.dumps(payload_urls),
+            'latency': latency_ms,
+            'container_xpath': json.dumps(scraper.PORTFOLIO_CONTAINER_XPATH),
+        }
+        html = html.replace('</body>', shim + '</body>') if '</body>' in html else html + shim
+        routes[f"/f/{i}/"] = ('text/html; charset=utf-8', html.encode('utf-8'))
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path not in routes:
+                self.send_response(404)
+                self.end_headers()
+                return
+            content_type, payload = routes[self.path]
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+# --- BENCHMARK ---
+
+def _time_offline(entry, timings):
+    """Phases that need no browser: the soup parse of the snapshot and the xhr payload mapping."""
+    import scraper
+
+    with open(os.path.join(entry['dir'], 'page.html'), 'r', encoding='utf-8') as f:
+        html = f.read()
+    timer = scraper.PhaseTimer()
+    page_parser.parse_static_sections(html, scraper.new_fund_data(entry['meta']['selected_fund']), timer)
+    for phase, seconds in timer.timings.items():
+        timings.setdefault(('soup (offline)', phase), []).append(seconds)
+
+    start = time.perf_counter()
+    xhr_capture.build_final_data(entry['responses'], scraper.new_fund_data(entry['meta']['selected_fund']))
+    timings.setdefault(('xhr (offline)', 'xhr mapping'), []).append(time.perf_counter() - start)
+
+
+def _time_browser(driver, url, entry, mode, timings):
+    """Load one replayed page and time every extraction phase of `mode`."""
+    import scraper
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    if mode == "xhr":
+        xhr_capture.drain(driver)
+    driver.get(url)
+    scraper.wait_for(driver, 10, EC.presence_of_element_located((By.XPATH, scraper.PORTFOLIO_CONTAINER_XPATH)))
+    timer = scraper.PhaseTimer()
+    start = time.perf_counter()
+    scraper.extract_fund_page(driver, entry['meta']['selected_fund'], timer, mode)
+    timer.timings['total'] = time.perf_counter() - start
+    for phase, seconds in timer.timings.items():
+        timings.setdefault((mode, phase), []).append(seconds)
+
+
+def benchmark(corpus_dir=CORPUS_DIR, modes=BENCH_MODES, repeat=1, latency_ms=0):
+    """
+    Time each extraction phase over the corpus. Browser modes need Chrome; without it only the
+    offline phases (soup parse, xhr mapping) are timed. Returns {(mode, phase): [seconds, ...]}.
+    """
+    import scraper
+
+    corpus = load_corpus(corpus_dir)
+    if not corpus:
+        print(f"No snapshots in {corpus_dir}; record some with: python scrape_bench.py record \"<fund>\"")
+        return {}
+
+    timings = {}
+    for _ in range(repeat):
+        for entry in corpus:
+            _time_offline(entry, timings)
+
+    base_url, server = start_replay_server(corpus, latency_ms)
+    driver = None
+    try:
+        try:
+            driver = scraper.create_driver(headless=True, capture_network=True)
+        except Exception as e:
+            print(f"Chrome unavailable, timing offline phases only ({e})")
+        if driver is not None:
+            for _ in range(repeat):
+                for i, entry in enumerate(corpus):
+                    for mode in modes:
+                        try:
+                            _time_browser(driver, f"{base_url}/f/{i}/", entry, mode, timings)
+                        except Exception as e:
+                            print(f"✗ {entry['slug']} [{mode}]: {e}")
+    finally:
+        if driver is not None:
+            driver.quit()
+        server.shutdown()
+
+    report(timings, len(corpus), repeat)
+    return timings
+
+
+def report(timings, n_funds, repeat):
+    print(f"\nPer-phase latency over {n_funds} snapshots x {repeat} run(s)")
+    print(f"{'Mode':<16} {'Phase':<22} {'n':>4} {'mean ms':>9} {'p50 ms':>9} {'max ms':>9}")
+    for (mode, phase), samples in sorted(timings.items(), key=lambda item: (item[0][0], item[0][1] == 'total')):
+        ms = [s * 1e3 for s in samples]
+        print(f"{mode:<16} {phase:<22} {len(ms):>4} {statistics.mean(ms):>9.1f} "
+              f"{statistics.median(ms):>9.1f} {max(ms):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, replay and benchmark fund-page snapshots")
+    parser.add_argument('--corpus', default=CORPUS_DIR, help="snapshot corpus directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    record_cmd = sub.add_parser('record', help="snapshot live fund pages into the corpus")
+    record_cmd.add_argument('funds', nargs='+', help="search terms, as passed to scrape_fund_data")
+
+    serve_cmd = sub.add_parser('serve', help="serve the corpus until interrupted")
+    serve_cmd.add_argument('--latency-ms', type=int, default=0, help="delay before a table page swaps in")
+
+    bench_cmd = sub.add_parser('bench', help="time every extraction phase over the corpus")
+    bench_cmd.add_argument('--modes', default=",".join(BENCH_MODES), help="comma-separated parse modes")
+    bench_cmd.add_argument('--repeat', type=int, default=1)
+    bench_cmd.add_argument('--latency-ms', type=int, default=0, help="delay before a table page swaps in")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.funds, args.corpus)
+    elif args.command == 'serve':
+        corpus = load_corpus(args.corpus)
+        base_url, server = start_replay_server(corpus, args.latency_ms)
+        for i, entry in enumerate(corpus):
+            print(f"{base_url}/f/{i}/  {entry['meta']['selected_fund']}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        benchmark(args.corpus, [m for m in args.modes.split(',') if m], args.repeat, args.latency_ms)
+
+
+if __name__ == "__main__":
+    main()
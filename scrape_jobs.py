@@ -0,0 +1,150 @@
+"""
+Background queue for fund scrapes.
+
+A Selenium scrape takes tens of seconds, so request handlers submit it here and return a job id
+straight away instead of blocking a web worker. A bounded thread pool runs the jobs; the page
+polls the job's status and reloads once it is done. Submitting a fund that already has a queued
+or running job returns that job instead of queueing a second scrape.
+"""
+
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SCRAPE_JOB_WORKERS = int(os.environ.get('SCRAPE_JOB_WORKERS', '2'))  # concurrent scrapes (match SCRAPER_POOL_SIZE)
+MAX_FINISHED_JOBS = 200  # finished jobs kept for status polling before the oldest are forgotten
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class Job:
+    __slots__ = ('id', 'key', 'fund_name', 'status', 'result', 'error',
+                 'submitted_at', 'started_at', 'finished_at', 'position')
+
+    def __init__(self, key, fund_name, position):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.fund_name = fund_name
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.position = position  # submission order, used for the queue position
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def runtime(self):
+        """Seconds spent running (so far, if still running)."""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self, queue_position=None):
+        waited_until = self.started_at or time.time()
+        return {
+            'job_id': self.id,
+            'fund': self.fund_name,
+            'status': self.status,
+            'error': self.error,
+            'queue_position': queue_position,
+            'submitted_at': self.submitted_at,
+            'wait_seconds': round(waited_until - self.submitted_at, 3),
+            'runtime_seconds': round(self.runtime(), 3) if self.runtime() is not None else None,
+        }
+
+
+class ScrapeQueue:
+    def __init__(self, workers=SCRAPE_JOB_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.workers = workers
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scrape-job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()   # job id -> Job, in submission order
+        self._active = {}            # key -> queued/running Job
+        self._counter = itertools.count()
+        self.stats_data = {'submitted': 0, 'deduplicated': 0, 'done': 0, 'failed': 0,
+                           'runtime_total': 0.0, 'runtime_max': 0.0}
+
+    def submit(self, key, fund_name, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) as the scrape for `key` and return its Job.
+        If a job for `key` is already queued or running, that job is returned instead.
+        """
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                self.stats_data['deduplicated'] += 1
+                return job
+            job = Job(key, fund_name, next(self._counter))
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self.stats_data['submitted'] += 1
+            self._forget_finished()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            result = fn(*args, **kwargs)
+            status, error = DONE, None
+        except Exception as e:
+            result, status, error = None, FAILED, str(e)
+            print(f"Scrape job {job.id} ({job.fund_name}) failed: {e}")
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+            job.status = status
+            self._active.pop(job.key, None)
+            runtime = job.runtime()
+            self.stats_data[status] += 1
+            self.stats_data['runtime_total'] += runtime
+            self.stats_data['runtime_max'] = max(self.stats_data['runtime_max'], runtime)
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def describe(self, job):
+        """Job status dict including its position among queued jobs (1 = next to start)."""
+        with self._lock:
+            position = None
+            if job.status == QUEUED:
+                position = 1 + sum(1 for other in self._active.values()
+                                   if other.status == QUEUED and other.position < job.position)
+            return job.to_dict(position)
+
+    def jobs(self):
+        """Status of every queued, running and recently finished job, newest first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [self.describe(job) for job in reversed(jobs)]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.stats_data)
+            stats['workers'] = self.workers
+            stats['queued'] = sum(1 for job in self._active.values() if job.status == QUEUED)
+            stats['running'] = sum(1 for job in self._active.values() if job.status == RUNNING)
+        finished = stats['done'] + stats['failed']
+        stats['runtime_avg'] = stats['runtime_total'] / finished if finished else 0.0
+        return stats
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
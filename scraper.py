@@ -4,16 +4,118 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
 from selenium.webdriver.chrome.options import Options
 import os
+import atexit
+import multiprocessing.util
+import threading
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fund_index
+import fund_sections
+import page_parser
+import xhr_capture
+from driver_pool import DriverPool
+from page_parser import PERFORMANCE_TABLES, PROGRESS_SECTIONS
+from fileio import atomic_write_json
 
 
 # --- CONFIGURATION ---
+HOME_URL = "https://www.njwealth.in/"
 COOKIE_CLOSE_SELECTOR = "ant-modal-close-x"
 SEARCH_INPUT_SELECTOR = "//input[@placeholder='Search by Scheme Name']"
+POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', '2'))              # warm headless browsers
+DRIVER_MAX_USES = int(os.environ.get('SCRAPER_DRIVER_MAX_USES', '25'))  # scrapes before a browser is recycled
+POLL_INTERVAL = 0.1  # seconds between DOM condition checks
+PAGE_LOAD_TIMEOUT = 10  # seconds for a portfolio page to change after 'next' before the walk counts as stalled
+DROPDOWN_ROW_SELECTOR = "header_dropdownRow__3NCLn"
+PORTFOLIO_CONTAINER_XPATH = "//div[contains(@class, 'ant-collapse-header') and contains(., 'Portfolio Details')]/following-sibling::div"
+NEXT_PAGE_XPATH = ".//li[contains(@class, 'ant-pagination-next') and not(contains(@class, 'ant-pagination-disabled'))]/a"
+PAGE_SIZE_CHANGER_XPATH = ".//li[contains(@class, 'ant-pagination-options')]//div[contains(@class, 'ant-select')]"
+PORTFOLIO_CATEGORIES = ["Equity", "Debt", "Others"]
+# Walk the portfolio categories side by side in one tab each (0 = one after another in the fund tab)
+PORTFOLIO_TABS = os.environ.get('SCRAPER_PORTFOLIO_TABS', '1') == '1'
+# 'soup': parse one HTML snapshot per page state with BeautifulSoup (Selenium parse as fallback)
+# 'selenium': read every element through WebDriver calls
+# 'xhr': build the data from the page's own JSON responses (DOM parse fills whatever they miss)
+PARSE_MODE = os.environ.get('SCRAPER_PARSE_MODE', 'soup')
+# Chrome's performance log is only needed (and only paid for) in xhr mode
+CAPTURE_NETWORK = PARSE_MODE == 'xhr'
 # ---------------------
 
+# --- WAIT HELPERS ---
+
+def wait_for(driver, timeout, condition):
+    """WebDriverWait with tight polling; returns the condition's truthy value or raises TimeoutException."""
+    return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL,
+                         ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)).until(condition)
+
+
+class PaginationStalled(Exception):
+    """'next' was clicked but the portfolio table did not change: the holdings read so far are incomplete."""
+
+
+def wait_until_stable(driver, timeout, snapshot, polls=2):
+    """
+    Wait until `snapshot(driver)` returns the same non-empty value on `polls` consecutive polls.
+    Used where the DOM re-renders a few times (search dropdown, lazy sections) before settling.
+    """
+    state = {'last': None, 'seen': 0}
+
+    def settled(d):
+        try:
+            current = snapshot(d)
+        except Exception:
+            current = None
+        state['seen'] = state['seen'] + 1 if current and current == state['last'] else 1
+        state['last'] = current
+        return current if current and state['seen'] >= polls else False
+
+    return wait_for(driver, timeout, settled)
+
+
+def table_signature(container):
+    """Text of the first body row and the active page number: changes whenever the table re-renders."""
+    try:
+        first_row = container.find_element(By.XPATH, ".//div[@class='ant-table-wrapper']//tbody/tr[1]").text
+    except NoSuchElementException:
+        first_row = ""
+    try:
+        active_page = container.find_element(By.XPATH, ".//li[contains(@class, 'ant-pagination-item-active')]").text
+    except NoSuchElementException:
+        active_page = ""
+    return first_row, active_page
+
+
+class PhaseTimer:
+    """Accumulates wall-clock time per scrape phase and prints a breakdown."""
+
+    def __init__(self, timings=None):
+        self.timings = timings if timings is not None else {}
+
+    def phase(self, name):
+        timer = self
+
+        class _Phase:
+            def __enter__(self):
+                self.start = time.perf_counter()
+
+            def __exit__(self, *exc):
+                timer.timings[name] = timer.timings.get(name, 0.0) + time.perf_counter() - self.start
+                return False
+
+        return _Phase()
+
+    def report(self):
+        total = sum(self.timings.values())
+        print("\nTiming breakdown:")
+        for name, seconds in self.timings.items():
+            print(f"  {name:<22} {seconds:7.2f} s")
+        print(f"  {'total':<22} {total:7.2f} s")
+
+
 # --- HELPER FUNCTIONS ---
 
 def scrape_progress_section(driver, header_text):
@@ -49,7 +151,7 @@ def scrape_performance_table(driver, header_text):
     data = []
     try:
         table_xpath = f"//div[contains(@class, 'ant-collapse-header') and contains(., '{header_text}')]/following-sibling::div//table"
-        WebDriverWait(driver, 2).until(EC.presence_of_element_located((By.XPATH, table_xpath)))
+        wait_for(driver, 2, EC.presence_of_element_located((By.XPATH, table_xpath)))
         table = driver.find_element(By.XPATH, table_xpath)
         headers = [th.text.strip() for th in table.find_elements(By.TAG_NAME, "th")]
         rows = table.find_elements(By.XPATH, ".//tbody/tr")
@@ -65,16 +167,110 @@ def scrape_performance_table(driver, header_text):
 
 # -------------------------
 
-def scrape_fund_data(search_term, save_to_file=True, headless=True, debug=False):
+# --- DRIVER SETUP ---
+
+def create_driver(headless=True, capture_network=CAPTURE_NETWORK):
+    """Start a Chrome session with the scraper's options (and the performance log for xhr mode)."""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+    if capture_network:
+        xhr_capture.enable_capture(chrome_options)
+
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.maximize_window()
+    return driver
+
+
+def open_home(driver, cookie_timeout=5):
+    """Load the njwealth home page and dismiss the cookie banner if it shows up."""
+    print("Opening website...")
+    driver.get(HOME_URL)
+    try:
+        wait_for(driver, cookie_timeout, EC.element_to_be_clickable((By.CLASS_NAME, COOKIE_CLOSE_SELECTOR))).click()
+        wait_for(driver, 5, EC.invisibility_of_element_located((By.CLASS_NAME, COOKIE_CLOSE_SELECTOR)))
+        print("Cookie banner closed.")
+    except:
+        print("No cookie banner found or could not close.")
+
+
+def _new_pooled_driver():
+    driver = create_driver(headless=True)
+    open_home(driver)
+    return driver
+
+
+def reset_driver(driver):
+    """Return a used driver to a clean state: close extra tabs and reload the home page."""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    # The cookie choice persists in the session, so don't wait long for the banner again
+    open_home(driver, cookie_timeout=1)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool of warm headless drivers (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(_new_pooled_driver, reset=reset_driver, size=POOL_SIZE, max_uses=DRIVER_MAX_USES)
+            atexit.register(_pool.shutdown)
+    return _pool
+
+
+def pool_stats():
+    """Checkout/wait metrics of the driver pool, or None if it has not been started."""
+    return _pool.stats() if _pool is not None else None
+
+
+# -------------------------
+
+def _run_with_driver(work, headless, use_pool, timer, parse_mode):
+    """Run work(driver) on a pooled driver (headless) or on a browser started just for this call."""
+    if use_pool and headless:
+        start = time.perf_counter()
+        with get_pool().driver() as driver:
+            timer.timings['driver checkout'] = time.perf_counter() - start
+            return work(driver)
+
+    with timer.phase('browser startup'):
+        driver = create_driver(headless, capture_network=CAPTURE_NETWORK or parse_mode == 'xhr')
+        open_home(driver)
+    try:
+        return work(driver)
+    finally:
+        try:
+            driver.quit()
+            print("Driver closed.")
+        except:
+            pass
+
+
+def scrape_fund_data(search_term, save_to_file=True, headless=True, debug=False, use_pool=True, timings=None,
+                     parse_mode=PARSE_MODE):
     """
     Main scraping function to be used with Flask.
     
     Args:
         search_term (str): The search term to enter (e.g., "Axis Aggressive Hybrid")
         save_to_file (bool): Whether to save the data to a JSON file
-        output_filename (str): The filename for the JSON output
         headless (bool): Run Chrome in headless mode (recommended for production)
         debug (bool): Enable debug mode with screenshots
+        use_pool (bool): Check a warm driver out of the shared pool (headless only)
+                         instead of starting and quitting a new browser
+        timings (dict): Optional dict filled with seconds spent per scrape phase
+        parse_mode (str): 'soup' parses HTML snapshots locally (Selenium parse as fallback),
+                          'selenium' reads every element through WebDriver,
+                          'xhr' maps the page's JSON responses (soup parse fills the gaps)
     
     Returns:
         dict: The scraped fund data containing fund information and the selected fund name
@@ -82,220 +278,472 @@ def scrape_fund_data(search_term, save_to_file=True, headless=True, debug=False)
     Raises:
         Exception: If scraping fails
     """
-    
-    # Setup Chrome options
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-    
-    driver = webdriver.Chrome(options=chrome_options)
-    driver.maximize_window()
     print(f"Scraper started for: {search_term}")
-
+    timer = PhaseTimer(timings)
     try:
-        # 1. Navigate and Search
-        print("Opening website...")
-        driver.get("https://www.njwealth.in/")
-        original_window = driver.current_window_handle
+        return _run_with_driver(
+            lambda driver: _scrape_with_driver(driver, search_term, save_to_file, debug, timer, parse_mode),
+            headless, use_pool, timer, parse_mode)
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+        import traceback
+        traceback.print_exc()
+        raise
 
-        try:
-            WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.CLASS_NAME, COOKIE_CLOSE_SELECTOR))).click()
-            print("Cookie banner closed.")
-            time.sleep(1)
-        except:
-            print("No cookie banner found or could not close.")
 
-        print(f"Searching for '{search_term}'...")
-        search_box = WebDriverWait(driver, 10).until(EC.visibility_of_element_located((By.XPATH, SEARCH_INPUT_SELECTOR)))
-        search_box.clear()
-        time.sleep(0.5)
+def refresh_fund_data(fund_name, phases=None, headless=True, use_pool=True, timings=None, parse_mode=PARSE_MODE):
+    """
+    Re-scrape only the expired sections of a fund's saved JSON (or the given `phases`) and merge them in.
+    Falls back to a full scrape if the fund has no JSON yet. Returns the updated fund data.
+    """
+    json_path = fund_index.index.find(fund_name)
+    if json_path is None:
+        return scrape_fund_data(fund_name, headless=headless, use_pool=use_pool, timings=timings,
+                                parse_mode=parse_mode)
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if phases is None:
+        phases = fund_sections.expired_phases(data, fallback_time=os.path.getmtime(json_path))
+    if not phases:
+        print(f"Nothing expired for {fund_name}")
+        return data
+
+    print(f"Refreshing {fund_name}: {', '.join(phases)}")
+    timer = PhaseTimer(timings)
+    # The stored dropdown name finds the same fund again
+    search_term = data.get("selected_fund") or fund_name
+    fresh = _run_with_driver(
+        lambda driver: _scrape_with_driver(driver, search_term, False, False, timer, parse_mode, phases),
+        headless, use_pool, timer, parse_mode)
+
+    fund_sections.merge(data, fresh, phases)
+    atomic_write_json(json_path, data)
+    return data
+
+
+def _save_debug_snapshot(driver, screenshot):
+    driver.save_screenshot(screenshot)
+    with open('debug_page_source.html', 'w', encoding='utf-8') as f:
+        f.write(driver.page_source)
+
+
+def open_fund_page(driver, search_term, debug=False):
+    """
+    Search for the fund from the home page, open the first dropdown match and switch to its tab.
+    Returns (selected fund name, handle of the search tab).
+    """
+    original_window = driver.current_window_handle
+
+    print(f"Searching for '{search_term}'...")
+    search_box = wait_for(driver, 10, EC.visibility_of_element_located((By.XPATH, SEARCH_INPUT_SELECTOR)))
+    search_box.clear()
+    # send_keys emits one key event per character, which is what triggers the dropdown search
+    search_box.send_keys(search_term)
+    
+    # Wait for the dropdown rows to be present and to stop changing (results for the full term)
+    print("Waiting for dropdown results...")
+    try:
+        # A few polls of agreement so results for a partially typed term are not picked up
+        wait_until_stable(driver, 10, lambda d: tuple(
+            row.text for row in d.find_elements(By.CLASS_NAME, DROPDOWN_ROW_SELECTOR)[:3]), polls=4)
+        print("✓ Dropdown results found!")
+    except TimeoutException:
+        print("✗ Dropdown container not found")
+        if debug:
+            _save_debug_snapshot(driver, 'debug_no_dropdown.png')
+        raise Exception("Dropdown did not appear. Check if search term returns results.")
+    
+    if debug:
+        driver.save_screenshot('debug_after_search.png')
+        print("Debug: Saved screenshot 'debug_after_search.png'")
+    
+    # Find the first dropdown item
+    print("Looking for first dropdown item...")
+    try:
+        first_item = driver.find_element(By.XPATH, f"//li[@class='{DROPDOWN_ROW_SELECTOR}'][1]//h5")
+        first_item_text = first_item.text.strip()
         
-        # Type character by character to trigger dropdown
-        for char in search_term:
-            search_box.send_keys(char)
-            time.sleep(0.1)
+        if not first_item_text:
+            raise Exception("First dropdown item has no text")
         
-        print("Waiting for dropdown results...")
-        time.sleep(2)  # Wait for dropdown to fully render
+        print(f"✓ First dropdown item found: '{first_item_text}'")
         
+    except Exception as e:
+        print(f"✗ Failed to find dropdown item: {e}")
         if debug:
-            driver.save_screenshot('debug_after_search.png')
-            print("Debug: Saved screenshot 'debug_after_search.png'")
-        
-        # Wait for the specific dropdown container
-        print("Looking for dropdown container...")
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "header_dropdown__29rBL"))
-            )
-            print("✓ Dropdown container found!")
-        except TimeoutException:
-            print("✗ Dropdown container not found")
-            if debug:
-                driver.save_screenshot('debug_no_dropdown.png')
-                with open('debug_page_source.html', 'w', encoding='utf-8') as f:
-                    f.write(driver.page_source)
-            raise Exception("Dropdown did not appear. Check if search term returns results.")
-        
-        # Find the first dropdown item
-        print("Looking for first dropdown item...")
-        try:
-            # Wait for dropdown items to be present
-            WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "header_dropdownRow__3NCLn"))
-            )
-            
-            # Get the first item
-            first_item = driver.find_element(By.XPATH, "//li[@class='header_dropdownRow__3NCLn'][1]//h5")
-            first_item_text = first_item.text.strip()
-            
-            if not first_item_text:
-                raise Exception("First dropdown item has no text")
-            
-            print(f"✓ First dropdown item found: '{first_item_text}'")
+            _save_debug_snapshot(driver, 'debug_item_not_found.png')
+        raise Exception(f"Could not find dropdown items: {e}")
+    
+    print("Clicking first dropdown item...")
+    
+    # Scroll into view and click
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", first_item)
+    
+    try:
+        # Try regular click first
+        first_item.click()
+        print("  ✓ Clicked using regular click")
+    except Exception as e:
+        print(f"  Regular click failed, trying JavaScript click...")
+        driver.execute_script("arguments[0].click();", first_item)
+        print("  ✓ Clicked using JavaScript")
+    
+    # Switch Tab
+    wait_for(driver, 10, EC.number_of_windows_to_be(2))
+    for window_handle in driver.window_handles:
+        if window_handle != original_window:
+            driver.switch_to.window(window_handle)
+            break
             
-        except Exception as e:
-            print(f"✗ Failed to find dropdown item: {e}")
-            if debug:
-                driver.save_screenshot('debug_item_not_found.png')
-                with open('debug_page_source.html', 'w', encoding='utf-8') as f:
-                    f.write(driver.page_source)
-            raise Exception(f"Could not find dropdown items: {e}")
-        
-        print("Clicking first dropdown item...")
-        
-        # Scroll into view and click
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", first_item)
-        time.sleep(0.5)
-        
-        try:
-            # Try regular click first
-            first_item.click()
-            print("  ✓ Clicked using regular click")
-        except Exception as e:
-            print(f"  Regular click failed, trying JavaScript click...")
-            driver.execute_script("arguments[0].click();", first_item)
-            print("  ✓ Clicked using JavaScript")
-        
-        time.sleep(1)
-        
-        # Switch Tab
-        WebDriverWait(driver, 10).until(EC.number_of_windows_to_be(2))
-        for window_handle in driver.window_handles:
-            if window_handle != original_window:
-                driver.switch_to.window(window_handle)
-                break
-                
-        print(f"Switched to fund page.")
-        
-        print("Waiting for fund page to lazy-load components...")
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//div[contains(., 'Scheme Documents')]"))
-            )
-            time.sleep(2)
-        except:
-            pass
-        print("Page components loaded.")
-
-        # 2. START SCRAPING
-        print("Scraping data...")
-        final_data = {
-            "selected_fund": first_item_text,
-            "basic_info": {},
-            "scheme_details": {},
-            "fund_managers": [],
-            "top_holdings": {},
-            "sector_holdings": {},
-            "asset_allocation": {},
-            "top_asset_type": {},
-            "credit_profile": {},
-            "portfolio_summary": {},
-            "portfolio_holdings": { "equity": [], "debt": [], "others": [] },
-            "performance_lumpsum": [],
-            "performance_sip": [],
-            "documents": []
-        }
-
-        # A. Basic Info
-        try:
-            final_data["basic_info"]["fund_name"] = driver.find_element(By.XPATH, "//h2[@class='pull-left']").text
-        except: 
-            pass
-        try:
-            final_data["basic_info"]["nav"] = driver.find_element(By.XPATH, "//div[@class='navbox']//strong[@class='text-black']").text
-        except: 
-            pass
-        try:
-            aum_element = driver.find_element(By.XPATH, "//div[contains(@class, 'aumamount')]/h2")
-            final_data["basic_info"]["aum"] = aum_element.text.split('\n')[0]
-        except: 
-            pass
+    print(f"Switched to fund page.")
+    
+    print("Waiting for fund page to lazy-load components...")
+    try:
+        wait_for(driver, 10, EC.presence_of_element_located((By.XPATH, "//div[contains(., 'Scheme Documents')]")))
+        # Sections render in bursts; wait until the set of collapse panels stops growing
+        wait_until_stable(driver, 5, lambda d: len(d.find_elements(By.CLASS_NAME, "ant-collapse-header")))
+    except:
+        pass
+    print("Page components loaded.")
+    return first_item_text, original_window
 
-        # B. Scheme Details
-        try:
-            aum_key = driver.find_element(By.XPATH, "//div[contains(@class, 'aumamount')]//small").text.strip()
-            aum_val = final_data["basic_info"]["aum"]
-            final_data["scheme_details"][aum_key] = aum_val
-        except: 
-            pass
-        try:
-            plan_lists = driver.find_elements(By.CLASS_NAME, "planLists")
-            for list_ul in plan_lists:
-                items = list_ul.find_elements(By.TAG_NAME, "li")
-                for item in items:
-                    try:
-                        label = item.find_element(By.TAG_NAME, "h5").text
-                        value = item.find_element(By.TAG_NAME, "p").text
-                        if label:
-                            final_data["scheme_details"][label.strip()] = value.strip()
-                    except: 
-                        continue
-        except: 
-            pass
 
-        # C. Fund Managers
-        try:
-            managers = driver.find_elements(By.XPATH, "//div[contains(@class, 'fundmanager')]//div[contains(@class, 'mt-3 p-2 ')]")
-            for mgr in managers:
-                name = mgr.find_element(By.TAG_NAME, "strong").text
-                details = mgr.text.replace(name, "").replace("View Details", "").strip().split('\n')
-                final_data["fund_managers"].append({
-                    "name": name,
-                    "tenure": details[0] if len(details) > 0 else "",
-                    "managing": details[1] if len(details) > 1 else ""
-                })
-        except: 
-            pass
+def new_fund_data(selected_fund):
+    """Empty `final_data` skeleton that every extraction path fills in."""
+    return {
+        "selected_fund": selected_fund,
+        "basic_info": {},
+        "scheme_details": {},
+        "fund_managers": [],
+        "top_holdings": {},
+        "sector_holdings": {},
+        "asset_allocation": {},
+        "top_asset_type": {},
+        "credit_profile": {},
+        "portfolio_summary": {},
+        "portfolio_holdings": { "equity": [], "debt": [], "others": [] },
+        "performance_lumpsum": [],
+        "performance_sip": [],
+        "documents": []
+    }
+
 
-        # D. Progress Bar Lists
-        final_data["top_holdings"] = scrape_progress_section(driver, "Top Holdings")
-        final_data["sector_holdings"] = scrape_progress_section(driver, "Top Sector Holdings")
-        final_data["asset_allocation"] = scrape_progress_section(driver, "Asset Allocation")
-        final_data["top_asset_type"] = scrape_progress_section(driver, "Top Asset Type")
-        final_data["credit_profile"] = scrape_progress_section(driver, "Credit Profile")
+# --- EXTRACTION PHASES (Selenium) ---
+# Each phase reads one part of the open fund page into final_data.
+
+def extract_basic_info(driver, final_data):
+    try:
+        final_data["basic_info"]["fund_name"] = driver.find_element(By.XPATH, "//h2[@class='pull-left']").text
+    except: 
+        pass
+    try:
+        final_data["basic_info"]["nav"] = driver.find_element(By.XPATH, "//div[@class='navbox']//strong[@class='text-black']").text
+    except: 
+        pass
+    try:
+        aum_element = driver.find_element(By.XPATH, "//div[contains(@class, 'aumamount')]/h2")
+        final_data["basic_info"]["aum"] = aum_element.text.split('\n')[0]
+    except: 
+        pass
 
-        # E. Performance Tables
-        final_data["performance_lumpsum"] = scrape_performance_table(driver, "Lumpsum Performance")
-        final_data["performance_sip"] = scrape_performance_table(driver, "SIP Performance")
 
-        # F. Documents
+def extract_scheme_details(driver, final_data):
+    try:
+        aum_key = driver.find_element(By.XPATH, "//div[contains(@class, 'aumamount')]//small").text.strip()
+        aum_val = final_data["basic_info"]["aum"]
+        final_data["scheme_details"][aum_key] = aum_val
+    except: 
+        pass
+    try:
+        plan_lists = driver.find_elements(By.CLASS_NAME, "planLists")
+        for list_ul in plan_lists:
+            items = list_ul.find_elements(By.TAG_NAME, "li")
+            for item in items:
+                try:
+                    label = item.find_element(By.TAG_NAME, "h5").text
+                    value = item.find_element(By.TAG_NAME, "p").text
+                    if label:
+                        final_data["scheme_details"][label.strip()] = value.strip()
+                except: 
+                    continue
+    except: 
+        pass
+
+
+def extract_fund_managers(driver, final_data):
+    try:
+        managers = driver.find_elements(By.XPATH, "//div[contains(@class, 'fundmanager')]//div[contains(@class, 'mt-3 p-2 ')]")
+        for mgr in managers:
+            name = mgr.find_element(By.TAG_NAME, "strong").text
+            details = mgr.text.replace(name, "").replace("View Details", "").strip().split('\n')
+            final_data["fund_managers"].append({
+                "name": name,
+                "tenure": details[0] if len(details) > 0 else "",
+                "managing": details[1] if len(details) > 1 else ""
+            })
+    except: 
+        pass
+
+
+def extract_progress_sections(driver, final_data):
+    for key, header_text in PROGRESS_SECTIONS.items():
+        final_data[key] = scrape_progress_section(driver, header_text)
+
+
+def extract_performance_tables(driver, final_data):
+    for key, header_text in PERFORMANCE_TABLES.items():
+        final_data[key] = scrape_performance_table(driver, header_text)
+
+
+def extract_documents(driver, final_data):
+    try:
+        docs = driver.find_elements(By.XPATH, "//div[contains(@class, 'ant-collapse-header') and contains(., 'Scheme Documents')]/following-sibling::div//button")
+        for doc in docs:
+            final_data["documents"].append(doc.text.strip())
+    except: 
+        pass
+
+
+def _click_category(driver, container, category):
+    """Select a portfolio category and wait for the table to switch to it. Returns False if there is no such tab."""
+    try:
+        category_button = container.find_element(By.XPATH, f".//label[.//span[text()='{category}']]")
+    except NoSuchElementException:
+        return False
+    before = table_signature(container)
+    driver.execute_script("arguments[0].click();", category_button)
+    try:
+        wait_for(driver, 3, lambda d: "checked" in (category_button.get_attribute("class") or "")
+                 and table_signature(container) != before)
+    except TimeoutException:
+        # Same content in both categories (e.g. both empty): nothing re-renders, carry on
+        pass
+    return True
+
+
+def _wait_for_page_change(driver, before, what):
+    """
+    Wait for the portfolio table to differ from signature `before`. The container is looked up again
+    on every poll since antd may re-render it; raises PaginationStalled if nothing changes in time.
+    """
+    try:
+        wait_for(driver, PAGE_LOAD_TIMEOUT, lambda d: table_signature(_portfolio_container(d)) != before)
+    except TimeoutException:
+        raise PaginationStalled(f"{what}: the next page did not load within {PAGE_LOAD_TIMEOUT} s") from None
+
+
+def _next_page(driver, container, table_wrapper, what):
+    """
+    Click 'next' and wait for the active page number / rows to change.
+    Raises TimeoutException on the last page and PaginationStalled if the click leads nowhere.
+    """
+    next_btn = wait_for(table_wrapper, 1, EC.element_to_be_clickable((By.XPATH, NEXT_PAGE_XPATH)))
+    before = table_signature(container)
+    driver.execute_script("arguments[0].click();", next_btn)
+    _wait_for_page_change(driver, before, what)
+
+
+def _container_soup(container):
+    return page_parser.make_soup(container.get_attribute("outerHTML"))
+
+
+def _portfolio_container(driver):
+    return driver.find_element(By.XPATH, PORTFOLIO_CONTAINER_XPATH)
+
+
+def _read_portfolio_page(container, use_soup):
+    """(headers, rows, is_empty) for the table page currently shown in the portfolio container."""
+    if use_soup:
+        # One outerHTML round trip per page instead of one per cell
+        return page_parser.parse_portfolio_page(_container_soup(container))
+    table_wrapper = container.find_element(By.XPATH, ".//div[@class='ant-table-wrapper']")
+    headers = [th.text.strip() for th in table_wrapper.find_elements(By.XPATH, ".//thead/tr/th")]
+    rows = table_wrapper.find_elements(By.XPATH, ".//tbody/tr")
+    if len(rows) == 1 and "no data" in rows[0].text.lower():
+        return headers, [], True
+    page_rows = []
+    for row in rows:
+        cols = row.find_elements(By.TAG_NAME, "td")
+        if len(cols) == len(headers):
+            page_rows.append({headers[i]: cols[i].text.strip() for i in range(len(headers))})
+    return headers, page_rows, False
+
+
+def _select_largest_page_size(driver, container):
+    """
+    Switch the portfolio table to its largest 'N / page' option, if it offers a size changer,
+    so there are fewer pages to click through. Returns the chosen page size or None.
+    """
+    try:
+        changer = container.find_element(By.XPATH, PAGE_SIZE_CHANGER_XPATH)
+    except NoSuchElementException:
+        return None
+    try:
+        driver.execute_script("arguments[0].click();", changer.find_element(By.CLASS_NAME, "ant-select-selector"))
+        # antd renders the options in a popup attached to <body>, not inside the table
+        options = wait_for(driver, 2, lambda d: [o for o in d.find_elements(By.CLASS_NAME, "ant-select-item-option")
+                                                 if "page" in (o.get_attribute("title") or o.text)])
+        sizes = {}
+        for option in options:
+            digits = "".join(ch for ch in (option.get_attribute("title") or option.text) if ch.isdigit())
+            if digits:
+                sizes[int(digits)] = option
+        if not sizes:
+            return None
+        largest = max(sizes)
+        if "ant-select-item-option-selected" in (sizes[largest].get_attribute("class") or ""):
+            return largest
+        before = table_signature(container)
+        driver.execute_script("arguments[0].click();", sizes[largest])
         try:
-            docs = driver.find_elements(By.XPATH, "//div[contains(@class, 'ant-collapse-header') and contains(., 'Scheme Documents')]/following-sibling::div//button")
-            for doc in docs:
-                final_data["documents"].append(doc.text.strip())
-        except: 
+            wait_for(driver, 5, lambda d: table_signature(container) != before)
+        except TimeoutException:
             pass
+        return largest
+    except Exception as e:
+        print(f"Could not change the portfolio page size: {e}")
+        return None
+
 
-        # G. FULL PORTFOLIO
-        print("\nScraping full portfolio section...")
+def _scrape_category(driver, category, use_soup):
+    """Walk every page of one category in the current tab; returns its rows (None if there is no such tab)."""
+    container = _portfolio_container(driver)
+    if not _click_category(driver, container, category):
+        return None
+    _select_largest_page_size(driver, container)
+
+    rows = []
+    page = 1
+    while True:
         try:
-            main_portfolio_container = driver.find_element(By.XPATH, "//div[contains(@class, 'ant-collapse-header') and contains(., 'Portfolio Details')]/following-sibling::div")
-            
-            # G1. Portfolio Summary
+            container = _portfolio_container(driver)
+            headers, page_rows, is_empty = _read_portfolio_page(container, use_soup)
+            if not headers:
+                break
+            print(f"Scraping page {page}...")
+            if is_empty:
+                print(f"No data found for '{category}'.")
+                break
+            rows.extend(page_rows)
+
+            table_wrapper = container.find_element(By.XPATH, ".//div[@class='ant-table-wrapper']")
+            _next_page(driver, container, table_wrapper, f"'{category}' after page {page}")
+            page += 1
+        except (TimeoutException, NoSuchElementException):
+            print(f"Finished '{category}'.")
+            break
+        except PaginationStalled:
+            raise
+        except Exception as e:
+            print(f"Pagination error: {e}")
+            break
+    return rows
+
+
+class _CategoryTab:
+    """Pagination state of one portfolio category being walked in its own browser tab."""
+
+    def __init__(self, category, handle):
+        self.category = category
+        self.handle = handle
+        self.rows = []
+        self.page = 0
+        self.before = None      # table signature before the last 'next' click; None = nothing pending
+        self.done = False
+
+
+def _open_category_tabs(driver, categories):
+    """Open the fund page once more per extra category; the tabs load in parallel. Returns [_CategoryTab]."""
+    main_handle = driver.current_window_handle
+    known = set(driver.window_handles)
+    for _ in categories[1:]:
+        # window.open returns immediately, unlike driver.get, so the pages load side by side
+        driver.execute_script("window.open(arguments[0], '_blank');", driver.current_url)
+    wait_for(driver, 10, lambda d: len(set(d.window_handles) - known) >= len(categories) - 1)
+    new_handles = [h for h in driver.window_handles if h not in known]
+    return [_CategoryTab(categories[0], main_handle)] + [
+        _CategoryTab(category, handle) for category, handle in zip(categories[1:], new_handles)]
+
+
+def _scrape_categories_in_tabs(driver, categories, use_soup):
+    """
+    Walk several categories at once, one tab each. WebDriver drives one tab at a time, so the tabs
+    are visited round-robin: read the current page, click 'next' without waiting, move on. By the
+    time a tab comes round again its next page has usually rendered, so the page loads overlap.
+    Returns {category: rows}.
+    """
+    tabs = _open_category_tabs(driver, categories)
+    main_handle = tabs[0].handle
+    try:
+        for tab in tabs:
+            driver.switch_to.window(tab.handle)
+            wait_for(driver, 10, EC.presence_of_element_located((By.XPATH, PORTFOLIO_CONTAINER_XPATH)))
+            container = _portfolio_container(driver)
+            if not _click_category(driver, container, tab.category):
+                print(f"Could not find/click button for '{tab.category}'.")
+                tab.done = True
+                continue
+            _select_largest_page_size(driver, container)
+
+        while not all(tab.done for tab in tabs):
+            for tab in tabs:
+                if tab.done:
+                    continue
+                driver.switch_to.window(tab.handle)
+                try:
+                    if tab.before is not None:
+                        _wait_for_page_change(driver, tab.before, f"'{tab.category}' after page {tab.page}")
+                    container = _portfolio_container(driver)
+                    headers, page_rows, is_empty = _read_portfolio_page(container, use_soup)
+                    tab.page += 1
+                    if not headers or is_empty:
+                        if is_empty:
+                            print(f"No data found for '{tab.category}'.")
+                        tab.done = True
+                        continue
+                    print(f"Scraping {tab.category} page {tab.page}...")
+                    tab.rows.extend(page_rows)
+
+                    next_buttons = container.find_elements(By.XPATH, NEXT_PAGE_XPATH)
+                    if not next_buttons:
+                        print(f"Finished '{tab.category}'.")
+                        tab.done = True
+                        continue
+                    tab.before = table_signature(container)
+                    driver.execute_script("arguments[0].click();", next_buttons[0])
+                except (TimeoutException, NoSuchElementException):
+                    print(f"Finished '{tab.category}'.")
+                    tab.done = True
+                except PaginationStalled:
+                    raise
+                except Exception as e:
+                    print(f"Pagination error in '{tab.category}': {e}")
+                    tab.done = True
+    finally:
+        for tab in tabs[1:]:
             try:
+                driver.switch_to.window(tab.handle)
+                driver.close()
+            except Exception:
+                pass
+        driver.switch_to.window(main_handle)
+    return {tab.category: tab.rows for tab in tabs}
+
+
+def extract_portfolio(driver, final_data, parse_mode="selenium"):
+    print("\nScraping full portfolio section...")
+    use_soup = parse_mode == "soup"
+    try:
+        main_portfolio_container = _portfolio_container(driver)
+        
+        # G1. Portfolio Summary
+        try:
+            if use_soup:
+                page_parser.parse_portfolio_summary(_container_soup(main_portfolio_container), final_data)
+                if not final_data["portfolio_summary"]:
+                    raise ValueError("empty summary")
+            else:
                 asset_list = main_portfolio_container.find_element(By.CLASS_NAME, "assetdetails")
                 items = asset_list.find_elements(By.TAG_NAME, "li")
                 for item in items:
@@ -303,113 +751,337 @@ def scrape_fund_data(search_term, save_to_file=True, headless=True, debug=False)
                     value = h4.text.strip()
                     key = item.text.replace(value, "").strip()
                     final_data["portfolio_summary"][key] = value
-                print("Successfully scraped 'Portfolio Summary'")
-            except:
-                print("Could not scrape 'Portfolio Summary'")
-                
-            # G2. Scrape Portfolio Tables (Equity, Debt, Others)
-            categories = ["Equity", "Debt", "Others"]
+            print("Successfully scraped 'Portfolio Summary'")
+        except:
+            print("Could not scrape 'Portfolio Summary'")
             
-            for category in categories:
-                print(f"\n--- Scraping category: {category} ---")
-                
-                try:
-                    category_button = main_portfolio_container.find_element(By.XPATH, f".//label[.//span[text()='{category}']]")
-                    driver.execute_script("arguments[0].click();", category_button)
-                    time.sleep(2)
-                except:
-                    print(f"Could not find/click button for '{category}'.")
-                    continue
+        # G2. Scrape Portfolio Tables (Equity, Debt, Others)
+        categories = [category for category in PORTFOLIO_CATEGORIES
+                      if main_portfolio_container.find_elements(By.XPATH, f".//label[.//span[text()='{category}']]")]
+        for category in PORTFOLIO_CATEGORIES:
+            if category not in categories:
+                print(f"Could not find/click button for '{category}'.")
+
+        if PORTFOLIO_TABS and len(categories) > 1:
+            print(f"\n--- Scraping categories in parallel tabs: {', '.join(categories)} ---")
+            try:
+                results = _scrape_categories_in_tabs(driver, categories, use_soup)
+            except Exception as e:
+                print(f"Tabbed portfolio scrape failed ({e}); scraping categories one by one.")
+                results = None
+            if results is not None:
+                # Merge in category order, whatever order the tabs finished in
+                for category in categories:
+                    final_data["portfolio_holdings"][category.lower()].extend(results[category])
+                return
+
+        for category in categories:
+            print(f"\n--- Scraping category: {category} ---")
+            rows = _scrape_category(driver, category, use_soup)
+            if rows is None:
+                print(f"Could not find/click button for '{category}'.")
+                continue
+            final_data["portfolio_holdings"][category.lower()].extend(rows)
+    except PaginationStalled as e:
+        # Truncated holdings are not saved as if complete: left empty, the section is not stamped and
+        # a later refresh (or the stored copy, see fund_sections.merge) takes its place
+        print(f"✗ Portfolio pagination stopped early ({e}); discarding the partial holdings")
+        for rows in final_data["portfolio_holdings"].values():
+            rows.clear()
+    except Exception as e:
+        print(f"Error in portfolio section: {e}")
+
+
+# Phase name -> extractor, in page order
+EXTRACTION_PHASES = [
+    ("basic info", extract_basic_info),
+    ("scheme details", extract_scheme_details),
+    ("fund managers", extract_fund_managers),
+    ("progress sections", extract_progress_sections),
+    ("performance tables", extract_performance_tables),
+    ("documents", extract_documents),
+    ("portfolio", extract_portfolio),
+]
 
-                page = 1
-                while True:
-                    try:
-                        table_wrapper = main_portfolio_container.find_element(By.XPATH, ".//div[@class='ant-table-wrapper']")
-                        headers = [th.text.strip() for th in table_wrapper.find_elements(By.XPATH, ".//thead/tr/th")]
-                        if not headers: 
-                            break
-
-                        print(f"Scraping page {page}...")
-                        rows = table_wrapper.find_elements(By.XPATH, ".//tbody/tr")
-                        
-                        if len(rows) == 1 and "no data" in rows[0].text.lower():
-                            print(f"No data found for '{category}'.")
-                            break
-
-                        for row in rows:
-                            cols = row.find_elements(By.TAG_NAME, "td")
-                            if len(cols) == len(headers):
-                                row_data = {headers[i]: cols[i].text.strip() for i in range(len(headers))}
-                                final_data["portfolio_holdings"][category.lower()].append(row_data)
-                        
-                        next_btn = WebDriverWait(table_wrapper, 1).until(
-                            EC.element_to_be_clickable((By.XPATH, ".//li[contains(@class, 'ant-pagination-next') and not(contains(@class, 'ant-pagination-disabled'))]/a"))
-                        )
-                        driver.execute_script("arguments[0].click();", next_btn)
-                        time.sleep(1.5)
-                        page += 1
-                        main_portfolio_container = driver.find_element(By.XPATH, "//div[contains(@class, 'ant-collapse-header') and contains(., 'Portfolio Details')]/following-sibling::div")
-                    
-                    except (TimeoutException, NoSuchElementException):
-                        print(f"Finished '{category}'.")
-                        break
-                    except Exception as e:
-                        print(f"Pagination error: {e}")
-                        break
+
+def _fill_from_xhr(driver, final_data, timer):
+    """
+    Map the fund page's captured JSON responses into final_data.
+    Returns the sections still empty afterwards (all of them if nothing could be captured).
+    """
+    try:
+        with timer.phase('xhr capture'):
+            responses = xhr_capture.capture_json_responses(driver)
+        with timer.phase('xhr mapping'):
+            mapped = xhr_capture.build_final_data(responses, final_data)
+        print(f"Mapped XHR payloads with: {', '.join(sorted(mapped)) or 'nothing'}")
+    except Exception as e:
+        print(f"XHR capture failed ({e}); scraping the DOM instead.")
+    return xhr_capture.missing_sections(final_data)
+
+
+def extract_fund_page(driver, selected_fund, timer, parse_mode=PARSE_MODE, phases=None):
+    """
+    Read the fund page open in the current tab into a new final_data dict.
+    `phases` restricts extraction to those EXTRACTION_PHASES names (None = all).
+    For parse_mode 'xhr' the performance log must have been drained before the page was opened.
+    """
+    print("Scraping data...")
+    phases = [name for name, _ in EXTRACTION_PHASES] if phases is None else phases
+    wanted = {section for phase in phases for section in fund_sections.PHASE_SECTIONS[phase]}
+    final_data = None
+    if parse_mode == "xhr":
+        final_data = new_fund_data(selected_fund)
+        missing = [key for key in _fill_from_xhr(driver, final_data, timer) if key in wanted]
+        if missing:
+            # Whatever the payloads did not cover comes from one page snapshot
+            print(f"Not in XHR payloads: {', '.join(missing)}")
+            dom_data = new_fund_data(selected_fund)
+            with timer.phase('page snapshot'):
+                html = driver.page_source
+            soup = page_parser.parse_static_sections(html, dom_data, timer, phases)
+            for key in missing:
+                if key not in ("portfolio_holdings", "portfolio_summary"):
+                    final_data[key] = dom_data[key]
+            if "portfolio_holdings" in missing:
+                # No holdings payload: fall back to clicking through the portfolio table
+                with timer.phase('portfolio'):
+                    extract_portfolio(driver, final_data, "soup")
+            elif "portfolio_summary" in missing:
+                page_parser.parse_portfolio_summary(soup, final_data)
+        return final_data
+
+    if parse_mode == "soup":
+        # One page_source round trip, everything else parsed locally
+        try:
+            with timer.phase('page snapshot'):
+                html = driver.page_source
+            final_data = new_fund_data(selected_fund)
+            page_parser.parse_static_sections(html, final_data, timer, phases)
+            if "basic info" in phases and not final_data["basic_info"]:
+                raise ValueError("basic info not found in page snapshot")
         except Exception as e:
-            print(f"Error in portfolio section: {e}")
-            
-        # 3. SAVE TO FILE (if requested)
+            print(f"Snapshot parse failed ({e}); falling back to Selenium parsing.")
+            final_data = None
+            parse_mode = "selenium"
 
-        if save_to_file:
-            print("\n" + "="*30)
-            output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Database')
-            os.makedirs(output_dir, exist_ok=True)
-            output_filename = os.path.join(output_dir, f"{search_term.lower().replace(' ', '_')}.json")
-            print(f"SAVING DATA TO {output_filename}")
-            print("="*30)
+    if final_data is None:
+        final_data = new_fund_data(selected_fund)
+        for phase_name, extract in EXTRACTION_PHASES:
+            if phase_name != "portfolio" and phase_name in phases:
+                with timer.phase(phase_name):
+                    extract(driver, final_data)
 
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                json.dump(final_data, f, indent=2, ensure_ascii=False)
+    if "portfolio" in phases:
+        with timer.phase('portfolio'):
+            extract_portfolio(driver, final_data, parse_mode)
+    return final_data
 
-            print(f"Data successfully saved to '{output_filename}'")
 
-        # Cleanup
-        driver.close()
-        driver.switch_to.window(original_window)
-        time.sleep(1)
+def _scrape_with_driver(driver, search_term, save_to_file, debug, timer, parse_mode=PARSE_MODE, phases=None):
+    """Search for the fund from the home page, scrape its page (all or only `phases`) and optionally save the JSON."""
+    if parse_mode == "xhr" and not xhr_capture.drain(driver):
+        print("Driver has no performance log; using the soup parser.")
+        parse_mode = "soup"
+
+    # 1. Navigate and Search
+    with timer.phase('search + open page'):
+        first_item_text, original_window = open_fund_page(driver, search_term, debug)
+
+    # 2. START SCRAPING
+    final_data = extract_fund_page(driver, first_item_text, timer, parse_mode, phases)
+    fund_sections.stamp(final_data, phases)
         
-        return final_data
+    # 3. SAVE TO FILE (if requested)
 
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
-    finally:
+    if save_to_file:
+        print("\n" + "="*30)
+        output_filename = fund_index.index.path_for(search_term)
+        print(f"SAVING DATA TO {output_filename}")
+        print("="*30)
+
+        atomic_write_json(output_filename, final_data)
+        # Keep the app's in-memory index current so the next lookup finds this file
+        fund_index.index.add(output_filename)
+
+        print(f"Data successfully saved to '{output_filename}'")
+
+    # Cleanup: close the fund tab and go back to the search tab
+    driver.close()
+    driver.switch_to.window(original_window)
+    timer.report()
+    
+    return final_data
+
+
+# --- BATCH MODE ---
+# Pre-scrapes Funds.txt across worker processes, one browser per process.
+
+BATCH_DIR = os.path.join(fund_index.DB_DIR, 'Scrape_Batch')  # kept out of Database/*.json (the fund index)
+BATCH_CHECKPOINT_PATH = os.path.join(BATCH_DIR, 'checkpoint.json')
+BATCH_WORKERS = 4
+
+_batch_driver = None
+_batch_driver_uses = 0
+
+
+def _quit_batch_driver():
+    global _batch_driver
+    if _batch_driver is not None:
         try:
-            driver.quit()
-            print("Driver closed.")
-        except:
+            _batch_driver.quit()
+        except Exception:
             pass
+        _batch_driver = None
+
+
+def _batch_worker_init():
+    # atexit handlers do not run in pool worker processes; multiprocessing finalizers do
+    multiprocessing.util.Finalize(None, _quit_batch_driver, exitpriority=10)
+
+
+def _batch_scrape(fund_name, parse_mode):
+    """Runs in a worker process: scrape one fund with the process's own browser. Returns seconds taken."""
+    global _batch_driver, _batch_driver_uses
+    start = time.perf_counter()
+    if _batch_driver is None or _batch_driver_uses >= DRIVER_MAX_USES:
+        _quit_batch_driver()
+        _batch_driver = create_driver(headless=True, capture_network=CAPTURE_NETWORK or parse_mode == 'xhr')
+        _batch_driver_uses = 0
+        open_home(_batch_driver)
+    else:
+        reset_driver(_batch_driver)
+    _batch_driver_uses += 1
+    try:
+        _scrape_with_driver(_batch_driver, fund_name, True, False, PhaseTimer(), parse_mode)
+    except Exception:
+        # The browser may be left mid-page or dead; start the next fund on a fresh one
+        _quit_batch_driver()
+        raise
+    return time.perf_counter() - start
+
+
+def load_batch_checkpoint():
+    try:
+        with open(BATCH_CHECKPOINT_PATH, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        checkpoint = {}
+    checkpoint.setdefault('done', {})
+    checkpoint.setdefault('failed', {})
+    return checkpoint
+
+
+def run_batch(fund_names, workers=BATCH_WORKERS, fresh=False, retry_failed=False, skip_existing=False,
+              parse_mode=PARSE_MODE):
+    """
+    Scrape `fund_names` with `workers` processes (one headless browser each).
+    Progress is checkpointed after every fund; returns the checkpoint dict.
+    """
+    checkpoint = {'done': {}, 'failed': {}} if fresh else load_batch_checkpoint()
+    if retry_failed:
+        pending = [f for f in fund_names if f in checkpoint['failed']]
+    else:
+        pending = [f for f in fund_names if f not in checkpoint['done']]
+    if skip_existing:
+        pending = [f for f in pending if not os.path.exists(fund_index.index.path_for(f))]
+
+    skipped = len(fund_names) - len(pending)
+    print(f"Scraping {len(pending)} funds with {workers} browsers ({skipped} skipped)")
+
+    ok = failed = 0
+    scrape_seconds = 0.0
+    errors = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_batch_worker_init) as pool:
+        futures = {pool.submit(_batch_scrape, name, parse_mode): name for name in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            try:
+                seconds = future.result()
+                checkpoint['done'][name] = {'seconds': round(seconds, 1), 'at': time.time()}
+                checkpoint['failed'].pop(name, None)
+                scrape_seconds += seconds
+                ok += 1
+                print(f"[{i}/{len(pending)}] ✓ {name} ({seconds:.1f} s)")
+            except Exception as e:
+                checkpoint['failed'][name] = str(e)
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                failed += 1
+                print(f"[{i}/{len(pending)}] ✗ {name}: {e}")
+            # Persist after every fund so a crash loses at most the in-flight ones
+            atomic_write_json(BATCH_CHECKPOINT_PATH, checkpoint)
+
+    elapsed = time.perf_counter() - start
+    print("\n" + "=" * 50)
+    print("BATCH SCRAPE SUMMARY")
+    print("=" * 50)
+    print(f"Funds processed : {len(pending)} ({ok} ok, {failed} failed, {skipped} skipped)")
+    print(f"Elapsed         : {elapsed:.1f} s")
+    if elapsed > 0:
+        print(f"Throughput      : {len(pending) / elapsed * 60:.1f} funds/min")
+    if ok:
+        print(f"Avg per fund    : {scrape_seconds / ok:.1f} s (per browser)")
+    for error_type, count in sorted(errors.items()):
+        print(f"Errors          : {count} x {error_type}")
+    if checkpoint['failed']:
+        print("Failed funds (re-run with --retry-failed):")
+        for name, error in sorted(checkpoint['failed'].items()):
+            print(f"  - {name}: {error}")
+    elif os.path.exists(BATCH_CHECKPOINT_PATH):
+        # A clean run leaves no checkpoint, so the next run re-scrapes everything
+        os.remove(BATCH_CHECKPOINT_PATH)
+    return checkpoint
+
+
+def batch_main(argv):
+    from navhistory import load_fund_names
+
+    parser = argparse.ArgumentParser(prog="scraper.py batch", description="Scrape every fund in Funds.txt")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help="browser processes")
+    parser.add_argument('--fresh', action='store_true', help="ignore the checkpoint and start over")
+    parser.add_argument('--retry-failed', action='store_true', help="only re-run funds that failed")
+    parser.add_argument('--skip-existing', action='store_true', help="skip funds that already have a JSON file")
+    parser.add_argument('--match', help="only funds whose name contains this text (case-insensitive)")
+    parser.add_argument('--limit', type=int, help="only the first N funds")
+    parser.add_argument('--parse-mode', default=PARSE_MODE, choices=['soup', 'selenium', 'xhr'])
+    args = parser.parse_args(argv)
+
+    fund_names = load_fund_names()
+    if args.match:
+        fund_names = [f for f in fund_names if args.match.lower() in f.lower()]
+    if args.limit:
+        fund_names = fund_names[:args.limit]
+
+    run_batch(fund_names, workers=args.workers, fresh=args.fresh, retry_failed=args.retry_failed,
+              skip_existing=args.skip_existing, parse_mode=args.parse_mode)
 
 
 # Example usage and testing
 if __name__ == "__main__":
     import sys
     
+    # Batch Mode: scrape all of Funds.txt
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+
+    # Refresh Mode: re-scrape the expired sections of one fund (or the phases named after it)
+    elif len(sys.argv) > 2 and sys.argv[1] == 'refresh':
+        refresh_fund_data(sys.argv[2], phases=sys.argv[3:] or None)
+
     # Test Mode: Run scraper directly
-    if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    elif len(sys.argv) > 1 and sys.argv[1] == 'test':
         print("="*50)
         print("RUNNING SCRAPER IN TEST MODE")
         print("="*50)
         
         # Test with different funds
         test_cases = [
-            {"search_term": "Axis Aggressive Hybrid Fund - Gr", "output_file": "axis_aggressive_hybrid_fund_gr.json"},
-            {"search_term": "Axis Arbitrage Fund - Regular Gr", "output_file": "axis_arbitrage_fund_regular_gr.json"},
-            {"search_term": "Axis Balanced Advantage Fund - Gr", "output_file": "axis_balanced_advantage_fund_gr.json"},
-            {"search_term": "Axis Banking & PSU Debt Fund - Gr", "output_file": "axis_banking_psu_debt_fund_gr.json"},
+            {"search_term": "Axis Aggressive Hybrid Fund - Gr"},
+            {"search_term": "Axis Arbitrage Fund - Regular Gr"},
+            {"search_term": "Axis Balanced Advantage Fund - Gr"},
+            {"search_term": "Axis Banking & PSU Debt Fund - Gr"},
         ]
         
         for i, test in enumerate(test_cases, 1):
@@ -421,7 +1093,6 @@ if __name__ == "__main__":
                 result = scrape_fund_data(
                     search_term=test['search_term'],
                     save_to_file=True,
-                    output_filename=test['output_file'],
                     headless=False,  # Set to True to run without browser window
                     debug=True  # Enable debug mode
                 )
@@ -430,7 +1101,7 @@ if __name__ == "__main__":
                 print(f"✓ Fund Name: {result['basic_info'].get('fund_name', 'N/A')}")
                 print(f"✓ NAV: {result['basic_info'].get('nav', 'N/A')}")
                 print(f"✓ AUM: {result['basic_info'].get('aum', 'N/A')}")
-                print(f"✓ Data saved to: {test['output_file']}")
+                print(f"✓ Data saved to: {fund_index.index.path_for(test['search_term'])}")
                 
             except Exception as e:
                 print(f"\n✗ Test failed: {str(e)}")
@@ -467,16 +1138,15 @@ if __name__ == "__main__":
             Expected JSON payload:
             {
                 "search_term": "Axis Aggressive Hybrid",
-                "save_to_file": true,
-                "output_filename": "fund_data.json"
+                "save_to_file": true
             }
+            The file is saved as Database/<search_term, lowercased with underscores>.json
             """
             try:
                 data = request.get_json()
                 
                 search_term = data.get('search_term')
                 save_to_file = data.get('save_to_file', True)
-                output_filename = data.get('output_filename', 'fund_data.json')
                 
                 if not search_term:
                     return jsonify({
@@ -487,7 +1157,6 @@ if __name__ == "__main__":
                 result = scrape_fund_data(
                     search_term=search_term,
                     save_to_file=save_to_file,
-                    output_filename=output_filename,
                     headless=True  # Use headless mode in production
                 )
                 
@@ -515,7 +1184,9 @@ if __name__ == "__main__":
         print('    -H "Content-Type: application/json" \\')
         print('    -d \'{"search_term": "Axis Aggressive Hybrid"}\'')
         print("\nOr run in test mode:")
-        print("  python script.py test")
+        print("  python scraper.py test")
+        print("Or pre-scrape all of Funds.txt:")
+        print("  python scraper.py batch --workers 4")
         print("="*50 + "\n")
         
         app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,488 @@
+"""
+Build fund data from the fund page's own JSON (XHR/fetch) responses instead of the rendered DOM.
+
+The njwealth fund page is a React/antd app that loads its scheme details, holdings, performance
+and full portfolio from JSON endpoints. With Chrome's performance log enabled, the scraper reads
+those responses back through the DevTools protocol (Network.getResponseBody) and maps them into
+the usual `final_data` schema, so no category tabs or pagination links need to be clicked.
+
+The endpoints are undocumented: payloads are routed by endpoint name (the last URL path segment)
+and their records matched by field-name aliases. Sections nothing maps to are left empty for the
+DOM path to fill in. fixtures/xhr/sample_fund.json shows the payload shapes the mappers accept.
+
+Usage:
+    python xhr_capture.py record "<fund name>" <fixture.json>   # capture a live page's payloads
+    python xhr_capture.py replay <fixture.json> [...]           # build final_data offline from fixtures
+"""
+
+import base64
+import json
+import re
+import sys
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+from fileio import atomic_write_json
+
+PERFORMANCE_LOG = "performance"
+CAPTURE_QUIET = 0.5     # seconds without a new JSON response before capture stops
+CAPTURE_TIMEOUT = 5.0   # upper bound on waiting for in-flight responses
+
+PORTFOLIO_CATEGORIES = ("equity", "debt", "others")
+# Column names the DOM portfolio table uses (and templates/fund_details.html reads)
+PORTFOLIO_COLUMNS = {
+    "equity": ("Scheme Name", "Sector"),
+    "debt": ("Security Name", "Asset Type"),
+    "others": ("Security Name", "Asset Type"),
+}
+
+# Field aliases, compared after lowercasing and dropping non-alphanumerics
+NAME_FIELDS = ("schemename", "securityname", "companyname", "instrumentname", "holdingname", "stockname", "name")
+SECTOR_FIELDS = ("sector", "sectorname", "industry", "industryname")
+ASSET_TYPE_FIELDS = ("assettype", "instrumenttype", "securitytype", "instrument")
+WEIGHT_FIELDS = ("percentoftotalassets", "holdingpercentage", "percentage", "holdingper", "weightage", "weight",
+                 "perc", "pct")
+CUMULATIVE_FIELDS = ("cumulative", "cumulativepercentage", "cumulativeper")
+CATEGORY_FIELDS = ("category", "assetclass", "holdingtype", "portfoliotype", "assetcategory")
+PERIOD_FIELDS = ("period", "duration", "tenure", "timeperiod")
+SCHEME_RETURN_FIELDS = ("scheme", "schemereturn", "fundreturn", "returns", "return")
+BENCHMARK_RETURN_FIELDS = ("benchmark", "benchmarkreturn", "indexreturn")
+CATEGORY_RETURN_FIELDS = ("categoryavg", "categoryaverage", "categoryreturn")
+MANAGER_NAME_FIELDS = ("fundmanager", "managername", "fundmanagername", "name")
+MANAGER_TENURE_FIELDS = ("tenure", "since", "managingsince", "experience")
+MANAGER_FUNDS_FIELDS = ("managing", "fundsmanaged", "schemesmanaged", "noofschemes")
+DOCUMENT_FIELDS = ("documentname", "doctype", "title", "name")
+
+# DOM label -> payload field aliases for the scheme-details panel
+SCHEME_DETAIL_FIELDS = {
+    "Category": ("category", "schemecategory", "subcategory"),
+    "Nature": ("nature", "schemenature", "schemetype"),
+    "Benchmark": ("benchmark", "benchmarkname", "indexname"),
+    "Date of Inception": ("dateofinception", "inceptiondate", "launchdate"),
+    "Age": ("age", "fundage"),
+    "Expense Ratio": ("expenseratio", "ter", "totalexpenseratio"),
+    "Options Available": ("optionsavailable", "options", "plans"),
+    "Minimum – Lump sum": ("minimumlumpsum", "minlumpsum", "mininvestment", "minimuminvestment"),
+    "Minimum – SIP": ("minimumsip", "minsip", "minsipamount"),
+    "Exit Load": ("exitload",),
+    "Entry Load": ("entryload",),
+}
+FUND_NAME_FIELDS = ("schemename", "fundname", "name")
+NAV_FIELDS = ("nav", "latestnav", "currentnav")
+AUM_FIELDS = ("aum", "aumcr", "fundsize", "netassets")
+
+
+# --- CAPTURE (live browser) ---
+
+def enable_capture(chrome_options):
+    """Turn on Chrome's performance log so network events can be read back after page load."""
+    chrome_options.set_capability("goog:loggingPrefs", {PERFORMANCE_LOG: "ALL"})
+    return chrome_options
+
+
+def drain(driver):
+    """Discard buffered network events (e.g. the home page's) so the next capture sees only the fund page."""
+    try:
+        driver.get_log(PERFORMANCE_LOG)
+        return True
+    except Exception:
+        return False
+
+
+def _json_events(entries, responses, finished):
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.responseReceived":
+            response = params.get("response", {})
+            if "json" in (response.get("mimeType") or "").lower():
+                responses[params["requestId"]] = {
+                    "url": response.get("url", ""),
+                    "status": response.get("status"),
+                }
+        elif method == "Network.loadingFinished":
+            finished.add(params.get("requestId"))
+
+
+def _response_body(driver, request_id):
+    result = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+    body = result.get("body", "")
+    if result.get("base64Encoded"):
+        body = base64.b64decode(body).decode("utf-8", errors="replace")
+    return json.loads(body)
+
+
+def capture_json_responses(driver, quiet=CAPTURE_QUIET, timeout=CAPTURE_TIMEOUT):
+    """
+    Read JSON responses the current tab has received since the last drain().
+    Polls the performance log until no new JSON response arrives for `quiet` seconds.
+    Returns [{'url', 'status', 'body'}] in arrival order; bodies that cannot be read are skipped.
+    """
+    responses, finished = {}, set()
+    deadline = time.monotonic() + timeout
+    last_change = time.monotonic()
+    while True:
+        seen = len(responses), len(finished)
+        _json_events(driver.get_log(PERFORMANCE_LOG), responses, finished)
+        now = time.monotonic()
+        if (len(responses), len(finished)) != seen:
+            last_change = now
+        pending = [rid for rid in responses if rid not in finished]
+        if now >= deadline or (not pending and now - last_change >= quiet):
+            break
+        time.sleep(0.1)
+
+    captured = []
+    for request_id, meta in responses.items():
+        if request_id not in finished:
+            continue
+        try:
+            captured.append({**meta, "body": _response_body(driver, request_id)})
+        except Exception as e:
+            print(f"Could not read response body for {meta['url']}: {e}")
+    print(f"Captured {len(captured)} JSON responses")
+    return captured
+
+
+# --- FIELD HELPERS ---
+
+def _key(name):
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def _pick(record, aliases):
+    """Value of the first alias present in `record` (keys compared loosely), else None."""
+    keyed = {_key(k): v for k, v in record.items()}
+    for alias in aliases:
+        value = keyed.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _number(value):
+    try:
+        return float(str(value).replace("%", "").replace(",", "").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _percent_text(value):
+    """Percentages as the DOM shows them in tables: '8.52' (no sign, 2 decimals)."""
+    if value is None:
+        return ""
+    number = _number(value)
+    return f"{number:.2f}" if number is not None else str(value)
+
+
+def _text(value):
+    return " ".join(str(value).split()) if value is not None else ""
+
+
+def find_records(payload):
+    """Every non-empty list of dicts inside a payload, largest first."""
+    found = []
+
+    def walk(node):
+        if isinstance(node, list):
+            if node and all(isinstance(item, dict) for item in node):
+                found.append(node)
+            for item in node:
+                walk(item)
+        elif isinstance(node, dict):
+            for value in node.values():
+                walk(value)
+
+    walk(payload)
+    return sorted(found, key=len, reverse=True)
+
+
+def _find_dict(payload, aliases):
+    """First dict inside a payload that carries any of the alias fields."""
+    if isinstance(payload, dict):
+        if _pick(payload, aliases) is not None:
+            return payload
+        children = payload.values()
+    elif isinstance(payload, list):
+        children = payload
+    else:
+        return None
+    for child in children:
+        found = _find_dict(child, aliases)
+        if found is not None:
+            return found
+    return None
+
+
+def _category(text):
+    text = str(text or "").lower()
+    if "equity" in text or "stock" in text or "share" in text:
+        return "equity"
+    if "debt" in text or "bond" in text or "money market" in text or "g-sec" in text:
+        return "debt"
+    return "others" if text else None
+
+
+def _url_category(url):
+    """Portfolio category from the request's query string (e.g. ?type=Debt), if any."""
+    for values in parse_qs(urlparse(url).query).values():
+        for value in values:
+            category = _category(value)
+            if category in ("equity", "debt"):
+                return category
+    return None
+
+
+# --- PAYLOAD MAPPERS ---
+# Each mapper fills final_data from one response and returns True if it mapped anything.
+
+def _holding_key(row, category):
+    return _key(row.get(PORTFOLIO_COLUMNS[category][0], "")), _number(row.get("% of Total Assets"))
+
+
+def map_portfolio(url, payload, final_data):
+    """
+    Holdings rows from a portfolio payload. Several endpoints can list the same holding (a
+    top-holdings call and the full portfolio, or overlapping pages), so a row that an earlier
+    response already mapped (same category, name compared loosely, and weight) is skipped rather
+    than appended twice. Rows within one payload are all kept: debt portfolios list one issuer
+    several times (different maturities, CPs and CDs).
+    """
+    default_category = _url_category(url)
+    holdings = final_data["portfolio_holdings"]
+    # Multiset, so a payload repeating a row that an earlier one listed once still keeps the repeat
+    earlier = {category: Counter(_holding_key(row, category) for row in holdings[category])
+               for category in PORTFOLIO_CATEGORIES}
+    mapped = False
+    for records in find_records(payload):
+        if _pick(records[0], WEIGHT_FIELDS) is None or _pick(records[0], NAME_FIELDS) is None:
+            continue
+        for record in records:
+            category = _category(_pick(record, CATEGORY_FIELDS)) or default_category or "equity"
+            name_col, type_col = PORTFOLIO_COLUMNS[category]
+            name = _text(_pick(record, NAME_FIELDS))
+            kind = _pick(record, SECTOR_FIELDS) if category == "equity" else _pick(record, ASSET_TYPE_FIELDS)
+            row = {
+                name_col: name,
+                type_col: _text(kind),
+                "% of Total Assets": _percent_text(_pick(record, WEIGHT_FIELDS)),
+            }
+            key = _holding_key(row, category)
+            if earlier[category][key]:
+                earlier[category][key] -= 1
+                continue
+            cumulative = _pick(record, CUMULATIVE_FIELDS)
+            if cumulative is not None:
+                row["Cumulative%"] = _percent_text(cumulative)
+            holdings[category].append(row)
+        mapped = True
+        break
+    return mapped
+
+
+def _endpoint_name(url):
+    """
+    The request's endpoint name as lowercase words: the last path segment split on -, _ and
+    camelCase, e.g. '/api/v2/getSchemeNav.json' -> 'get scheme nav'. Routing matches whole words of
+    this name only, so hosts, parent paths and query strings cannot send a response to a mapper.
+    """
+    segment = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+    segment = re.sub(r"\.\w+$", "", segment)
+    segment = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", segment)
+    return " ".join(re.split(r"[\W_]+", segment.lower())).strip()
+
+
+def _is_sip(url):
+    """SIP returns: 'sip' as a word of the endpoint name, or a query parameter whose value is exactly SIP."""
+    if re.search(r"\bsip\b", _endpoint_name(url)):
+        return True
+    return any(value.strip().lower() == "sip"
+               for values in parse_qs(urlparse(url).query).values() for value in values)
+
+
+def map_performance(url, payload, final_data):
+    key = "performance_sip" if _is_sip(url) else "performance_lumpsum"
+    for records in find_records(payload):
+        if _pick(records[0], PERIOD_FIELDS) is None or _pick(records[0], SCHEME_RETURN_FIELDS) is None:
+            continue
+        rows = []
+        for record in records:
+            row = {"Period": _text(_pick(record, PERIOD_FIELDS)),
+                   "Scheme": _percent_text(_pick(record, SCHEME_RETURN_FIELDS)) + "%"}
+            benchmark = _pick(record, BENCHMARK_RETURN_FIELDS)
+            if benchmark is not None:
+                row["Benchmark"] = _percent_text(benchmark) + "%"
+            category_avg = _pick(record, CATEGORY_RETURN_FIELDS)
+            if category_avg is not None:
+                row["Category Avg"] = _percent_text(category_avg) + "%"
+            rows.append(row)
+        final_data[key] = rows
+        return True
+    return False
+
+
+def map_fund_managers(url, payload, final_data):
+    for records in find_records(payload):
+        if _pick(records[0], MANAGER_NAME_FIELDS) is None:
+            continue
+        final_data["fund_managers"] = [{
+            "name": _text(_pick(record, MANAGER_NAME_FIELDS)),
+            "tenure": _text(_pick(record, MANAGER_TENURE_FIELDS) or ""),
+            "managing": _text(_pick(record, MANAGER_FUNDS_FIELDS) or ""),
+        } for record in records]
+        return True
+    return False
+
+
+def map_scheme_details(url, payload, final_data):
+    mapped = False
+    details = _find_dict(payload, tuple(a for aliases in SCHEME_DETAIL_FIELDS.values() for a in aliases))
+    if details is not None:
+        for label, aliases in SCHEME_DETAIL_FIELDS.items():
+            value = _pick(details, aliases)
+            if value is not None and not isinstance(value, (dict, list)):
+                final_data["scheme_details"][label] = _text(value)
+                mapped = True
+
+    info = _find_dict(payload, NAV_FIELDS + AUM_FIELDS) or details or {}
+    for field, aliases in (("fund_name", FUND_NAME_FIELDS), ("nav", NAV_FIELDS), ("aum", AUM_FIELDS)):
+        value = _pick(info, aliases)
+        if value is not None and not isinstance(value, (dict, list)):
+            final_data["basic_info"][field] = _text(value)
+            mapped = True
+    if "aum" in final_data["basic_info"]:
+        final_data["scheme_details"].setdefault("AUM (CR.)", final_data["basic_info"]["aum"])
+
+    # A scheme payload often embeds the manager list too
+    if not final_data["fund_managers"] and isinstance(details, dict):
+        for key, value in details.items():
+            if "manager" in key.lower() and isinstance(value, list):
+                mapped = map_fund_managers(url, value, final_data) or mapped
+    return mapped
+
+
+def map_documents(url, payload, final_data):
+    for records in find_records(payload):
+        names = [_text(_pick(record, DOCUMENT_FIELDS)) for record in records]
+        names = [name for name in names if name]
+        if names:
+            final_data["documents"] = names
+            return True
+    return False
+
+
+# Pattern over the endpoint name (see _endpoint_name: whole lowercase words) -> mapper; first match wins
+ENDPOINT_MAPPERS = [
+    (re.compile(r"\b(portfolio|holdings?)\b"), map_portfolio),
+    (re.compile(r"\b(performance|returns?|sip)\b"), map_performance),
+    (re.compile(r"\b(fund )?managers?\b"), map_fund_managers),
+    (re.compile(r"\b(documents?|factsheets?)\b"), map_documents),
+    (re.compile(r"\b(scheme|fund) (details?|info|overview)\b|\b(overview|nav)\b"), map_scheme_details),
+]
+
+
+# --- DERIVED COLUMNS ---
+
+def fill_cumulative(final_data):
+    """
+    Add the running Cumulative% column the DOM table shows to holdings whose payload lacked it.
+    The progress-bar sections (top holdings, sectors, asset allocation) are deliberately not
+    derived from holdings: they stay empty, and so missing, until a payload or the DOM supplies them.
+    """
+    for category in PORTFOLIO_CATEGORIES:
+        running = 0.0
+        for row in final_data["portfolio_holdings"][category]:
+            running += _number(row.get("% of Total Assets")) or 0.0
+            row.setdefault("Cumulative%", f"{running:.2f}")
+
+
+# --- BUILD ---
+
+def build_final_data(responses, final_data):
+    """
+    Map captured responses ([{'url', 'status', 'body'}]) into final_data (a scraper.new_fund_data skeleton).
+    Returns the set of mapper names that matched something.
+    """
+    mapped = set()
+    for response in responses:
+        if response.get("status") not in (None, 200):
+            continue
+        endpoint = _endpoint_name(response["url"])
+        for pattern, mapper in ENDPOINT_MAPPERS:
+            if pattern.search(endpoint):
+                try:
+                    if mapper(response["url"], response["body"], final_data):
+                        mapped.add(mapper.__name__)
+                except Exception as e:
+                    print(f"Could not map {response['url']}: {e}")
+                break
+    fill_cumulative(final_data)
+    return mapped
+
+
+def missing_sections(final_data):
+    """Top-level final_data sections still empty after mapping (the DOM path fills these)."""
+    missing = [key for key, value in final_data.items() if key not in ("selected_fund", "_fetched_at") and not value]
+    if not any(final_data["portfolio_holdings"].values()):
+        missing.append("portfolio_holdings")
+    return missing
+
+
+# --- FIXTURES ---
+
+def save_fixture(path, selected_fund, responses):
+    atomic_write_json(path, {"selected_fund": selected_fund, "responses": responses})
+    print(f"Saved {len(responses)} responses to {path}")
+
+
+def load_fixture(path):
+    with open(path, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+    return fixture["selected_fund"], fixture["responses"]
+
+
+def record(search_term, path):
+    """Open a fund page in a fresh browser with capture on and save its JSON responses as a fixture."""
+    import scraper
+
+    driver = scraper.create_driver(headless=True, capture_network=True)
+    try:
+        scraper.open_home(driver)
+        drain(driver)
+        selected_fund, _ = scraper.open_fund_page(driver, search_term)
+        save_fixture(path, selected_fund, capture_json_responses(driver))
+    finally:
+        driver.quit()
+
+
+def replay(path):
+    """Build final_data from a recorded fixture, offline, and print what was mapped."""
+    from scraper import new_fund_data
+
+    selected_fund, responses = load_fixture(path)
+    final_data = new_fund_data(selected_fund)
+    mapped = build_final_data(responses, final_data)
+    holdings = final_data["portfolio_holdings"]
+    print(f"\n{path}: {selected_fund}")
+    print(f"  responses : {len(responses)}")
+    print(f"  mapped by : {', '.join(sorted(mapped)) or 'nothing'}")
+    print(f"  holdings  : {len(holdings['equity'])} equity, {len(holdings['debt'])} debt, "
+          f"{len(holdings['others'])} others")
+    print(f"  missing   : {', '.join(missing_sections(final_data)) or 'none'}")
+    return final_data
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "record":
+        record(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 2 and sys.argv[1] == "replay":
+        for fixture_path in sys.argv[2:]:
+            replay(fixture_path)
+    else:
+        print('Usage: python xhr_capture.py record "<fund name>" <fixture.json>')
+        print("       python xhr_capture.py replay <fixture.json> [...]")